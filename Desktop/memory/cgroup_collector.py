@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+cgroup v2 collector for System Monitor
+Samples memory, CPU throttling and IO statistics for every cgroup in the tree
+through cached directory and file descriptors
+"""
+
+import os
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple
+
+from procfs_reader import ProcFile, parse_field
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+DEFAULT_CGROUP_ROOT = "/sys/fs/cgroup"
+
+# Files read for every cgroup; missing ones (controller not enabled) are skipped
+CGROUP_FILES = ('memory.current', 'memory.max', 'memory.stat', 'cpu.stat', 'io.stat')
+FDS_PER_CGROUP = len(CGROUP_FILES) + 1
+
+
+class CgroupSample:
+    """Statistics of one cgroup; a slotted record read like a dict (sample['cgroup'], sample.get(key)).
+
+    Up to cgroup_max_groups of these are held between cycles, so they carry no per-instance dict.
+    """
+
+    __slots__ = ('cgroup', 'memory_current', 'memory_max', 'memory_percent', 'cpu_usage_usec',
+                 'throttled_usec', 'cpu_usage_cores', 'throttled_percent',
+                 'io_rbytes', 'io_wbytes', 'io_rios', 'io_wios')
+
+    def __init__(self, cgroup: str):
+        self.cgroup = cgroup
+        self.memory_current = self.memory_max = self.memory_percent = None
+        self.cpu_usage_usec = self.throttled_usec = self.cpu_usage_cores = self.throttled_percent = None
+        self.io_rbytes = self.io_wbytes = self.io_rios = self.io_wios = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, None)
+        return default if value is None else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+
+class _CgroupNode:
+    """A cgroup directory with its cached descriptors and previous counters."""
+
+    __slots__ = ('path', 'depth', 'dir_fd', 'files', 'prev_cpu', 'prev_time')
+
+    def __init__(self, path: str, depth: int, dir_fd: int):
+        self.path = path
+        self.depth = depth
+        self.dir_fd = dir_fd
+        self.files = {}
+        self.prev_cpu = None
+        self.prev_time = 0.0
+        for name in CGROUP_FILES:
+            try:
+                self.files[name] = ProcFile(name, 1024, dir_fd=dir_fd)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        for proc_file in self.files.values():
+            proc_file.close()
+        self.files = {}
+        try:
+            os.close(self.dir_fd)
+        except OSError:
+            pass
+
+
+def _read_int(proc_file: ProcFile) -> Optional[int]:
+    """Read a single-value cgroup file; 'max' is returned as None."""
+    buffer, length = proc_file.read()
+    value = bytes(buffer[:length]).strip()
+    return None if value == b'max' else int(value)
+
+
+def _working_set(files: Dict[str, ProcFile], current: int) -> int:
+    """memory.current without inactive file pages, which the kernel reclaims before the limit is hit."""
+    if 'memory.stat' not in files:
+        return current
+    buffer, length = files['memory.stat'].read()
+    return max(0, current - (parse_field(buffer, length, b'inactive_file ') or 0))
+
+
+def _read_io_stat(proc_file: ProcFile) -> Tuple[int, int, int, int]:
+    """Sum rbytes, wbytes, rios and wios over all devices in io.stat."""
+    buffer, length = proc_file.read()
+    totals = [0, 0, 0, 0]
+    for line in bytes(buffer[:length]).splitlines():
+        for item in line.split()[1:]:
+            key, _, value = item.partition(b'=')
+            if key == b'rbytes':
+                totals[0] += int(value)
+            elif key == b'wbytes':
+                totals[1] += int(value)
+            elif key == b'rios':
+                totals[2] += int(value)
+            elif key == b'wios':
+                totals[3] += int(value)
+    return totals[0], totals[1], totals[2], totals[3]
+
+
+def parse_thresholds(value: str) -> Dict[str, float]:
+    """Parse 'system.slice/mysql.service=80, kubepods.slice=95' into {path: threshold}."""
+    thresholds = {}
+    for item in value.split(','):
+        if '=' in item:
+            path, _, threshold = item.rpartition('=')
+            thresholds[path.strip().strip('/')] = float(threshold)
+    return thresholds
+
+
+class CgroupCollector:
+    """Incremental walker and sampler for the cgroup v2 hierarchy."""
+
+    def __init__(self, config: Dict[str, Any]):
+        """Initialize collector with configuration and open the cgroup root."""
+        self.config = config
+        self.logger = logging.getLogger('memory_monitor.cgroup')
+        self.root = config.get('cgroup_root', DEFAULT_CGROUP_ROOT)
+        self.max_depth = config.get('cgroup_max_depth', 0)
+        self.max_groups = config.get('cgroup_max_groups', 5000)
+        self.scan_budget = config.get('cgroup_scan_budget', 200)
+        self.rescan_interval = config.get('cgroup_rescan_interval', 60)
+        self.memory_threshold = config.get('cgroup_memory_threshold', 90)
+        self.throttle_threshold = config.get('cgroup_throttle_threshold', 50)
+        self.memory_overrides = parse_thresholds(config.get('cgroup_memory_thresholds', ''))
+        self.throttle_overrides = parse_thresholds(config.get('cgroup_throttle_thresholds', ''))
+
+        self.nodes = {}
+        self.pending = deque()
+        self.last_full_scan = 0.0
+        self.last_samples = []
+        self._limit_warned = False
+
+        if not os.path.exists(os.path.join(self.root, 'cgroup.controllers')):
+            raise OSError(f"{self.root} is not a cgroup v2 hierarchy")
+
+        self._raise_fd_limit()
+        root_fd = os.open(self.root, os.O_RDONLY | os.O_DIRECTORY | getattr(os, 'O_CLOEXEC', 0))
+        self._add_node('', 0, root_fd)
+        # The first pass discovers the whole tree so the first sample is complete
+        self._scan(budget=None)
+        self.last_full_scan = time.monotonic()
+
+    def _raise_fd_limit(self) -> None:
+        """Raise the soft open-file limit so every cgroup can keep its descriptors."""
+        if not RESOURCE_AVAILABLE:
+            return
+        try:
+            soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+            wanted = self.max_groups * FDS_PER_CGROUP + 256
+            if hard != resource.RLIM_INFINITY:
+                wanted = min(wanted, hard)
+            if soft != resource.RLIM_INFINITY and soft < wanted:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+        except (ValueError, OSError) as e:
+            self.logger.warning(f"Could not raise open file limit: {str(e)}")
+
+    def _add_node(self, path: str, depth: int, dir_fd: int) -> None:
+        """Register a cgroup directory and queue it for child discovery."""
+        node = _CgroupNode(path, depth, dir_fd)
+        self.nodes[path] = node
+        self.pending.append(node)
+
+    def _remove_node(self, path: str) -> None:
+        """Forget a cgroup that disappeared, together with its descendants."""
+        prefix = path + '/'
+        for known in [p for p in self.nodes if p == path or p.startswith(prefix)]:
+            self.nodes.pop(known).close()
+
+    def _scan(self, budget: Optional[int]) -> None:
+        """List up to `budget` queued directories and register new child cgroups."""
+        scanned = 0
+        while self.pending and (budget is None or scanned < budget):
+            node = self.pending.popleft()
+            if self.nodes.get(node.path) is not node:
+                continue
+            scanned += 1
+            if self.max_depth and node.depth >= self.max_depth:
+                continue
+            try:
+                with os.scandir(node.dir_fd) as entries:
+                    for entry in entries:
+                        if not entry.is_dir(follow_symlinks=False):
+                            continue
+                        child = f"{node.path}/{entry.name}" if node.path else entry.name
+                        if child in self.nodes:
+                            continue
+                        if len(self.nodes) >= self.max_groups:
+                            if not self._limit_warned:
+                                self.logger.warning(f"cgroup limit reached ({self.max_groups}), "
+                                                    f"remaining cgroups are not sampled")
+                                self._limit_warned = True
+                            break
+                        try:
+                            child_fd = os.open(entry.name, os.O_RDONLY | os.O_DIRECTORY | getattr(os, 'O_CLOEXEC', 0),
+                                               dir_fd=node.dir_fd)
+                        except OSError:
+                            continue  # Removed between listing and opening
+                        self._add_node(child, node.depth + 1, child_fd)
+            except OSError:
+                self._remove_node(node.path)
+
+    def _refresh_tree(self) -> None:
+        """Advance the incremental discovery walk within the per-cycle budget."""
+        now = time.monotonic()
+        if not self.pending and now - self.last_full_scan >= self.rescan_interval:
+            self.pending.extend(self.nodes.values())
+            self.last_full_scan = now
+            self._limit_warned = False
+        self._scan(self.scan_budget)
+
+    def _threshold(self, overrides: Dict[str, float], path: str, default: float) -> float:
+        """Return the threshold of the closest configured ancestor, or the default."""
+        while True:
+            if path in overrides:
+                return overrides[path]
+            if not path:
+                return default
+            path = path.rpartition('/')[0]
+
+    def _sample(self, node: _CgroupNode, now: float) -> CgroupSample:
+        """Read all statistics of a single cgroup."""
+        files = node.files
+        sample = CgroupSample('/' + node.path)
+
+        if 'memory.current' in files:
+            sample.memory_current = _read_int(files['memory.current'])
+            memory_max = _read_int(files['memory.max']) if 'memory.max' in files else None
+            sample.memory_max = memory_max
+            if memory_max:
+                # Page cache alone must not make a healthy cgroup look full
+                sample.memory_percent = round(_working_set(files, sample.memory_current) / memory_max * 100, 1)
+
+        if 'cpu.stat' in files:
+            buffer, length = files['cpu.stat'].read()
+            cpu = (parse_field(buffer, length, b'usage_usec '),
+                   parse_field(buffer, length, b'nr_periods '),
+                   parse_field(buffer, length, b'nr_throttled '),
+                   parse_field(buffer, length, b'throttled_usec '))
+            sample.cpu_usage_usec = cpu[0]
+            sample.throttled_usec = cpu[3]
+            if node.prev_cpu is not None and now > node.prev_time:
+                elapsed_usec = (now - node.prev_time) * 1e6
+                sample.cpu_usage_cores = round((cpu[0] - node.prev_cpu[0]) / elapsed_usec, 3)
+                if cpu[1] is not None and cpu[1] > node.prev_cpu[1]:
+                    sample.throttled_percent = round(
+                        (cpu[2] - node.prev_cpu[2]) / (cpu[1] - node.prev_cpu[1]) * 100, 1)
+            node.prev_cpu = cpu
+            node.prev_time = now
+
+        if 'io.stat' in files:
+            sample.io_rbytes, sample.io_wbytes, sample.io_rios, sample.io_wios = \
+                _read_io_stat(files['io.stat'])
+
+        return sample
+
+    def collect(self) -> List[CgroupSample]:
+        """Sample every known cgroup and return a list of per-cgroup samples."""
+        self._refresh_tree()
+        now = time.monotonic()
+        samples = []
+        for path, node in list(self.nodes.items()):
+            if self.nodes.get(path) is not node:
+                continue
+            try:
+                samples.append(self._sample(node, now))
+            except (OSError, ValueError):
+                # ENODEV/ENOENT once the cgroup has been removed
+                self._remove_node(path)
+        self.last_samples = samples
+        return samples
+
+    def breaches(self, samples: Optional[List[CgroupSample]] = None) -> List[Tuple[str, str, float, float]]:
+        """Return (cgroup, kind, value, threshold) for cgroups above their thresholds."""
+        result = []
+        for sample in self.last_samples if samples is None else samples:
+            path = sample['cgroup'].strip('/')
+            memory_percent = sample.get('memory_percent')
+            if memory_percent is not None:
+                threshold = self._threshold(self.memory_overrides, path, self.memory_threshold)
+                if memory_percent >= threshold:
+                    result.append((sample['cgroup'], 'memory', memory_percent, threshold))
+            throttled_percent = sample.get('throttled_percent')
+            if throttled_percent is not None:
+                threshold = self._threshold(self.throttle_overrides, path, self.throttle_threshold)
+                if throttled_percent >= threshold:
+                    result.append((sample['cgroup'], 'throttle', throttled_percent, threshold))
+        return result
+
+    def container_memory_percent(self) -> Optional[float]:
+        """Working-set percent of the root cgroup's memory.max when it is limited (inside a container)."""
+        node = self.nodes.get('')
+        if node is None or 'memory.max' not in node.files:
+            return None
+        try:
+            memory_max = _read_int(node.files['memory.max'])
+            if not memory_max:
+                return None
+            current = _read_int(node.files['memory.current'])
+            return round(_working_set(node.files, current) / memory_max * 100, 1)
+        except (OSError, ValueError):
+            return None
+
+    def format_top(self, count: int) -> str:
+        """Format the cgroups with the highest memory usage for alert messages."""
+        ranked = sorted(self.last_samples, key=lambda s: s.get('memory_current') or 0, reverse=True)
+        result = "CGROUP MEM(MB) MEM% CPU THROTTLE%\n"
+        for sample in ranked[:count]:
+            memory_mb = (sample.get('memory_current') or 0) / 1024 / 1024
+            memory_percent = sample.get('memory_percent')
+            result += (f"{sample['cgroup']} {memory_mb:.0f} "
+                       f"{f'{memory_percent:.1f}%' if memory_percent is not None else '-'} "
+                       f"{sample.get('cpu_usage_cores', 0):.2f} "
+                       f"{sample.get('throttled_percent', 0):.1f}%\n")
+        return result
+
+    def close(self) -> None:
+        """Close every cached descriptor."""
+        for node in self.nodes.values():
+            node.close()
+        self.nodes = {}
+        self.pending.clear()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Daemon comparison for System Monitor
+Runs memory-monitor.sh and memory_monitor.py against the same shell-style
+config.conf and measures CPU time and process forks per monitoring cycle
+"""
+
+import os
+import sys
+import time
+import signal
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, Any, List
+
+STATUS_FILE = "/tmp/memory-monitor-status.tmp"
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+
+# Same layout as the config.conf install.sh writes; thresholds above 100 so no alert fires
+CONFIG_TEMPLATE = """# Memory Monitor konfiguratsiya fayli
+BOT_TOKEN="0:benchmark"
+CHAT_ID="0"
+
+THRESHOLD=101
+CHECK_INTERVAL={interval}
+LOG_FILE="{log_file}"
+LOG_LEVEL="INFO"
+
+ALERT_MESSAGE_TITLE="🛑 SYSTEM MONITOR ALERT"
+INCLUDE_TOP_PROCESSES=true
+TOP_PROCESSES_COUNT=10
+
+MONITOR_CPU=true
+CPU_THRESHOLD=101
+
+MONITOR_DISK=true
+DISK_THRESHOLD=101
+DISK_PATH="/"
+"""
+
+
+def forks_since_boot() -> int:
+    """Processes created since boot (the 'processes' line of /proc/stat)."""
+    with open('/proc/stat', 'r') as f:
+        for line in f:
+            if line.startswith('processes '):
+                return int(line.split()[1])
+    return 0
+
+
+def cpu_seconds(pid: int) -> float:
+    """CPU time of a process (all threads) plus its waited-for children, in seconds."""
+    # schedstat has nanosecond resolution; clock ticks would round a quiet daemon to zero
+    own = 0
+    for task in os.listdir(f'/proc/{pid}/task'):
+        try:
+            with open(f'/proc/{pid}/task/{task}/schedstat', 'r') as f:
+                own += int(f.read().split()[0])
+        except OSError:
+            pass
+    with open(f'/proc/{pid}/stat', 'rb') as f:
+        fields = f.read().rsplit(b')', 1)[1].split()
+    # cutime, cstime
+    return own / 1e9 + (int(fields[13]) + int(fields[14])) / CLOCK_TICKS
+
+
+def status_mtime() -> int:
+    try:
+        return os.stat(STATUS_FILE).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def wait_for_cycles(count: int, process: subprocess.Popen, timeout: float) -> bool:
+    """Wait until the status file has been rewritten `count` more times."""
+    last = status_mtime()
+    seen = 0
+    deadline = time.monotonic() + timeout
+    while seen < count:
+        if process.poll() is not None or time.monotonic() > deadline:
+            return False
+        time.sleep(0.02)
+        current = status_mtime()
+        if current != last:
+            last = current
+            seen += 1
+    return True
+
+
+def measure(name: str, command: List[str], cycles: int, interval: int) -> Dict[str, Any]:
+    """Run one daemon and measure the cycles after its first one."""
+    if os.path.exists(STATUS_FILE):
+        os.remove(STATUS_FILE)
+    timeout = (interval + 10) * (cycles + 2)
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               start_new_session=True)
+    try:
+        # The first cycle carries start-up cost (imports, Telegram check), so it is not counted
+        if not wait_for_cycles(1, process, timeout):
+            raise RuntimeError(f"{name} did not complete a cycle")
+        cpu_start, forks_start, wall_start = cpu_seconds(process.pid), forks_since_boot(), time.monotonic()
+        if not wait_for_cycles(cycles, process, timeout):
+            raise RuntimeError(f"{name} stopped before {cycles} cycles")
+        cpu_end, forks_end, wall_end = cpu_seconds(process.pid), forks_since_boot(), time.monotonic()
+    finally:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait()
+
+    return {
+        'name': name,
+        'cycles': cycles,
+        'cycle_seconds': (wall_end - wall_start) / cycles,
+        'cpu_ms_per_cycle': (cpu_end - cpu_start) * 1000 / cycles,
+        'forks_per_cycle': (forks_end - forks_start) / cycles,
+        'wall_seconds': wall_end - wall_start,
+    }
+
+
+def main():
+    """Compare memory-monitor.sh with memory_monitor.py on the same configuration."""
+    parser = argparse.ArgumentParser(description='Compare per-cycle CPU and forks of the shell and Python daemons')
+    parser.add_argument('--cycles', type=int, default=10, help='Measured cycles per daemon (default: 10)')
+    parser.add_argument('--interval', type=int, default=2, help='CHECK_INTERVAL in seconds (default: 2)')
+    parser.add_argument('--shell-script', default=os.path.join(HERE, 'memory-monitor.sh'))
+    parser.add_argument('--python-daemon', default=os.path.join(HERE, 'memory_monitor.py'))
+    args = parser.parse_args()
+
+    if not sys.platform.startswith('linux'):
+        print("Faqat Linuxda ishlaydi")
+        sys.exit(1)
+
+    workdir = tempfile.mkdtemp(prefix='memory-monitor-bench-')
+    config_file = os.path.join(workdir, 'config.conf')
+    with open(config_file, 'w') as f:
+        f.write(CONFIG_TEMPLATE.format(interval=args.interval, log_file=os.path.join(workdir, 'monitor.log')))
+
+    results = [
+        measure('memory-monitor.sh', ['bash', args.shell_script, '--config', config_file],
+                args.cycles, args.interval),
+        measure('memory_monitor.py', [sys.executable, args.python_daemon, '--config', config_file],
+                args.cycles, args.interval),
+    ]
+
+    # System-wide fork counter: show what the host did with no daemon running
+    forks_start = forks_since_boot()
+    time.sleep(results[0]['wall_seconds'] / args.cycles)
+    background = forks_since_boot() - forks_start
+
+    print(f"Konfiguratsiya: {config_file} (CHECK_INTERVAL={args.interval}, alertlarsiz)")
+    print(f"{'DAEMON':<20}{'CYCLE(s)':>10}{'CPU ms/cycle':>14}{'forks/cycle':>13}")
+    for result in results:
+        print(f"{result['name']:<20}{result['cycle_seconds']:>10.2f}{result['cpu_ms_per_cycle']:>14.1f}"
+              f"{result['forks_per_cycle']:>13.1f}")
+    print(f"(Fon: daemonsiz bir sikl davomida {background} ta fork)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Storage benchmark for System Monitor
+Generates synthetic multi-host metric and alert history and measures
+DatabaseHandler insert throughput, range-query latency and database size
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import random
+import shutil
+import logging
+import argparse
+import datetime
+import tempfile
+import statistics
+from typing import Dict, Any, List, Tuple, Iterator, Optional
+
+from db_handler import DatabaseHandler, MYSQL_AVAILABLE, POSTGRESQL_AVAILABLE
+
+# Index sets applied on top of the tables created by DatabaseHandler
+SCHEMA_VARIANTS = {
+    'baseline': [],
+    'timestamp_index': [
+        'CREATE INDEX idx_metrics_timestamp ON metrics (timestamp)',
+        'CREATE INDEX idx_alerts_timestamp ON alerts (timestamp)',
+    ],
+    'host_timestamp_index': [
+        'CREATE INDEX idx_metrics_timestamp ON metrics (timestamp)',
+        'CREATE INDEX idx_metrics_host_timestamp ON metrics (hostname, timestamp)',
+        'CREATE INDEX idx_alerts_timestamp ON alerts (timestamp)',
+    ],
+}
+
+# Indexes DatabaseHandler._create_tables adds; dropped so every variant starts from bare tables
+HANDLER_INDEXES = {'metrics': 'idx_metrics_timestamp', 'alerts': 'idx_alerts_timestamp'}
+
+# Same defaults as SystemMonitor._load_config
+ALERT_THRESHOLDS = {
+    'RAM': ('ram', 80),
+    'CPU': ('cpu', 90),
+    'Disk': ('disk', 90),
+    'Swap': ('swap', 80),
+}
+
+DEFAULT_PORTS = {
+    'mysql': 3306,
+    'postgresql': 5432,
+}
+
+
+class SyntheticFleet:
+    """Deterministic generator of realistic metric histories for many hosts."""
+
+    def __init__(self, hosts: int, days: float, interval: int, seed: int = 42,
+                 end: Optional[datetime.datetime] = None):
+        """Initialize the fleet with per-host load profiles."""
+        self.interval = interval
+        self.end = end or datetime.datetime.now()
+        self.start = self.end - datetime.timedelta(days=days)
+        self.steps = int(days * 86400 // interval)
+        self.rng = random.Random(seed)
+        self.alert_cooldown = interval * 10  # Same rate limit as send_telegram_alert
+        self.hosts = [self._host_profile(i) for i in range(hosts)]
+
+    def _host_profile(self, index: int) -> Dict[str, Any]:
+        """Create a randomized but stable load profile for one host."""
+        rng = self.rng
+        return {
+            'system_info': {
+                'hostname': f"host-{index:04d}",
+                'ip': f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+            },
+            'ram_base': rng.uniform(30, 70),
+            'ram_amplitude': rng.uniform(3, 15),
+            'cpu_base': rng.uniform(5, 45),
+            'cpu_amplitude': rng.uniform(5, 30),
+            'disk_start': rng.uniform(30, 80),
+            'disk_growth': rng.uniform(0, 15) / self.steps if self.steps else 0,
+            'swap_base': rng.choice([0.0, 0.0, rng.uniform(1, 20)]),
+            'load_base': rng.uniform(10, 80),
+            'network_base': rng.uniform(1, 40),
+            'phase': rng.uniform(0, 2 * math.pi),
+            'spike_left': 0,
+            'spike_size': 0.0,
+            'last_alert': {},
+        }
+
+    def _sample(self, host: Dict[str, Any], step: int) -> Dict[str, Any]:
+        """Compute one metrics dictionary for a host at the given step."""
+        rng = self.rng
+        day_fraction = (step * self.interval % 86400) / 86400
+        diurnal = math.sin(2 * math.pi * day_fraction + host['phase'])
+
+        # Occasional incidents raise RAM and CPU together for a while
+        if host['spike_left'] > 0:
+            host['spike_left'] -= 1
+        elif rng.random() < 0.0005:
+            host['spike_left'] = rng.randint(5, 60)
+            host['spike_size'] = rng.uniform(15, 45)
+        spike = host['spike_size'] if host['spike_left'] > 0 else 0.0
+
+        ram = host['ram_base'] + host['ram_amplitude'] * diurnal + rng.gauss(0, 2) + spike
+        cpu = host['cpu_base'] + host['cpu_amplitude'] * diurnal + rng.gauss(0, 5) + spike
+        disk = host['disk_start'] + host['disk_growth'] * step
+        swap = host['swap_base'] + (spike / 2 if host['swap_base'] else 0.0)
+        load = host['load_base'] * (1 + diurnal / 2) + rng.gauss(0, 5) + spike * 2
+        rx = max(0.0, host['network_base'] * (1 + diurnal) + rng.gauss(0, 2))
+        tx = max(0.0, host['network_base'] / 2 * (1 + diurnal) + rng.gauss(0, 1))
+
+        return {
+            'ram': round(min(100.0, max(0.0, ram)), 1),
+            'cpu': round(min(100.0, max(0.0, cpu)), 1),
+            'disk': round(min(100.0, disk), 1),
+            'swap': round(min(100.0, max(0.0, swap)), 1),
+            'load': round(max(0.0, load), 2),
+            'network': (round(rx, 2), round(tx, 2)),
+        }
+
+    def _alerts(self, host: Dict[str, Any], metrics: Dict[str, Any],
+                timestamp: datetime.datetime) -> List[Tuple]:
+        """Return the alerts the monitor would have raised for this sample."""
+        alerts = []
+        now = timestamp.timestamp()
+        for alert_type, (key, threshold) in ALERT_THRESHOLDS.items():
+            value = metrics[key]
+            if value < threshold or (key == 'swap' and value <= 0):
+                continue
+            if now - host['last_alert'].get(alert_type, 0) < self.alert_cooldown:
+                continue
+            host['last_alert'][alert_type] = now
+            message = f"{alert_type} usage on {host['system_info']['hostname']}: {value}%"
+            alerts.append((timestamp, alert_type, f"{value}%", message, True, host['system_info']))
+        return alerts
+
+    def generate(self, batch_size: int = 5000) -> Iterator[Tuple[List[Tuple], List[Tuple]]]:
+        """Yield (metric_samples, alerts) batches in timestamp order across all hosts."""
+        samples, alerts = [], []
+        for step in range(self.steps):
+            timestamp = self.start + datetime.timedelta(seconds=step * self.interval)
+            for host in self.hosts:
+                metrics = self._sample(host, step)
+                samples.append((timestamp, metrics, host['system_info']))
+                alerts.extend(self._alerts(host, metrics, timestamp))
+                if len(samples) >= batch_size:
+                    yield samples, alerts
+                    samples, alerts = [], []
+        if samples or alerts:
+            yield samples, alerts
+
+
+def _latency_summary(durations: List[float], rows: int) -> Dict[str, Any]:
+    """Summarize a list of durations in seconds as milliseconds."""
+    durations_ms = sorted(d * 1000 for d in durations)
+    p95_index = min(len(durations_ms) - 1, int(math.ceil(len(durations_ms) * 0.95)) - 1)
+    return {
+        'rows': rows,
+        'runs': len(durations_ms),
+        'min_ms': round(durations_ms[0], 3),
+        'median_ms': round(statistics.median(durations_ms), 3),
+        'p95_ms': round(durations_ms[p95_index], 3),
+    }
+
+
+class StorageBenchmark:
+    """Runs load generation and query benchmarks for one backend/schema pair."""
+
+    def __init__(self, backend: str, schema: str, args: argparse.Namespace):
+        """Initialize the benchmark for a backend and schema variant."""
+        self.backend = backend
+        self.schema = schema
+        self.args = args
+        self.logger = logging.getLogger('memory_monitor.benchmark')
+        self.db_path = None
+        self.handler = None
+
+    def _handler_config(self) -> Dict[str, Any]:
+        """Build a DatabaseHandler configuration for this run."""
+        config = {
+            'db_enabled': True,
+            'db_type': self.backend,
+        }
+        if self.backend == 'sqlite':
+            self.db_path = os.path.join(self.args.sqlite_dir, f"bench_{self.schema}.db")
+            if os.path.exists(self.db_path):
+                os.remove(self.db_path)
+            config['db_path'] = self.db_path
+        else:
+            config.update({
+                'db_host': self.args.db_host,
+                'db_port': self.args.db_port or DEFAULT_PORTS[self.backend],
+                'db_name': self.args.db_name,
+                'db_user': self.args.db_user,
+                'db_password': self.args.db_password,
+            })
+        return config
+
+    def _execute(self, statements: List[str]) -> None:
+        """Execute DDL statements on the handler connection."""
+        cursor = self.handler.connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        self.handler.connection.commit()
+        cursor.close()
+
+    def setup(self) -> bool:
+        """Create an empty database with the requested schema variant."""
+        self.handler = DatabaseHandler(self._handler_config())
+        if not self.handler.connection:
+            self.logger.error(f"Could not connect to {self.backend} database")
+            return False
+
+        if self.backend != 'sqlite':
+            # Server databases may hold data from a previous run (or real data)
+            self._execute(['DROP TABLE IF EXISTS metrics', 'DROP TABLE IF EXISTS alerts'])
+            self.handler._create_tables()
+
+        if self.backend == 'mysql':
+            self._execute([f"DROP INDEX {index} ON {table}" for table, index in HANDLER_INDEXES.items()])
+        else:
+            self._execute([f"DROP INDEX IF EXISTS {index}" for index in HANDLER_INDEXES.values()])
+        self._execute(SCHEMA_VARIANTS[self.schema])
+        return True
+
+    def load(self) -> Dict[str, Any]:
+        """Bulk-load synthetic history and measure insert throughput."""
+        fleet = SyntheticFleet(self.args.hosts, self.args.days, self.args.interval, self.args.seed)
+        metric_rows, alert_rows = 0, 0
+        insert_seconds = 0.0
+
+        for samples, alerts in fleet.generate(self.args.batch_size):
+            started = time.perf_counter()
+            if not self.handler.store_metrics_batch(samples):
+                raise RuntimeError("Metrics batch insert failed")
+            if not self.handler.store_alerts_batch(alerts):
+                raise RuntimeError("Alerts batch insert failed")
+            insert_seconds += time.perf_counter() - started
+            metric_rows += len(samples)
+            alert_rows += len(alerts)
+            if self.args.verbose and metric_rows % (self.args.batch_size * 100) == 0:
+                self.logger.info(f"{self.backend}/{self.schema}: {metric_rows} metric rows loaded")
+
+        return {
+            'metric_rows': metric_rows,
+            'alert_rows': alert_rows,
+            'seconds': round(insert_seconds, 3),
+            'rows_per_second': round((metric_rows + alert_rows) / insert_seconds, 1) if insert_seconds else None,
+        }
+
+    def single_inserts(self) -> Dict[str, Any]:
+        """Measure the daemon write path: one store_metrics() call and commit per sample."""
+        fleet = SyntheticFleet(1, 1, self.args.interval, self.args.seed + 1)
+        host = fleet.hosts[0]
+        durations = []
+        for step in range(self.args.single_inserts):
+            metrics = fleet._sample(host, step)
+            started = time.perf_counter()
+            self.handler.store_metrics(metrics, host['system_info'])
+            durations.append(time.perf_counter() - started)
+        if not durations:
+            return {}
+
+        summary = _latency_summary(durations, len(durations))
+        summary['rows_per_second'] = round(len(durations) / sum(durations), 1)
+        return summary
+
+    def queries(self) -> Dict[str, Any]:
+        """Measure get_recent_metrics/get_recent_alerts latency per window."""
+        results = {'metrics': {}, 'alerts': {}}
+        for hours in self.args.query_hours:
+            for name, method in (('metrics', self.handler.get_recent_metrics),
+                                 ('alerts', self.handler.get_recent_alerts)):
+                durations, rows = [], 0
+                for _ in range(self.args.query_repeat):
+                    started = time.perf_counter()
+                    rows = len(method(hours))
+                    durations.append(time.perf_counter() - started)
+                results[name][f"{hours}h"] = _latency_summary(durations, rows)
+        return results
+
+    def database_size(self) -> Optional[int]:
+        """Return the on-disk size of the metrics and alerts tables in bytes."""
+        try:
+            if self.backend == 'sqlite':
+                return sum(os.path.getsize(path) for path in (self.db_path, self.db_path + '-wal')
+                           if os.path.exists(path))
+
+            cursor = self.handler.connection.cursor()
+            if self.backend == 'mysql':
+                cursor.execute('''
+                SELECT SUM(data_length + index_length) FROM information_schema.tables
+                WHERE table_schema = DATABASE() AND table_name IN ('metrics', 'alerts')
+                ''')
+            else:  # PostgreSQL
+                cursor.execute("SELECT pg_total_relation_size('metrics') + pg_total_relation_size('alerts')")
+            size = cursor.fetchone()[0]
+            cursor.close()
+            return int(size) if size is not None else None
+
+        except Exception as e:
+            self.logger.error(f"Failed to measure database size: {str(e)}")
+            return None
+
+    def run(self) -> Dict[str, Any]:
+        """Run the full benchmark and return the result entry."""
+        result = {'backend': self.backend, 'schema': self.schema}
+        try:
+            if not self.setup():
+                result['error'] = "connection failed"
+                return result
+            result['bulk_insert'] = self.load()
+            result['queries'] = self.queries()
+            result['single_insert'] = self.single_inserts()
+            result['db_size_bytes'] = self.database_size()
+        except Exception as e:
+            self.logger.error(f"Benchmark {self.backend}/{self.schema} failed: {str(e)}")
+            result['error'] = str(e)
+        finally:
+            if self.handler:
+                self.handler.close()
+        return result
+
+
+def _csv_list(value: str) -> List[str]:
+    """Parse a comma separated command line value."""
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def main():
+    """Parse arguments, run every backend/schema combination and print the report."""
+    parser = argparse.ArgumentParser(description='System Monitor storage benchmark')
+    parser.add_argument('--hosts', type=int, default=500, help='Number of synthetic hosts (default: 500)')
+    parser.add_argument('--days', type=float, default=90, help='Days of history per host (default: 90)')
+    parser.add_argument('--interval', type=int, default=60, help='Seconds between samples (default: 60)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for reproducible data')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows per insert transaction')
+    parser.add_argument('--backends', type=_csv_list, default=['sqlite'],
+                        help='Comma separated list of sqlite, mysql, postgresql (default: sqlite)')
+    parser.add_argument('--schemas', type=_csv_list, default=list(SCHEMA_VARIANTS),
+                        help=f"Comma separated schema variants (default: {','.join(SCHEMA_VARIANTS)})")
+    parser.add_argument('--query-hours', type=lambda v: [int(h) for h in _csv_list(v)], default=[1, 24, 168],
+                        help='Comma separated query windows in hours (default: 1,24,168)')
+    parser.add_argument('--query-repeat', type=int, default=3, help='Repetitions per query window')
+    parser.add_argument('--single-inserts', type=int, default=200,
+                        help='Number of single-row store_metrics() calls to time')
+    parser.add_argument('--sqlite-dir', default=None, help='Directory for SQLite files (default: temporary)')
+    parser.add_argument('--keep', action='store_true', help='Keep generated SQLite files')
+    parser.add_argument('--db-host', default='localhost', help='MySQL/PostgreSQL host')
+    parser.add_argument('--db-port', type=int, default=None, help='MySQL/PostgreSQL port')
+    parser.add_argument('--db-name', default='system_monitor_bench', help='MySQL/PostgreSQL database name')
+    parser.add_argument('--db-user', default='', help='MySQL/PostgreSQL user')
+    parser.add_argument('--db-password', default='', help='MySQL/PostgreSQL password')
+    parser.add_argument('--drop-existing', action='store_true',
+                        help='Allow dropping metrics/alerts tables in the MySQL/PostgreSQL database')
+    parser.add_argument('--output', default=None, help='Write JSON report to this file instead of stdout')
+    parser.add_argument('--verbose', action='store_true', help='Log progress to stderr')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - [%(levelname)s] - %(message)s',
+        stream=sys.stderr
+    )
+
+    for backend in args.backends:
+        if backend not in ('sqlite', 'mysql', 'postgresql'):
+            parser.error(f"Unsupported backend: {backend}")
+        if backend == 'mysql' and not MYSQL_AVAILABLE:
+            parser.error("MySQL support requires mysql-connector-python package")
+        if backend == 'postgresql' and not POSTGRESQL_AVAILABLE:
+            parser.error("PostgreSQL support requires psycopg2 package")
+        if backend != 'sqlite' and not args.drop_existing:
+            parser.error(f"{backend} benchmark recreates the metrics and alerts tables; "
+                         f"use a dedicated database and pass --drop-existing")
+    for schema in args.schemas:
+        if schema not in SCHEMA_VARIANTS:
+            parser.error(f"Unknown schema variant: {schema}")
+
+    temp_dir = None
+    if args.sqlite_dir is None:
+        temp_dir = tempfile.mkdtemp(prefix='memory-monitor-bench-')
+        args.sqlite_dir = temp_dir
+
+    report = {
+        'generated_at': datetime.datetime.now().isoformat(),
+        'parameters': {
+            'hosts': args.hosts,
+            'days': args.days,
+            'interval': args.interval,
+            'seed': args.seed,
+            'batch_size': args.batch_size,
+            'query_hours': args.query_hours,
+            'query_repeat': args.query_repeat,
+        },
+        'results': [],
+    }
+
+    try:
+        for backend in args.backends:
+            for schema in args.schemas:
+                report['results'].append(StorageBenchmark(backend, schema, args).run())
+    finally:
+        if temp_dir and not args.keep:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,11 @@ Supports SQLite, MySQL, and PostgreSQL databases
 import os
 import logging
 import sqlite3
+import functools
+import threading
 import datetime
 import json
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Iterator
 
 # Optional imports for MySQL and PostgreSQL
 try:
@@ -28,6 +30,15 @@ except ImportError:
     POSTGRESQL_AVAILABLE = False
 
 
+def _synchronized(method):
+    """Serialize access to the shared connection between the monitor's threads."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class DatabaseHandler:
     """Handler for database operations."""
 
@@ -36,6 +47,7 @@ class DatabaseHandler:
         self.config = config
         self.logger = logging.getLogger('memory_monitor.database')
         self.connection = None
+        self.lock = threading.RLock()
         self.db_type = config.get('db_type', 'sqlite').lower()
         
         # Initialize database if enabled
@@ -75,7 +87,8 @@ class DatabaseHandler:
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
-        self.connection = sqlite3.connect(db_path)
+        # Access from other threads is serialized by self.lock
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
         self.connection.row_factory = sqlite3.Row
     
     def _initialize_mysql(self) -> None:
@@ -95,7 +108,8 @@ class DatabaseHandler:
             port=self.config.get('db_port', 5432),
             user=self.config.get('db_user', ''),
             password=self.config.get('db_password', ''),
-            dbname=self.config.get('db_name', 'system_monitor')
+            dbname=self.config.get('db_name', 'system_monitor'),
+            cursor_factory=psycopg2.extras.DictCursor
         )
     
     def _create_tables(self) -> None:
@@ -130,7 +144,8 @@ class DatabaseHandler:
                 alert_type TEXT NOT NULL,
                 value TEXT NOT NULL,
                 message TEXT,
-                sent_successfully BOOLEAN
+                sent_successfully BOOLEAN,
+                snapshot TEXT
             )
             ''')
             
@@ -161,7 +176,8 @@ class DatabaseHandler:
                 alert_type VARCHAR(50) NOT NULL,
                 value VARCHAR(100) NOT NULL,
                 message TEXT,
-                sent_successfully BOOLEAN
+                sent_successfully BOOLEAN,
+                snapshot TEXT
             )
             ''')
             
@@ -192,72 +208,111 @@ class DatabaseHandler:
                 alert_type VARCHAR(50) NOT NULL,
                 value VARCHAR(100) NOT NULL,
                 message TEXT,
-                sent_successfully BOOLEAN
+                sent_successfully BOOLEAN,
+                snapshot TEXT
             )
             ''')
         
+        # Tables created before forensic snapshots existed lack the column linking an alert to its file
+        cursor.execute("SELECT * FROM alerts WHERE 1 = 0")
+        cursor.fetchall()
+        if 'snapshot' not in [column[0] for column in cursor.description]:
+            cursor.execute("ALTER TABLE alerts ADD COLUMN snapshot TEXT")
+        
+        # Every history read is a time-range scan
+        for table in ('metrics', 'alerts'):
+            index_sql = f"CREATE INDEX idx_{table}_timestamp ON {table} (timestamp)"
+            if self.db_type == 'mysql':
+                try:
+                    cursor.execute(index_sql)
+                except mysql.connector.Error:
+                    pass  # MySQL has no CREATE INDEX IF NOT EXISTS; the index already exists
+            else:
+                cursor.execute(index_sql.replace("CREATE INDEX", "CREATE INDEX IF NOT EXISTS"))
+        
         self.connection.commit()
         cursor.close()
     
-    def store_metrics(self, metrics: Dict[str, Any], system_info: Dict[str, str]) -> bool:
+    def _format_timestamp(self, timestamp: Optional[datetime.datetime] = None) -> Any:
+        """Return timestamp in the representation expected by the current backend."""
+        if timestamp is None:
+            timestamp = datetime.datetime.now()
+        if self.db_type == 'sqlite':
+            return timestamp.isoformat()
+        return timestamp
+    
+    def _metrics_row(self, metrics: Dict[str, Any], system_info: Dict[str, str],
+                     timestamp: Optional[datetime.datetime] = None) -> Tuple:
+        """Build a metrics table row from a metrics dictionary."""
+        # Extract network metrics
+        network_rx, network_tx = 0.0, 0.0
+        if 'network' in metrics and isinstance(metrics['network'], tuple) and len(metrics['network']) == 2:
+            network_rx, network_tx = metrics['network']
+        
+        # Prepare extra data (anything not in standard columns)
+        extra_data = {k: v for k, v in metrics.items() if k not in ['ram', 'cpu', 'disk', 'swap', 'load', 'network']}
+        if extra_data:
+            extra_data_json = json.dumps(extra_data)
+        else:
+            extra_data_json = None
+        
+        return (
+            self._format_timestamp(timestamp),
+            system_info.get('hostname', 'unknown'),
+            system_info.get('ip', '0.0.0.0'),
+            metrics.get('ram', 0.0),
+            metrics.get('cpu', 0.0),
+            metrics.get('disk', 0.0),
+            metrics.get('swap', 0.0),
+            metrics.get('load', 0.0),
+            network_rx,
+            network_tx,
+            extra_data_json
+        )
+    
+    def _alert_row(self, alert_type: str, value: str, message: str, sent_successfully: bool,
+                   system_info: Dict[str, str], timestamp: Optional[datetime.datetime] = None,
+                   snapshot: Optional[str] = None) -> Tuple:
+        """Build an alerts table row."""
+        return (
+            self._format_timestamp(timestamp),
+            system_info.get('hostname', 'unknown'),
+            alert_type,
+            value,
+            message,
+            sent_successfully,
+            snapshot
+        )
+    
+    def _insert_metrics_sql(self) -> str:
+        """Return the INSERT statement for the metrics table."""
+        placeholder = '?' if self.db_type == 'sqlite' else '%s'  # MySQL and PostgreSQL use %s placeholders
+        return f'''
+        INSERT INTO metrics (
+            timestamp, hostname, ip_address, ram_usage, cpu_usage, disk_usage, 
+            swap_usage, load_average, network_rx, network_tx, extra_data
+        ) VALUES ({", ".join([placeholder] * 11)})
+        '''
+    
+    def _insert_alert_sql(self) -> str:
+        """Return the INSERT statement for the alerts table."""
+        placeholder = '?' if self.db_type == 'sqlite' else '%s'  # MySQL and PostgreSQL use %s placeholders
+        return f'''
+        INSERT INTO alerts (
+            timestamp, hostname, alert_type, value, message, sent_successfully, snapshot
+        ) VALUES ({", ".join([placeholder] * 7)})
+        '''
+    
+    @_synchronized
+    def store_metrics(self, metrics: Dict[str, Any], system_info: Dict[str, str],
+                      timestamp: Optional[datetime.datetime] = None) -> bool:
         """Store metrics in the database."""
         if not self.config.get('db_enabled', False) or not self.connection:
             return False
         
         try:
             cursor = self.connection.cursor()
-            
-            # Extract network metrics
-            network_rx, network_tx = 0.0, 0.0
-            if 'network' in metrics and isinstance(metrics['network'], tuple) and len(metrics['network']) == 2:
-                network_rx, network_tx = metrics['network']
-            
-            # Prepare extra data (anything not in standard columns)
-            extra_data = {k: v for k, v in metrics.items() if k not in ['ram', 'cpu', 'disk', 'swap', 'load', 'network']}
-            if extra_data:
-                extra_data_json = json.dumps(extra_data)
-            else:
-                extra_data_json = None
-            
-            # Insert metrics
-            if self.db_type == 'sqlite':
-                cursor.execute('''
-                INSERT INTO metrics (
-                    timestamp, hostname, ip_address, ram_usage, cpu_usage, disk_usage, 
-                    swap_usage, load_average, network_rx, network_tx, extra_data
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    datetime.datetime.now().isoformat(),
-                    system_info.get('hostname', 'unknown'),
-                    system_info.get('ip', '0.0.0.0'),
-                    metrics.get('ram', 0.0),
-                    metrics.get('cpu', 0.0),
-                    metrics.get('disk', 0.0),
-                    metrics.get('swap', 0.0),
-                    metrics.get('load', 0.0),
-                    network_rx,
-                    network_tx,
-                    extra_data_json
-                ))
-            else:  # MySQL and PostgreSQL use %s placeholders
-                cursor.execute('''
-                INSERT INTO metrics (
-                    timestamp, hostname, ip_address, ram_usage, cpu_usage, disk_usage, 
-                    swap_usage, load_average, network_rx, network_tx, extra_data
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ''', (
-                    datetime.datetime.now(),
-                    system_info.get('hostname', 'unknown'),
-                    system_info.get('ip', '0.0.0.0'),
-                    metrics.get('ram', 0.0),
-                    metrics.get('cpu', 0.0),
-                    metrics.get('disk', 0.0),
-                    metrics.get('swap', 0.0),
-                    metrics.get('load', 0.0),
-                    network_rx,
-                    network_tx,
-                    extra_data_json
-                ))
+            cursor.execute(self._insert_metrics_sql(), self._metrics_row(metrics, system_info, timestamp))
             
             self.connection.commit()
             cursor.close()
@@ -268,42 +323,44 @@ class DatabaseHandler:
             self.logger.error(f"Failed to store metrics in database: {str(e)}")
             return False
     
-    def store_alert(self, alert_type: str, value: str, message: str, 
-                   sent_successfully: bool, system_info: Dict[str, str]) -> bool:
-        """Store alert information in the database."""
+    @_synchronized
+    def store_metrics_batch(self, samples: List[Tuple[datetime.datetime, Dict[str, Any], Dict[str, str]]]) -> bool:
+        """Store several (timestamp, metrics, system_info) samples in a single transaction."""
         if not self.config.get('db_enabled', False) or not self.connection:
             return False
+        if not samples:
+            return True
         
         try:
             cursor = self.connection.cursor()
+            cursor.executemany(
+                self._insert_metrics_sql(),
+                [self._metrics_row(metrics, system_info, timestamp) for timestamp, metrics, system_info in samples]
+            )
             
-            # Insert alert
-            if self.db_type == 'sqlite':
-                cursor.execute('''
-                INSERT INTO alerts (
-                    timestamp, hostname, alert_type, value, message, sent_successfully
-                ) VALUES (?, ?, ?, ?, ?, ?)
-                ''', (
-                    datetime.datetime.now().isoformat(),
-                    system_info.get('hostname', 'unknown'),
-                    alert_type,
-                    value,
-                    message,
-                    sent_successfully
-                ))
-            else:  # MySQL and PostgreSQL use %s placeholders
-                cursor.execute('''
-                INSERT INTO alerts (
-                    timestamp, hostname, alert_type, value, message, sent_successfully
-                ) VALUES (%s, %s, %s, %s, %s, %s)
-                ''', (
-                    datetime.datetime.now(),
-                    system_info.get('hostname', 'unknown'),
-                    alert_type,
-                    value,
-                    message,
-                    sent_successfully
-                ))
+            self.connection.commit()
+            cursor.close()
+            self.logger.debug(f"{len(samples)} metric samples stored in database successfully")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to store metrics batch in database: {str(e)}")
+            return False
+    
+    @_synchronized
+    def store_alert(self, alert_type: str, value: str, message: str, 
+                   sent_successfully: bool, system_info: Dict[str, str],
+                   timestamp: Optional[datetime.datetime] = None, snapshot: Optional[str] = None) -> bool:
+        """Store alert information in the database; snapshot is the path of its forensic snapshot, if any."""
+        if not self.config.get('db_enabled', False) or not self.connection:
+            return False
+        
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                self._insert_alert_sql(),
+                self._alert_row(alert_type, value, message, sent_successfully, system_info, timestamp, snapshot)
+            )
             
             self.connection.commit()
             cursor.close()
@@ -314,6 +371,50 @@ class DatabaseHandler:
             self.logger.error(f"Failed to store alert in database: {str(e)}")
             return False
     
+    @_synchronized
+    def clear_alert_snapshot(self, snapshot: str) -> bool:
+        """Remove a snapshot path from the alerts that link to it, e.g. after its capture failed."""
+        if not self.config.get('db_enabled', False) or not self.connection:
+            return False
+        
+        try:
+            placeholder = '?' if self.db_type == 'sqlite' else '%s'
+            cursor = self.connection.cursor()
+            cursor.execute(f"UPDATE alerts SET snapshot = NULL WHERE snapshot = {placeholder}", (snapshot,))
+            self.connection.commit()
+            cursor.close()
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to clear alert snapshot in database: {str(e)}")
+            return False
+    
+    @_synchronized
+    def store_alerts_batch(self, alerts: List[Tuple[datetime.datetime, str, str, str, bool, Dict[str, str]]]) -> bool:
+        """Store several (timestamp, alert_type, value, message, sent_successfully, system_info) alerts at once."""
+        if not self.config.get('db_enabled', False) or not self.connection:
+            return False
+        if not alerts:
+            return True
+        
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                self._insert_alert_sql(),
+                [self._alert_row(alert_type, value, message, sent, system_info, timestamp)
+                 for timestamp, alert_type, value, message, sent, system_info in alerts]
+            )
+            
+            self.connection.commit()
+            cursor.close()
+            self.logger.debug(f"{len(alerts)} alerts stored in database successfully")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Failed to store alerts batch in database: {str(e)}")
+            return False
+    
+    @_synchronized
     def get_recent_metrics(self, hours: int = 24) -> List[Dict[str, Any]]:
         """Get metrics from the last specified hours."""
         if not self.config.get('db_enabled', False) or not self.connection:
@@ -368,6 +469,58 @@ class DatabaseHandler:
             self.logger.error(f"Failed to retrieve metrics from database: {str(e)}")
             return []
     
+    def _iter_rows(self, table: str, columns: str, start: datetime.datetime, end: Optional[datetime.datetime],
+                   hostname: Optional[str], batch_size: int) -> Iterator[Dict[str, Any]]:
+        """Stream the given columns of a table's rows in [start, end) in ascending time order."""
+        if not self.config.get('db_enabled', False) or not self.connection:
+            return
+        
+        placeholder = '?' if self.db_type == 'sqlite' else '%s'
+        conditions = [f"timestamp >= {placeholder}"]
+        params = [self._format_timestamp(start)]
+        if end is not None:
+            conditions.append(f"timestamp < {placeholder}")
+            params.append(self._format_timestamp(end))
+        if hostname:
+            conditions.append(f"hostname = {placeholder}")
+            params.append(hostname)
+        
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f'''
+            SELECT {columns}
+            FROM {table}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY timestamp ASC
+            ''', tuple(params))
+            
+            names = [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(names, row))
+        finally:
+            cursor.close()
+    
+    def iter_metrics(self, start: datetime.datetime, end: Optional[datetime.datetime] = None,
+                     hostname: Optional[str] = None, batch_size: int = 5000) -> Iterator[Dict[str, Any]]:
+        """Stream metrics rows in ascending time order without loading the whole range.
+        
+        The lock is not held between batches, so use a dedicated handler (as replay.py does).
+        """
+        return self._iter_rows('metrics', "timestamp, hostname, ram_usage, cpu_usage, disk_usage, swap_usage, "
+                                          "load_average, network_rx, network_tx, extra_data",
+                               start, end, hostname, batch_size)
+    
+    def iter_alerts(self, start: datetime.datetime, end: Optional[datetime.datetime] = None,
+                    hostname: Optional[str] = None, batch_size: int = 5000) -> Iterator[Dict[str, Any]]:
+        """Stream alerts rows in ascending time order; like iter_metrics, the lock is not held."""
+        return self._iter_rows('alerts', "timestamp, hostname, alert_type, value, message, sent_successfully, snapshot",
+                               start, end, hostname, batch_size)
+    
+    @_synchronized
     def get_recent_alerts(self, hours: int = 24) -> List[Dict[str, Any]]:
         """Get alerts from the last specified hours."""
         if not self.config.get('db_enabled', False) or not self.connection:
@@ -419,5 +572,117 @@ class DatabaseHandler:
             return results
             
         except Exception as e:
+            self.logger.error(f"Failed to retrieve alerts from database: {str(e)}")
+            return []
+    
+    @_synchronized
+    def get_metrics_summary(self, days: int = 7) -> Dict[str, Any]:
+        """Get summary statistics for metrics over the specified days."""
+        if not self.config.get('db_enabled', False) or not self.connection:
+            return {}
+        
+        try:
+            cursor = self.connection.cursor()
+            
+            # Calculate time threshold
+            time_threshold = datetime.datetime.now() - datetime.timedelta(days=days)
+            
+            # Query for average, min, max values
+            if self.db_type == 'sqlite':
+                cursor.execute('''
+                SELECT 
+                    AVG(ram_usage) as avg_ram,
+                    MAX(ram_usage) as max_ram,
+                    AVG(cpu_usage) as avg_cpu,
+                    MAX(cpu_usage) as max_cpu,
+                    AVG(disk_usage) as avg_disk,
+                    MAX(disk_usage) as max_disk,
+                    AVG(swap_usage) as avg_swap,
+                    MAX(swap_usage) as max_swap,
+                    AVG(load_average) as avg_load,
+                    MAX(load_average) as max_load,
+                    AVG(network_rx) as avg_network_rx,
+                    MAX(network_rx) as max_network_rx,
+                    AVG(network_tx) as avg_network_tx,
+                    MAX(network_tx) as max_network_tx,
+                    COUNT(*) as total_records
+                FROM metrics 
+                WHERE timestamp >= ?
+                ''', (time_threshold.isoformat(),))
+                
+                result = dict(cursor.fetchone())
+                
+            else:  # MySQL and PostgreSQL
+                cursor.execute('''
+                SELECT 
+                    AVG(ram_usage) as avg_ram,
+                    MAX(ram_usage) as max_ram,
+                    AVG(cpu_usage) as avg_cpu,
+                    MAX(cpu_usage) as max_cpu,
+                    AVG(disk_usage) as avg_disk,
+                    MAX(disk_usage) as max_disk,
+                    AVG(swap_usage) as avg_swap,
+                    MAX(swap_usage) as max_swap,
+                    AVG(load_average) as avg_load,
+                    MAX(load_average) as max_load,
+                    AVG(network_rx) as avg_network_rx,
+                    MAX(network_rx) as max_network_rx,
+                    AVG(network_tx) as avg_network_tx,
+                    MAX(network_tx) as max_network_tx,
+                    COUNT(*) as total_records
+                FROM metrics 
+                WHERE timestamp >= %s
+                ''', (time_threshold,))
+                
+                if self.db_type == 'mysql':
+                    columns = [column[0] for column in cursor.description]
+                    result = dict(zip(columns, cursor.fetchone()))
+                else:  # PostgreSQL
+                    result = dict(cursor.fetchone())
+            
+            # Query for alert counts by type
+            if self.db_type == 'sqlite':
+                cursor.execute('''
+                SELECT 
+                    alert_type,
+                    COUNT(*) as count
+                FROM alerts 
+                WHERE timestamp >= ?
+                GROUP BY alert_type
+                ''', (time_threshold.isoformat(),))
+                
+                alert_counts = {}
+                for row in cursor.fetchall():
+                    alert_counts[row[0]] = row[1]
+                
+            else:  # MySQL and PostgreSQL
+                cursor.execute('''
+                SELECT 
+                    alert_type,
+                    COUNT(*) as count
+                FROM alerts 
+                WHERE timestamp >= %s
+                GROUP BY alert_type
+                ''', (time_threshold,))
+                
+                alert_counts = {}
+                for row in cursor.fetchall():
+                    alert_counts[row[0]] = row[1]
+            
+            result['alert_counts'] = alert_counts
+            cursor.close()
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Failed to retrieve metrics summary from database: {str(e)}")
+            return {}
     
-(Content truncated due to size limit. Use line ranges to read in chunks)
\ No newline at end of file
+    @_synchronized
+    def close(self) -> None:
+        """Close database connection."""
+        if self.connection:
+            try:
+                self.connection.close()
+                self.logger.debug("Database connection closed")
+            except Exception as e:
+                self.logger.error(f"Error closing database connection: {str(e)}")
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Low-level discovery for System Monitor
+Discovers mounted filesystems, network interfaces and significant process
+groups, rebuilding each list only when its source changes
+"""
+
+import os
+import json
+import time
+import select
+import socket
+import fnmatch
+import logging
+from typing import Dict, Any, List, Optional, Set
+
+from procfs_reader import ProcFile
+
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+
+# Same set as the stock Zabbix Linux template's {$VFS.FS.FSTYPE.MATCHES}. Network filesystems (nfs, nfs4,
+# cifs) are left out: every discovered mount is statvfs'd on the monitoring thread, and a hard mount whose
+# server is unreachable would block the whole loop. Add them to discovery_fs_types only for reliable servers.
+DEFAULT_FS_TYPES = "btrfs,ext2,ext3,ext4,reiserfs,xfs,jfs,zfs,vfat,ntfs,fuseblk"
+DEFAULT_IF_EXCLUDE = "lo,veth*,docker*,br-*,virbr*,cali*,flannel*,cni*"
+
+# Process groups held in LLD during the hold period; the most recently significant ones are kept
+MAX_DISCOVERED_GROUPS = 500
+
+
+def _unescape(field: bytes) -> str:
+    """Decode the octal escapes (\\040 for space etc.) used in mountinfo fields."""
+    text = field.decode('utf-8', errors='replace')
+    if '\\' not in text:
+        return text
+    result = ''
+    i = 0
+    while i < len(text):
+        if text[i] == '\\' and text[i + 1:i + 4].isdigit():
+            result += chr(int(text[i + 1:i + 4], 8))
+            i += 4
+        else:
+            result += text[i]
+            i += 1
+    return result
+
+
+def parse_mountinfo(data: bytes, fs_types: Set[str]) -> List[Dict[str, str]]:
+    """Return [{'fsname', 'fstype', 'fsdevice'}] for mounts of the wanted types, one per mount point."""
+    mounts = {}
+    for line in data.splitlines():
+        fields = line.split()
+        try:
+            separator = fields.index(b'-')
+        except ValueError:
+            continue
+        if separator + 2 >= len(fields):
+            continue
+        fstype = fields[separator + 1].decode()
+        if fs_types and fstype not in fs_types:
+            continue
+        mount_point = _unescape(fields[4])
+        # A later line for the same mount point is the one stacked on top
+        mounts[mount_point] = {'fsname': mount_point, 'fstype': fstype,
+                               'fsdevice': _unescape(fields[separator + 2])}
+    return [mounts[path] for path in sorted(mounts)]
+
+
+class DiscoveryCache:
+    """Discovery results that are recomputed only when their source changes."""
+
+    def __init__(self, config: Dict[str, Any]):
+        """Initialize the cache and open /proc/self/mountinfo for change notification."""
+        self.config = config
+        self.logger = logging.getLogger('memory_monitor.discovery')
+        self.fs_types = {t.strip() for t in config.get('discovery_fs_types', DEFAULT_FS_TYPES).split(',') if t.strip()}
+        self.if_exclude = [p.strip() for p in config.get('discovery_if_exclude', DEFAULT_IF_EXCLUDE).split(',')
+                           if p.strip()]
+        self.group_min_rss_mb = config.get('discovery_group_min_rss_mb', 100)
+        self.group_min_cpu = config.get('discovery_group_min_cpu', 5)
+        self.group_hold = config.get('discovery_group_hold', 3600)
+        self.group_by = config.get('process_group_by', 'name')
+
+        self.filesystems = []
+        self.interfaces = []
+        self.process_groups = []
+        self.group_last_seen = {}
+        self.if_names = None
+        self.lld = {}
+
+        self.mountinfo = ProcFile(MOUNTINFO_PATH, 16384)
+        # The kernel flags the open mountinfo with POLLPRI|POLLERR whenever the mount table changes
+        self.poller = select.poll() if hasattr(select, 'poll') else None
+        if self.poller:
+            self.poller.register(self.mountinfo.fd, select.POLLPRI | select.POLLERR)
+        self._load_filesystems()
+        self._load_interfaces(self._interface_names())
+
+    def _load_filesystems(self) -> bool:
+        """Re-read the mount table; return True if the discovered list changed."""
+        buffer, length = self.mountinfo.read()
+        filesystems = parse_mountinfo(bytes(buffer[:length]), self.fs_types)
+        return self._set('filesystems', filesystems)
+
+    def _mounts_changed(self) -> bool:
+        """Non-blocking check for a mount table change since the last call."""
+        if self.poller is None:
+            return True  # Without poll() the (cheap) re-read decides
+        return bool(self.poller.poll(0))
+
+    def _interface_names(self) -> List[str]:
+        """Current interface names that are not excluded."""
+        try:
+            names = [name for _, name in socket.if_nameindex()]
+        except OSError:
+            names = os.listdir('/sys/class/net') if os.path.isdir('/sys/class/net') else []
+        return sorted(name for name in names
+                      if not any(fnmatch.fnmatchcase(name, pattern) for pattern in self.if_exclude))
+
+    def _load_interfaces(self, names: List[str]) -> bool:
+        self.if_names = names
+        return self._set('interfaces', [{'ifname': name} for name in names])
+
+    def _set(self, kind: str, entries: List[Dict[str, str]]) -> bool:
+        """Store a discovery list and its rendered LLD JSON if it differs from the current one."""
+        if entries == getattr(self, kind) and kind in self.lld:
+            return False
+        setattr(self, kind, entries)
+        self.lld[kind] = json.dumps([{f"{{#{key.upper()}}}": value for key, value in entry.items()}
+                                     for entry in entries])
+        return True
+
+    def refresh(self, groups: Optional[List[Dict[str, Any]]] = None) -> Set[str]:
+        """Update every list from its change signal and return the kinds that changed."""
+        changed = set()
+
+        if self._mounts_changed() and self._load_filesystems():
+            changed.add('filesystems')
+
+        names = self._interface_names()
+        if names != self.if_names and self._load_interfaces(names):
+            changed.add('interfaces')
+
+        if groups is not None and self._refresh_groups(groups):
+            changed.add('process_groups')
+
+        if changed:
+            self.logger.info(f"Discovery updated: {', '.join(sorted(changed))}")
+        return changed
+
+    def _refresh_groups(self, groups: List[Dict[str, Any]]) -> bool:
+        """Keep groups that were significant within the hold period, so brief dips don't churn LLD."""
+        now = time.monotonic()
+        for group in groups:
+            if group['rss_mb'] >= self.group_min_rss_mb or group['cpu_percent'] >= self.group_min_cpu:
+                self.group_last_seen[group['group']] = now
+        self.group_last_seen = {name: seen for name, seen in self.group_last_seen.items()
+                                if now - seen < self.group_hold}
+        if len(self.group_last_seen) > MAX_DISCOVERED_GROUPS:
+            recent = sorted(self.group_last_seen.items(), key=lambda item: item[1], reverse=True)
+            self.group_last_seen = dict(recent[:MAX_DISCOVERED_GROUPS])
+        return self._set('process_groups', [{'group': name, 'groupby': self.group_by}
+                                            for name in sorted(self.group_last_seen)])
+
+    def close(self) -> None:
+        """Close the mountinfo descriptor."""
+        if self.poller:
+            self.poller.unregister(self.mountinfo.fd)
+        self.mountinfo.close()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Forensic snapshots for System Monitor
+When an alert fires, a background thread records the process table,
+smaps_rollup and open descriptor counts of the top consumers, cgroup
+statistics and PSI into a gzip-compressed JSON file under a strict CPU-time
+and size budget, so the evidence outlives the incident without adding to it
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import queue
+import socket
+import logging
+import argparse
+import threading
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+from procfs_reader import read_smaps_rollup
+from proc_scanner import CLOCK_TICKS, PAGE_SIZE
+
+DEFAULT_FORENSICS_DIR = "/var/lib/memory-monitor/forensics"
+
+PROCESS_COLUMNS = ('pid', 'ppid', 'uid', 'comm', 'state', 'threads', 'rss_bytes', 'vsize_bytes',
+                   'cpu_seconds', 'start_seconds')
+RSS, CPU = PROCESS_COLUMNS.index('rss_bytes'), PROCESS_COLUMNS.index('cpu_seconds')
+
+# CPU-bound alerts rank the top consumers by accumulated CPU time, everything else by resident memory
+CPU_ALERTS = ('CPU', 'Load')
+
+SNAPSHOT_FILE = re.compile(r'\d{8}-\d{6}-[\w.-]+\.json\.gz$')
+UNSAFE_NAME = re.compile(r'[^\w.-]')
+
+
+class _Budget:
+    """CPU time of the capturing thread and encoded bytes a snapshot may still spend."""
+
+    __slots__ = ('started', 'deadline', 'max_bytes', 'bytes')
+
+    def __init__(self, cpu_seconds: float, max_bytes: int):
+        # thread_time counts user and system time of this thread only, so waiting on I/O is free
+        self.started = time.thread_time()
+        self.deadline = self.started + cpu_seconds
+        self.max_bytes = max_bytes
+        self.bytes = 0
+
+    def exhausted(self) -> bool:
+        return self.bytes >= self.max_bytes or time.thread_time() >= self.deadline
+
+    def fits(self, size: int) -> bool:
+        return self.bytes + size <= self.max_bytes
+
+    def cpu_ms(self) -> float:
+        return round((time.thread_time() - self.started) * 1000, 2)
+
+
+def read_process(pid: str, proc_root: str = '/proc') -> Optional[list]:
+    """One PROCESS_COLUMNS row from /proc/<pid>/stat, or None if the process is gone."""
+    try:
+        with open(f"{proc_root}/{pid}/stat", 'rb') as f:
+            data = f.read()
+        uid = os.stat(f"{proc_root}/{pid}").st_uid
+    except OSError:
+        return None
+    # comm may itself contain ') ', so the fields start after the last one
+    end = data.rfind(b')')
+    comm = data[data.find(b'(') + 1:end].decode('utf-8', 'replace')
+    fields = data[end + 2:].split()
+    return [int(pid), int(fields[1]), uid, comm, fields[0].decode('ascii'), int(fields[17]),
+            int(fields[21]) * PAGE_SIZE, int(fields[20]),
+            round((int(fields[11]) + int(fields[12])) / CLOCK_TICKS, 2), round(int(fields[19]) / CLOCK_TICKS, 2)]
+
+
+def read_pressure(root: str = '/proc/pressure') -> Dict[str, List[str]]:
+    """Raw PSI lines per resource."""
+    pressure = {}
+    for resource in ('cpu', 'memory', 'io'):
+        try:
+            with open(os.path.join(root, resource)) as f:
+                pressure[resource] = f.read().splitlines()
+        except OSError:
+            pass
+    return pressure
+
+
+def count_fds(pid: int, proc_root: str = '/proc') -> Optional[int]:
+    """Number of open descriptors of a process, or None without permission."""
+    try:
+        return len(os.listdir(f"{proc_root}/{pid}/fd"))
+    except OSError:
+        return None
+
+
+def read_cmdline(pid: int, limit: int = 512, proc_root: str = '/proc') -> str:
+    try:
+        with open(f"{proc_root}/{pid}/cmdline", 'rb') as f:
+            data = f.read(limit)
+    except OSError:
+        return ''
+    return data.rstrip(b'\0').replace(b'\0', b' ').decode('utf-8', 'replace')
+
+
+class ForensicCapture:
+    """Writes budgeted alert snapshots from a low-priority background thread, one capture at a time."""
+
+    def __init__(self, config: Dict[str, Any], sources: Optional[Dict[str, Callable[[], Any]]] = None,
+                 self_metrics=None, proc_root: str = '/proc', on_failure: Optional[Callable[[str], Any]] = None):
+        """Create the snapshot directory and start the worker; sources add named sections (e.g. cgroups).
+
+        on_failure is called with the path of a snapshot that could not be written, so links to it can be removed.
+        """
+        self.logger = logging.getLogger('memory_monitor.forensics')
+        self.directory = config.get('forensics_dir', DEFAULT_FORENSICS_DIR)
+        self.cpu_budget = config.get('forensics_cpu_budget_ms', 250) / 1000
+        self.max_bytes = config.get('forensics_max_kb', 1024) * 1024
+        self.top_count = config.get('forensics_top_processes', 10)
+        self.min_interval = config.get('forensics_min_interval', 300)
+        self.retention = config.get('forensics_retention_days', 7) * 86400
+        self.max_files = config.get('forensics_max_files', 200)
+        self.sources = sources or {}
+        self.self_metrics = self_metrics
+        self.proc_root = proc_root
+        self.on_failure = on_failure
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.pending = False
+        self.last_capture = 0.0
+        self.failed = deque(maxlen=16)  # Paths handed out by request() that were never written
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._run, name='forensic-capture', daemon=True)
+        self.thread.start()
+
+    def request(self, alert_type: str, value: str) -> Optional[str]:
+        """Queue a snapshot for an alert; returns the file it will be written to, or None if skipped.
+
+        Only one capture runs at a time and captures are at least forensics_min_interval apart,
+        so an alert storm produces one snapshot rather than a queue of them.
+        """
+        now = time.time()
+        with self.lock:
+            if self.pending or now - self.last_capture < self.min_interval:
+                self._count('skipped')
+                return None
+            self.pending = True
+            self.last_capture = now
+        name = UNSAFE_NAME.sub('_', alert_type.lower())
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{name}.json.gz")
+        self.queue.put((path, alert_type, value, now))
+        return path
+
+    def _run(self) -> None:
+        try:
+            # Lowest CPU priority for this thread only (Linux threads have their own nice value)
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            path = item[0]
+            try:
+                outcome = self.write(path, self.capture(*item[1:]))
+                self.prune()
+            except Exception as e:
+                outcome = 'failed'
+                self.logger.error(f"Forensik snapshot yozilmadi ({path}): {str(e)}")
+                self._discard(path)
+            finally:
+                with self.lock:
+                    self.pending = False
+            self._count(outcome)
+
+    def _discard(self, path: str) -> None:
+        """Remove the partial file of a failed capture and report that the path will never exist."""
+        try:
+            os.unlink(f"{path}.tmp")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.logger.warning(f"Yarim snapshot o'chirilmadi ({path}.tmp): {str(e)}")
+        with self.lock:
+            self.failed.append(path)
+            if self.on_failure is not None:
+                try:
+                    self.on_failure(path)
+                except Exception as e:
+                    self.logger.error(f"Snapshot havolasi tozalanmadi ({path}): {str(e)}")
+
+    def link(self, path: Optional[str], store: Callable[[Optional[str]], Any]) -> Any:
+        """Call store with path, or with None if that capture already failed.
+
+        Failures are reported under the same lock, so one that happens later reaches
+        on_failure only after store has saved the link.
+        """
+        with self.lock:
+            return store(None if path in self.failed else path)
+
+    def _count(self, outcome: str) -> None:
+        if self.self_metrics is not None:
+            self.self_metrics.inc('forensic_snapshots_total', labels=(outcome,))
+
+    def capture(self, alert_type: str, value: str, timestamp: float) -> Tuple[List[Tuple[str, bytes]], Dict[str, Any]]:
+        """Collect the snapshot sections in order of value per CPU; returns (encoded sections, budget report)."""
+        budget = _Budget(self.cpu_budget, self.max_bytes)
+        sections = []
+        report = {'truncated': [], 'skipped': [], 'errors': {}}
+
+        def add(name, content):
+            encoded = json.dumps(content, separators=(',', ':'), default=str).encode()
+            if not budget.fits(len(encoded)):
+                report['skipped'].append(name)
+                return
+            budget.bytes += len(encoded)
+            sections.append((name, encoded))
+
+        add('alert', {'type': alert_type, 'value': value, 'hostname': socket.gethostname(),
+                      'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(timestamp))})
+        add('pressure', read_pressure(os.path.join(self.proc_root, 'pressure')))
+        for name, source in self.sources.items():
+            if budget.exhausted():
+                report['skipped'].append(name)
+                continue
+            try:
+                add(name, source())
+            except Exception as e:
+                report['errors'][name] = str(e)
+
+        # Process table: one cheap stat read per PID, stopping where the CPU budget runs out
+        rows = []
+        pids = [entry for entry in os.listdir(self.proc_root) if entry.isdigit()]
+        for index, pid in enumerate(pids):
+            if index % 32 == 0 and budget.exhausted():
+                report['truncated'].append('processes')
+                break
+            row = read_process(pid, self.proc_root)
+            if row is not None:
+                rows.append(row)
+        rows.sort(key=lambda row: row[CPU if alert_type in CPU_ALERTS else RSS], reverse=True)
+
+        # Memory maps and descriptors only for the top consumers; smaps_rollup is the expensive read
+        top = []
+        for row in rows[:self.top_count]:
+            if budget.exhausted():
+                report['truncated'].append('top_processes')
+                break
+            pid = row[0]
+            top.append({'pid': pid, 'comm': row[3], 'cmdline': read_cmdline(pid, proc_root=self.proc_root),
+                        'rss_bytes': row[RSS], 'cpu_seconds': row[CPU],
+                        'smaps_rollup': read_smaps_rollup(pid, self.proc_root),
+                        'fds': count_fds(pid, self.proc_root)})
+        add('top_processes', top)
+
+        # Largest consumers first, so a full byte budget cuts off the least interesting rows
+        encoded_rows = []
+        size = len(PROCESS_COLUMNS) * 16 + 32
+        for row in rows:
+            encoded = json.dumps(row, separators=(',', ':')).encode()
+            if not budget.fits(size + len(encoded) + 1):
+                report['truncated'].append('processes')
+                break
+            encoded_rows.append(encoded)
+            size += len(encoded) + 1
+        budget.bytes += size
+        sections.append(('processes', b'{"columns":' + json.dumps(PROCESS_COLUMNS).encode()
+                         + b',"total":' + str(len(pids)).encode() + b',"rows":[' + b','.join(encoded_rows) + b']}'))
+
+        report['truncated'] = sorted(set(report['truncated']))
+        report['cpu_ms'] = budget.cpu_ms()
+        report['bytes'] = budget.bytes
+        return sections, report
+
+    def write(self, path: str, captured: Tuple[List[Tuple[str, bytes]], Dict[str, Any]]) -> str:
+        """Write the sections as one gzip JSON object atomically; returns 'truncated' or 'written'."""
+        sections, report = captured
+        temporary = f"{path}.tmp"
+        with gzip.open(temporary, 'wb', compresslevel=6) as f:
+            f.write(b'{')
+            for name, encoded in sections:
+                f.write(b'"' + name.encode() + b'":' + encoded + b',')
+            f.write(b'"budget":' + json.dumps(report).encode() + b'}')
+        os.replace(temporary, path)
+
+        outcome = 'truncated' if report['truncated'] or report['skipped'] else 'written'
+        self.logger.info(f"Forensik snapshot yozildi: {path} ({report['cpu_ms']} ms CPU, "
+                         f"{report['bytes'] // 1024} KB{', qisqartirildi' if outcome == 'truncated' else ''})")
+        return outcome
+
+    def prune(self) -> int:
+        """Delete snapshots older than the retention period or beyond the newest max_files; returns the count."""
+        snapshots = []
+        for entry in os.scandir(self.directory):
+            if SNAPSHOT_FILE.match(entry.name):
+                snapshots.append((entry.stat().st_mtime, entry.path))
+        snapshots.sort(reverse=True)
+        cutoff = time.time() - self.retention
+        removed = 0
+        for index, (mtime, path) in enumerate(snapshots):
+            if index >= self.max_files or mtime < cutoff:
+                try:
+                    os.unlink(path)
+                    removed += 1
+                except OSError as e:
+                    self.logger.warning(f"Eski snapshot o'chirilmadi ({path}): {str(e)}")
+        return removed
+
+    def stop(self) -> None:
+        """Let a running capture finish and stop the worker."""
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+
+def load_snapshot(path: str) -> Dict[str, Any]:
+    """Read a snapshot file back into a dictionary."""
+    with gzip.open(path, 'rb') as f:
+        return json.load(f)
+
+
+def main():
+    """Capture one snapshot into a directory, or summarise an existing snapshot file."""
+    parser = argparse.ArgumentParser(description='System Monitor forensic snapshot')
+    parser.add_argument('path', nargs='?', help='Snapshot file to summarise instead of capturing')
+    parser.add_argument('--dir', default='/tmp/memory-monitor-forensics', help='Directory for a new snapshot')
+    parser.add_argument('--alert-type', default='RAM', help='Alert type that ranks the top processes (default: RAM)')
+    parser.add_argument('--cpu-budget-ms', type=int, default=250, help='CPU-time budget (default: 250)')
+    parser.add_argument('--max-kb', type=int, default=1024, help='Uncompressed size budget (default: 1024)')
+    args = parser.parse_args()
+
+    path = args.path
+    if not path:
+        capture = ForensicCapture({'forensics_dir': args.dir, 'forensics_cpu_budget_ms': args.cpu_budget_ms,
+                                   'forensics_max_kb': args.max_kb, 'forensics_min_interval': 0})
+        path = capture.request(args.alert_type, 'manual')
+        capture.stop()
+
+    snapshot = load_snapshot(path)
+    processes = snapshot['processes']
+    print(f"{path}: {os.path.getsize(path) // 1024} KB on disk")
+    print(f"alert: {snapshot['alert']['type']} {snapshot['alert']['value']} at {snapshot['alert']['time']}")
+    print(f"budget: {snapshot['budget']}")
+    print(f"processes: {len(processes['rows'])} of {processes['total']}")
+    print("\nPID COMM RSS(MB) PSS(MB) SWAP(MB) FDS")
+    for process in snapshot['top_processes']:
+        smaps = process['smaps_rollup'] or {}
+        print(f"{process['pid']} {process['comm']} {process['rss_bytes'] / 1048576:.1f} "
+              f"{smaps.get('pss', 0) / 1048576:.1f} {smaps.get('swap', 0) / 1048576:.1f} {process['fds']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+History query API for System Monitor
+Read-only JSON over HTTP for stored metrics and alerts. Results are computed
+per epoch-aligned chunk of buckets and kept in an LRU cache, so a dashboard
+polling a sliding window only queries the database for the newest chunk
+"""
+
+import math
+import time
+import json
+import hashlib
+import logging
+import datetime
+import threading
+from array import array
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from db_handler import DatabaseHandler
+
+# Query name -> metrics table column
+METRIC_COLUMNS = OrderedDict([
+    ('ram', 'ram_usage'),
+    ('cpu', 'cpu_usage'),
+    ('disk', 'disk_usage'),
+    ('swap', 'swap_usage'),
+    ('load', 'load_average'),
+    ('network_rx', 'network_rx'),
+    ('network_tx', 'network_tx'),
+])
+METRICS = tuple(METRIC_COLUMNS)
+
+AGGREGATIONS = ('avg', 'min', 'max', 'sum', 'count', 'last')
+
+# Buckets per cached metrics chunk, and the span of a cached alerts chunk
+CHUNK_BUCKETS = 240
+ALERT_CHUNK_SECONDS = 3600
+
+# Response bodies are written in pieces of about this size
+STREAM_PIECE_BYTES = 65536
+
+NAN = float('nan')
+
+
+def parse_time(value: str, now: float) -> float:
+    """Epoch seconds (or milliseconds), ISO 8601, 'now' or 'now-<N>[smhd]' to epoch seconds."""
+    value = value.strip()
+    if value.startswith('now'):
+        offset = value[3:]
+        if not offset:
+            return now
+        units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+        if offset[0] != '-' or offset[-1] not in units:
+            raise ValueError(f"Invalid relative time: {value}")
+        return now - float(offset[1:-1]) * units[offset[-1]]
+    try:
+        number = float(value)
+    except ValueError:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    # Grafana and JavaScript clients send milliseconds
+    return number / 1000 if number > 1e11 else number
+
+
+def _epoch(value: Any) -> float:
+    """Database timestamp (ISO text from SQLite, datetime elsewhere) to epoch seconds."""
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+def _datetime(epoch: float) -> datetime.datetime:
+    # Rows are stored with naive local timestamps (datetime.now())
+    return datetime.datetime.fromtimestamp(epoch)
+
+
+class _Chunk:
+    """Computed result of one aligned time range; expires is 0 once the range is closed."""
+
+    __slots__ = ('start', 'data', 'digest', 'expires')
+
+    def __init__(self, start: float, data: Any, expires: float):
+        self.start = start
+        self.data = data
+        self.expires = expires
+        self.digest = hashlib.blake2b(repr(data).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ResultCache:
+    """Thread-safe LRU of computed chunks."""
+
+    def __init__(self, max_entries: int = 256):
+        """Initialize an empty cache."""
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Tuple, now: float) -> Optional[_Chunk]:
+        """Return a live chunk and mark it recently used."""
+        with self.lock:
+            chunk = self.entries.get(key)
+            if chunk is None:
+                return None
+            if chunk.expires and chunk.expires <= now:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return chunk
+
+    def put(self, key: Tuple, chunk: _Chunk) -> None:
+        """Store a chunk, evicting the least recently used ones over max_entries."""
+        with self.lock:
+            self.entries[key] = chunk
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class HistoryQuery:
+    """Answers metrics and alerts queries from a dedicated database connection through the cache."""
+
+    def __init__(self, config: Dict[str, Any], self_metrics=None):
+        """Open a connection of its own; iter_metrics does not hold the lock the monitor's writes use."""
+        self.config = config
+        self.self_metrics = self_metrics
+        self.logger = logging.getLogger('memory_monitor.history_api')
+        self.db = DatabaseHandler(config)
+        self.cache = ResultCache(config.get('history_api_cache_entries', 256))
+        self.open_ttl = config.get('history_api_open_ttl', 10)
+        self.settle = config.get('history_api_settle', 120)
+        self.max_points = config.get('history_api_max_points', 11000)
+        self.max_alert_hours = config.get('history_api_max_alert_hours', 168)
+
+    def _count(self, name: str, label: str) -> None:
+        if self.self_metrics is not None:
+            self.self_metrics.inc(name, labels=(label,))
+
+    def _chunk(self, key: Tuple, start: float, end: float, compute) -> _Chunk:
+        """Cached chunk for [start, end); ranges that may still receive rows expire after open_ttl."""
+        now = time.time()
+        chunk = self.cache.get(key, now)
+        if chunk is not None:
+            self._count('history_api_chunks_total', 'hit')
+            return chunk
+        # One query at a time on the shared connection; a poll that waited here finds the chunk cached
+        with self.db.lock:
+            chunk = self.cache.get(key, now)
+            if chunk is not None:
+                self._count('history_api_chunks_total', 'hit')
+                return chunk
+            data = compute(start, end)
+            closed = end <= now - self.settle
+            chunk = _Chunk(start, data, 0 if closed else now + self.open_ttl)
+            self.cache.put(key, chunk)
+            self._count('history_api_chunks_total', 'miss')
+            return chunk
+
+    def _metrics_chunk(self, host: str, step: int, agg: str, start: float, end: float) -> Dict[str, array]:
+        """{hostname: array} with CHUNK_BUCKETS x len(METRICS) values (NaN for empty buckets)."""
+        columns = tuple(METRIC_COLUMNS.values())
+        width = len(columns)
+        values = {}
+        counts = {}  # Samples per value, only needed to turn avg sums into means
+        for row in self.db.iter_metrics(_datetime(start), _datetime(end), host or None):
+            bucket = int((_epoch(row['timestamp']) - start) // step)
+            if not 0 <= bucket < CHUNK_BUCKETS:
+                continue
+            hostname = row['hostname']
+            if hostname not in values:
+                values[hostname] = array('d', [NAN]) * (CHUNK_BUCKETS * width)
+                if agg == 'avg':
+                    counts[hostname] = array('l', [0]) * (CHUNK_BUCKETS * width)
+            host_values = values[hostname]
+            base = bucket * width
+            for offset, column in enumerate(columns):
+                value = row[column]
+                if value is None:
+                    continue
+                index = base + offset
+                current = host_values[index]
+                if agg == 'avg':
+                    counts[hostname][index] += 1
+                if agg == 'last' or current != current:
+                    host_values[index] = float(value) if agg != 'count' else 1.0
+                elif agg in ('avg', 'sum'):
+                    host_values[index] = current + value
+                elif agg == 'min':
+                    host_values[index] = min(current, value)
+                elif agg == 'max':
+                    host_values[index] = max(current, value)
+                elif agg == 'count':
+                    host_values[index] = current + 1
+        if agg == 'avg':
+            for hostname, host_values in values.items():
+                host_counts = counts[hostname]
+                for index, count in enumerate(host_counts):
+                    if count:
+                        host_values[index] /= count
+        return values
+
+    def _alerts_chunk(self, host: str, start: float, end: float) -> List[Tuple]:
+        """(epoch, hostname, alert_type, value, message, sent_successfully, snapshot) rows of the range."""
+        return [(_epoch(row['timestamp']), row['hostname'], row['alert_type'], row['value'], row['message'],
+                 bool(row['sent_successfully']), row['snapshot'])
+                for row in self.db.iter_alerts(_datetime(start), _datetime(end), host or None)]
+
+    def metrics(self, params: Dict[str, str]) -> Tuple[str, bool, Iterator[str]]:
+        """Resolve a metrics query into (etag, closed, body pieces)."""
+        now = time.time()
+        end = parse_time(params.get('end', 'now'), now)
+        start = parse_time(params.get('start', 'now-1h'), now)
+        step = int(params.get('step', 60))
+        agg = params.get('agg', 'avg')
+        host = params.get('host', '')
+        names = [name.strip() for name in params.get('metric', ','.join(METRICS)).split(',') if name.strip()]
+        if step < 1:
+            raise ValueError("step must be at least 1 second")
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"agg must be one of {', '.join(AGGREGATIONS)}")
+        unknown = [name for name in names if name not in METRIC_COLUMNS]
+        if unknown or not names:
+            raise ValueError(f"metric must be a comma separated subset of {', '.join(METRICS)}")
+        # Buckets are aligned to the epoch, so the same bucket means the same range in every request
+        start = math.floor(start / step) * step
+        end = math.ceil(end / step) * step
+        if end <= start:
+            raise ValueError("end must be after start")
+        if (end - start) / step * len(names) > self.max_points:
+            raise ValueError(f"More than {self.max_points} points requested; increase step")
+
+        span = step * CHUNK_BUCKETS
+        chunks = []
+        chunk_start = math.floor(start / span) * span
+        while chunk_start < end:
+            key = ('metrics', host, step, agg, chunk_start)
+            chunks.append(self._chunk(key, chunk_start, chunk_start + span,
+                                      lambda s, e: self._metrics_chunk(host, step, agg, s, e)))
+            chunk_start += span
+
+        etag = self._etag(('metrics', start, end, step, agg, host, tuple(names)), chunks)
+        closed = all(not chunk.expires for chunk in chunks)
+        return etag, closed, self._metrics_body(chunks, names, start, end, step, agg)
+
+    def _metrics_body(self, chunks: List[_Chunk], names: List[str], start: float, end: float,
+                      step: int, agg: str) -> Iterator[str]:
+        width = len(METRICS)
+        hosts = sorted({hostname for chunk in chunks for hostname in chunk.data})
+        yield json.dumps({'start': start, 'end': end, 'step': step, 'agg': agg})[:-1] + ', "series": ['
+        first = True
+        for hostname in hosts:
+            for name in names:
+                offset = METRICS.index(name)
+                yield ('' if first else ',') + json.dumps({'host': hostname, 'metric': name})[:-1] + ', "points": ['
+                first = False
+                separator = ''
+                for chunk in chunks:
+                    host_values = chunk.data.get(hostname)
+                    if host_values is None:
+                        continue
+                    points = []
+                    for bucket in range(CHUNK_BUCKETS):
+                        timestamp = int(chunk.start) + bucket * step
+                        value = host_values[bucket * width + offset]
+                        if start <= timestamp < end and value == value:
+                            points.append(f"[{timestamp},{round(value, 3)}]")
+                    if points:
+                        yield separator + ','.join(points)
+                        separator = ','
+                yield ']}'
+        yield ']}'
+
+    def alerts(self, params: Dict[str, str]) -> Tuple[str, bool, Iterator[str]]:
+        """Resolve an alerts query into (etag, closed, body pieces)."""
+        now = time.time()
+        end = parse_time(params.get('end', 'now'), now)
+        start = parse_time(params.get('start', 'now-24h'), now)
+        host = params.get('host', '')
+        types = {name.strip().lower() for name in params.get('type', '').split(',') if name.strip()}
+        if end <= start:
+            raise ValueError("end must be after start")
+        # Every hour is a query and a cache entry, so a long range would also evict the metrics chunks
+        if end - start > self.max_alert_hours * 3600:
+            raise ValueError(f"More than {self.max_alert_hours} hours of alerts requested; narrow start/end")
+
+        chunks = []
+        chunk_start = math.floor(start / ALERT_CHUNK_SECONDS) * ALERT_CHUNK_SECONDS
+        while chunk_start < end:
+            key = ('alerts', host, chunk_start)
+            chunks.append(self._chunk(key, chunk_start, chunk_start + ALERT_CHUNK_SECONDS,
+                                      lambda s, e: self._alerts_chunk(host, s, e)))
+            chunk_start += ALERT_CHUNK_SECONDS
+
+        etag = self._etag(('alerts', start, end, host, tuple(sorted(types))), chunks)
+        closed = all(not chunk.expires for chunk in chunks)
+        return etag, closed, self._alerts_body(chunks, start, end, types)
+
+    def _alerts_body(self, chunks: List[_Chunk], start: float, end: float, types) -> Iterator[str]:
+        yield json.dumps({'start': start, 'end': end})[:-1] + ', "alerts": ['
+        separator = ''
+        for chunk in chunks:
+            pieces = []
+            for timestamp, hostname, alert_type, value, message, sent, snapshot in chunk.data:
+                if start <= timestamp < end and (not types or alert_type.lower() in types):
+                    pieces.append(json.dumps({'timestamp': timestamp, 'host': hostname, 'type': alert_type,
+                                              'value': value, 'message': message, 'sent': sent,
+                                              'snapshot': snapshot},
+                                             ensure_ascii=False))
+            if pieces:
+                yield separator + ','.join(pieces)
+                separator = ','
+        yield ']}'
+
+    @staticmethod
+    def _etag(query: Tuple, chunks: List[_Chunk]) -> str:
+        """Strong validator from the query and the content digests of its chunks."""
+        digest = hashlib.blake2b(repr(query).encode('utf-8'), digest_size=12)
+        for chunk in chunks:
+            digest.update(chunk.digest.encode('ascii'))
+        return f'"{digest.hexdigest()}"'
+
+    def close(self) -> None:
+        """Close the dedicated database connection."""
+        self.db.close()
+
+
+class _HistoryHandler(BaseHTTPRequestHandler):
+    # Chunked transfer encoding needs HTTP/1.1
+    protocol_version = 'HTTP/1.1'
+
+    def _send_json(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.query._count('history_api_responses_total', str(status))
+
+    def _stream(self, etag: str, closed: bool, pieces: Iterator[str]) -> None:
+        query = self.server.query
+        headers = [('ETag', etag),
+                   # Fully settled ranges never change; anything touching the present must be revalidated
+                   ('Cache-Control', 'max-age=3600' if closed else 'no-cache')]
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            query._count('history_api_responses_total', '304')
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        buffered = []
+        size = 0
+        for piece in pieces:
+            buffered.append(piece)
+            size += len(piece)
+            if size >= STREAM_PIECE_BYTES:
+                self._write_chunk(''.join(buffered).encode('utf-8'))
+                buffered, size = [], 0
+        if buffered:
+            self._write_chunk(''.join(buffered).encode('utf-8'))
+        self.wfile.write(b'0\r\n\r\n')
+        query._count('history_api_responses_total', '200')
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+
+    def do_GET(self):
+        query = self.server.query
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/api/v1/metrics':
+                self._stream(*query.metrics(params))
+            elif url.path == '/api/v1/alerts':
+                self._stream(*query.alerts(params))
+            elif url.path in ('/api/v1', '/api/v1/'):
+                self._send_json(200, {'metrics': list(METRICS), 'aggregations': list(AGGREGATIONS),
+                                      'cached_chunks': len(query.cache)})
+            else:
+                self._send_json(404, {'error': 'GET /api/v1/metrics or /api/v1/alerts'})
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The dashboard gave up on the request
+        except Exception as e:
+            query.logger.error(f"History query failed: {str(e)}")
+            self._send_json(500, {'error': 'query failed'})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HistoryAPIServer(ThreadingHTTPServer):
+    """HTTP listener for HistoryQuery."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, config: Dict[str, Any], query: HistoryQuery):
+        """Bind to history_api_listen:history_api_port."""
+        self.query = query
+        self.thread = None
+        super().__init__((config.get('history_api_listen', '127.0.0.1'), config.get('history_api_port', 9091)),
+                         _HistoryHandler)
+
+    def start(self) -> None:
+        """Serve in a background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, name='history-api', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop serving, close the listening socket and the query connection."""
+        self.shutdown()
+        self.server_close()
+        self.query.close()
@@ -33,6 +33,13 @@ SYSTEMD_DIR="/etc/systemd/system"
 mkdir -p "$INSTALL_DIR"
 mkdir -p "$CONFIG_DIR"
 
+# Python daemon bog'liqliklarini tekshirish
+if ! python3 -c "import psutil, requests" 2>/dev/null; then
+   echo -e "${RED}python3, psutil va requests kerak.${NC}" 1>&2
+   echo -e "${YELLOW}Maslahat: 'sudo apt install python3-psutil python3-requests'${NC}" 1>&2
+   exit 1
+fi
+
 # Telegram Bot sozlamalari
 echo -e "${BLUE}Telegram sozlamalari${NC}"
 echo -e "${YELLOW}Telegram Bot yaratish uchun @BotFather ga murojaat qiling${NC}"
@@ -115,7 +122,11 @@ EOF
 # Asosiy skriptni o'rnatish
 echo -e "${GREEN}Monitoring skriptini o'rnatish...${NC}"
 
-# Skript faylini nusxalash
+# Python modullarini nusxalash (xizmat memory_monitor.py ni ishga tushiradi)
+cp "$(dirname "$0")"/*.py "$INSTALL_DIR/"
+chmod +x "$INSTALL_DIR/memory_monitor.py"
+
+# Eski shell skripti ham qoladi (ExecStart ni unga qaytarish mumkin)
 cp "$(dirname "$0")/memory-monitor.sh" "$INSTALL_DIR/memory-monitor.sh"
 chmod +x "$INSTALL_DIR/memory-monitor.sh"
 
@@ -129,7 +140,7 @@ After=network.target
 
 [Service]
 Type=simple
-ExecStart=$INSTALL_DIR/memory-monitor.sh
+ExecStart=/usr/bin/python3 $INSTALL_DIR/memory_monitor.py --config $CONFIG_DIR/config.conf
 Restart=always
 RestartSec=10
 StandardOutput=syslog
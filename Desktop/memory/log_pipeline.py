@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Logging pipeline for System Monitor
+Log calls only enqueue the record; a listener thread formats it and writes
+to the (optionally rotating) file and console, so slow disks or a journald
+backlog never stall the monitoring cycle
+"""
+
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from typing import Dict, Any, List
+
+LOG_LEVELS = {
+    'DEBUG': logging.DEBUG,
+    'INFO': logging.INFO,
+    'WARNING': logging.WARNING,
+    'ERROR': logging.ERROR,
+}
+
+TEXT_FORMAT = '%(asctime)s - [%(levelname)s] - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JsonLineFormatter(logging.Formatter):
+    """One compact JSON object per record: ts, level, logger, msg and exc when present."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records when the queue is full instead of blocking or raising."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the arguments here; timestamps, layout and JSON are done on the listener thread
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _file_handler(config: Dict[str, Any]) -> logging.Handler:
+    path = config['log_file']
+    rotate = config.get('log_rotate', 'none')
+    if rotate == 'size':
+        return logging.handlers.RotatingFileHandler(
+            path, maxBytes=config.get('log_max_mb', 50) * 1024 * 1024,
+            backupCount=config.get('log_backup_count', 5), encoding='utf-8')
+    if rotate == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=config.get('log_rotate_when', 'midnight'),
+            backupCount=config.get('log_backup_count', 5), encoding='utf-8')
+    # No built-in rotation: reopen the file when an external logrotate moves it
+    return logging.handlers.WatchedFileHandler(path, encoding='utf-8')
+
+
+def setup_log_pipeline(config: Dict[str, Any]) -> DroppingQueueHandler:
+    """Route the root logger through a queue to file/console handlers and return the queue handler."""
+    level = LOG_LEVELS.get(config.get('log_level', 'INFO'), logging.INFO)
+    if config.get('log_format', 'text') == 'json':
+        formatter = JsonLineFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+    handlers: List[logging.Handler] = []
+    file_handler = _file_handler(config)
+    file_handler.setLevel(level)
+    file_handler.setFormatter(formatter)
+    handlers.append(file_handler)
+
+    console_level = config.get('log_console_level', 'ERROR')
+    if console_level in LOG_LEVELS:
+        # Under systemd this is the journal; only what is worth a second copy goes there
+        console = logging.StreamHandler(sys.stderr)
+        console.setLevel(max(LOG_LEVELS[console_level], level))
+        console.setFormatter(formatter)
+        handlers.append(console)
+
+    queue_handler = DroppingQueueHandler(queue.Queue(config.get('log_queue_size', 10000)))
+    listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger('')
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    # Records below every handler's level are rejected by Logger.isEnabledFor before a record is built
+    root.setLevel(min(handler.level for handler in handlers))
+
+    listener.start()
+    # Drain what is still queued when the process exits
+    atexit.register(listener.stop)
+    return queue_handler
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Memory self-diagnostics for System Monitor
+Keeps the daemon's own RSS under a configured budget and serves a local
+endpoint that starts and stops tracemalloc at runtime and reports the top
+allocation sites, so growth on small VMs can be traced without a restart
+"""
+
+import os
+import gc
+import json
+import logging
+import threading
+import tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+try:
+    import ctypes
+    # glibc only; returns freed heap pages at the top of the arena and in free bins to the kernel
+    _malloc_trim = ctypes.CDLL(None).malloc_trim
+    MALLOC_TRIM_AVAILABLE = True
+except (ImportError, OSError, AttributeError):
+    _malloc_trim = None
+    MALLOC_TRIM_AVAILABLE = False
+
+GROUP_BY = ('lineno', 'filename', 'traceback')
+
+# Sites remembered from the previous report for the size/count diff
+MAX_PREVIOUS_SITES = 500
+
+# tracemalloc's own frames and import machinery are noise in the report
+TRACE_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+
+def read_rss() -> Optional[int]:
+    """Resident set size of this process in bytes, from /proc/self/statm."""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class MemoryDiagnostics:
+    """RSS budget enforcement and tracemalloc reports for the running monitor."""
+
+    def __init__(self, config: Dict[str, Any], sizes: Callable[[], Dict[str, int]],
+                 release: Callable[[], None]):
+        """Initialize with the callables that report and drop the monitor's cache sizes."""
+        self.config = config
+        self.logger = logging.getLogger('memory_monitor.memory')
+        self.budget = config.get('memory_budget_mb', 0) * 1024 * 1024
+        self.frames = max(1, config.get('memory_diag_frames', 5))
+        self.sizes = sizes
+        self.release = release
+        self.lock = threading.Lock()
+        self.previous = {}
+        self.trims = 0
+        self.over_budget = False
+
+    def start(self, frames: Optional[int] = None) -> Dict[str, Any]:
+        """Start tracing allocations; already traced memory is not attributed."""
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(max(1, frames or self.frames))
+                self.previous = {}
+                self.logger.info(f"tracemalloc yoqildi ({tracemalloc.get_traceback_limit()} frame)")
+            return self.status()
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop tracing and free the traces."""
+        with self.lock:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+                self.previous = {}
+                self.logger.info("tracemalloc o'chirildi")
+            return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        """Whether tracemalloc runs and what it costs."""
+        tracing = tracemalloc.is_tracing()
+        traced, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        return {
+            'tracing': tracing,
+            'frames': tracemalloc.get_traceback_limit() if tracing else 0,
+            'traced_bytes': traced,
+            'traced_peak_bytes': peak,
+            'overhead_bytes': tracemalloc.get_tracemalloc_memory() if tracing else 0,
+        }
+
+    def top_sites(self, limit: int = 20, group_by: str = 'lineno') -> List[Dict[str, Any]]:
+        """Largest allocation sites, with the change since the previous report."""
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        snapshot = tracemalloc.take_snapshot().filter_traces(TRACE_FILTERS)
+        statistics = snapshot.statistics(group_by)
+        del snapshot
+
+        sites = []
+        current = {}
+        for stat in statistics:
+            if group_by == 'filename':
+                site = stat.traceback[0].filename
+            else:
+                # Most recent call first, like tracemalloc's own traceback ordering
+                site = ' <- '.join(f"{frame.filename}:{frame.lineno}" for frame in stat.traceback)
+            if len(current) < MAX_PREVIOUS_SITES:
+                current[site] = (stat.size, stat.count)
+            if len(sites) < limit:
+                previous_size, previous_count = self.previous.get(site, (0, 0))
+                sites.append({
+                    'site': site,
+                    'size_bytes': stat.size,
+                    'count': stat.count,
+                    'size_diff_bytes': stat.size - previous_size,
+                    'count_diff': stat.count - previous_count,
+                })
+        self.previous = current
+        return sites
+
+    def report(self, limit: int = 20, group_by: str = 'lineno') -> Dict[str, Any]:
+        """RSS, budget, cache sizes and, while tracing, the top allocation sites."""
+        with self.lock:
+            report = {
+                'rss_bytes': read_rss(),
+                'budget_bytes': self.budget,
+                'budget_trims': self.trims,
+                'gc_counts': gc.get_count(),
+                'caches': self.sizes(),
+                'tracemalloc': self.status(),
+            }
+            if tracemalloc.is_tracing():
+                report['top'] = self.top_sites(limit, group_by)
+            return report
+
+    def enforce_budget(self) -> Optional[Tuple[int, int]]:
+        """Drop caches and return freed heap to the kernel when RSS is over budget; (before, after) bytes."""
+        rss = read_rss()
+        if not self.budget or rss is None or rss <= self.budget:
+            self.over_budget = False
+            return None
+        self.over_budget = True
+        self.release()
+        gc.collect()
+        if MALLOC_TRIM_AVAILABLE:
+            _malloc_trim(0)
+        self.trims += 1
+        return rss, read_rss() or rss
+
+
+class _DiagnosticsHandler(BaseHTTPRequestHandler):
+    def _send_json(self, status: int, body: Any) -> None:
+        data = json.dumps(body, indent=2).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self, method: str) -> None:
+        diagnostics = self.server.diagnostics
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if method == 'GET' and url.path == '/memory':
+                self._send_json(200, diagnostics.report(int(query.get('limit', 20)),
+                                                        query.get('group_by', 'lineno')))
+            elif method == 'POST' and url.path == '/memory/start':
+                frames = int(query['frames']) if 'frames' in query else None
+                self._send_json(200, diagnostics.start(frames))
+            elif method == 'POST' and url.path == '/memory/stop':
+                self._send_json(200, diagnostics.stop())
+            else:
+                self._send_json(404, {'error': 'GET /memory, POST /memory/start?frames=N, POST /memory/stop'})
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MemoryDiagnosticsServer(ThreadingHTTPServer):
+    """Local HTTP endpoint for MemoryDiagnostics."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, config: Dict[str, Any], diagnostics: MemoryDiagnostics):
+        """Bind to memory_diag_listen:memory_diag_port (loopback by default)."""
+        self.diagnostics = diagnostics
+        self.thread = None
+        super().__init__((config.get('memory_diag_listen', '127.0.0.1'), config.get('memory_diag_port', 9102)),
+                         _DiagnosticsHandler)
+
+    def start(self) -> None:
+        """Serve in a background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, name='memory-diagnostics', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and close the listening socket."""
+        self.shutdown()
+        self.server_close()
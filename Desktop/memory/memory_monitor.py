@@ -17,10 +17,33 @@ import subprocess
 import platform
 import socket
 import json
+import threading
 import requests
 from datetime import datetime
 import psutil
 
+from db_handler import DatabaseHandler
+from prometheus_exporter import PrometheusExporter
+from self_metrics import SelfMetrics
+from procfs_reader import ProcReader, PROCFS_AVAILABLE, SmapsCache, cpu_percent
+from cgroup_collector import CgroupCollector, DEFAULT_CGROUP_ROOT
+from process_groups import ProcessGroupAggregator
+from proc_scanner import ParallelProcScanner
+from psi_monitor import PsiCollector, PsiTriggerWatcher, PSI_AVAILABLE, DEFAULT_TRIGGERS, parse_triggers
+from zabbix_sender import ZabbixSender
+from zabbix_agent import PassiveCheckResponder, PassiveCheckServer, AgentSnapshot
+from discovery import DiscoveryCache, DEFAULT_FS_TYPES, DEFAULT_IF_EXCLUDE
+from remote_write import RemoteWriteClient
+from shell_config import read_shell_config, apply_shell_config
+from log_pipeline import setup_log_pipeline
+from alert_rules import AlertRuleEngine, series_from_metrics
+from history_api import HistoryQuery, HistoryAPIServer
+from memory_diagnostics import MemoryDiagnostics, MemoryDiagnosticsServer, read_rss
+from scheduler import ProbeScheduler, DEFAULT_INTERVALS
+from socket_stats import SocketStatsCollector
+from numa_collector import NumaCollector
+from forensics import ForensicCapture, DEFAULT_FORENSICS_DIR
+
 # Default configuration values
 DEFAULT_CONFIG_FILE = "/etc/memory-monitor/config.conf"
 DEFAULT_LOG_FILE = "/var/log/memory_monitor.log"
@@ -28,12 +51,45 @@ DEFAULT_THRESHOLD = 80
 DEFAULT_INTERVAL = 60
 DEFAULT_LOG_LEVEL = "INFO"
 
+# Alert type -> metrics key it is raised from
+ALERT_METRICS = {'RAM': 'ram', 'CPU': 'cpu', 'Disk': 'disk', 'Swap': 'swap', 'Load': 'load',
+                 'Network': 'network', 'Pressure': 'pressure', 'Socket': 'sockets', 'NUMA': 'numa'}
+
 class SystemMonitor:
     def __init__(self, config_file=DEFAULT_CONFIG_FILE):
         """Initialize the SystemMonitor with the given configuration file."""
         self.config_file = config_file
         self.config = self._load_config()
         self._setup_logging()
+        self.self_metrics = SelfMetrics(self.config['self_metrics_enabled'])
+        self.db_handler = DatabaseHandler(self.config)
+        self.history_api = self._setup_history_api()
+        self.prometheus_exporter = PrometheusExporter(self.config, self_metrics=self.self_metrics)
+        self.remote_write = self._setup_remote_write()
+        self.zabbix_sender = ZabbixSender(self.config)
+        self.proc_reader = self._setup_proc_reader()
+        self.cgroup_collector = self._setup_cgroup_collector()
+        self.alert_lock = threading.Lock()
+        self.smaps_cache = SmapsCache(ttl=self.config['smaps_cache_ttl'])
+        self.process_groups = self._setup_process_groups()
+        self.proc_scanner = self._setup_proc_scanner()
+        self.last_process_groups = []
+        self.psi_collector, self.psi_watcher = self._setup_pressure()
+        self.socket_stats = self._setup_socket_stats()
+        self.last_sockets = None
+        self.numa_collector = self._setup_numa()
+        self.last_numa = None
+        self.zabbix_agent = self._setup_zabbix_agent()
+        self.discovery = self._setup_discovery()
+        self.memory_diagnostics = self._setup_memory_diagnostics()
+        self.alert_rules = self._setup_alert_rules()
+        self.scheduler = self._setup_scheduler()
+        self.forensics = self._setup_forensics()
+        self.last_cpu_times = None
+        self.cpu_percent_primed = False  # psutil.cpu_percent has a previous sample to diff against
+        self.last_net_counters = None
+        self.last_filesystems = {}
+        self.last_discovery_sent = 0
         self.last_alert_times = {
             'ram': 0,
             'cpu': 0,
@@ -49,7 +105,7 @@ class SystemMonitor:
         # Test Telegram connection at startup
         self.test_telegram_connection()
 
-    def _load_config(self):
+    def _load_config(self, require_telegram=True):
         """Load configuration from file or use defaults."""
         config = {
             'bot_token': "",
@@ -58,9 +114,28 @@ class SystemMonitor:
             'threshold': DEFAULT_THRESHOLD,
             'check_interval': DEFAULT_INTERVAL,
             'log_level': DEFAULT_LOG_LEVEL,
+            'log_format': "text",  # text or json (one compact JSON object per line)
+            'log_rotate': "none",  # none (external logrotate), size or time
+            'log_max_mb': 50,
+            'log_backup_count': 5,
+            'log_rotate_when': "midnight",  # TimedRotatingFileHandler 'when' for log_rotate = time
+            'log_console_level': "ERROR",  # Console/journal copy from this level; empty disables it
+            'alert_rules_file': "",  # Declarative rules evaluated in addition to the fixed thresholds
+            'log_queue_size': 10000,  # Records beyond this are dropped rather than blocking a cycle
+            # Per-probe intervals that tighten near a threshold (check_interval then only paces storage/export)
+            'schedule_enabled': False,
+            'schedule_intervals': DEFAULT_INTERVALS,
+            'schedule_min_interval': 5,
+            'schedule_idle_factor': 2,  # Idle probes stretch up to this multiple of their interval
+            'schedule_approach_percent': 80,  # Tighten once a metric reaches this share of its threshold
+            'schedule_change_percent': 10,  # ...or moves by this share of its threshold between samples
             'alert_message_title': "🛑 SYSTEM MONITOR ALERT",
             'include_top_processes': True,
             'top_processes_count': 10,
+            'procfs_fast_path': False,
+            'process_memory_detail': True,
+            'smaps_cache_ttl': 30,
+            'record_file': "",  # JSON lines of every sample, for replay.py
             'monitor_cpu': True,
             'cpu_threshold': 90,
             'monitor_disk': True,
@@ -73,6 +148,49 @@ class SystemMonitor:
             'monitor_network': True,
             'network_interface': "",
             'network_threshold': 90,
+            # TCP/UDP socket states from /proc/net
+            'monitor_sockets': False,
+            'socket_top_remotes': 10,
+            'socket_listen_overflow_alert': True,  # Alert whenever the accept queue dropped connections
+            'socket_ephemeral_threshold': 80,  # Percent of the ephemeral range used towards one destination
+            'socket_time_wait_threshold': 0,  # TIME_WAIT sockets; 0 disables
+            # cgroup v2 monitoring
+            'monitor_cgroups': False,
+            'cgroup_root': DEFAULT_CGROUP_ROOT,
+            'cgroup_max_depth': 0,
+            'cgroup_max_groups': 5000,
+            'cgroup_scan_budget': 200,
+            'cgroup_rescan_interval': 60,
+            'cgroup_memory_threshold': 90,
+            'cgroup_throttle_threshold': 50,
+            'cgroup_memory_thresholds': "",
+            'cgroup_throttle_thresholds': "",
+            'cgroup_aware_ram': False,
+            # Process group aggregation
+            'process_groups_enabled': False,
+            'process_group_by': "name",  # name, user, cgroup, subtree
+            'process_groups_count': 10,
+            'process_scan_workers': 0,  # 0 = psutil scan, >0 = /proc scan across this many worker processes
+            'process_scan_parallel_min': 5000,  # Below this many PIDs the /proc scan stays in-process
+            # Pressure Stall Information
+            'monitor_pressure': False,
+            'pressure_cpu_threshold': 50,
+            'pressure_memory_threshold': 10,
+            'pressure_io_threshold': 20,
+            'pressure_triggers': DEFAULT_TRIGGERS,
+            # Per NUMA node memory, hugepages and THP
+            'monitor_numa': False,
+            'numa_memory_threshold': 90,  # Used percent of any single node
+            'numa_miss_threshold': 0,  # Percent of a node's allocations served remotely; 0 disables
+            # Forensic snapshots written in the background when an alert fires
+            'forensics_enabled': False,
+            'forensics_dir': DEFAULT_FORENSICS_DIR,
+            'forensics_cpu_budget_ms': 250,  # CPU time one capture may use
+            'forensics_max_kb': 1024,  # Uncompressed size of one snapshot
+            'forensics_top_processes': 10,  # Processes whose smaps_rollup and descriptors are read
+            'forensics_min_interval': 300,  # Seconds between two captures
+            'forensics_retention_days': 7,
+            'forensics_max_files': 200,
             # Database integration settings
             'db_enabled': False,
             'db_type': "sqlite",  # sqlite, mysql, postgresql
@@ -81,33 +199,103 @@ class SystemMonitor:
             'db_name': "system_monitor",
             'db_user': "",
             'db_password': "",
+            'db_path': "/var/lib/memory-monitor/metrics.db",
+            # Read-only JSON API over the stored history
+            'history_api_enabled': False,
+            'history_api_listen': "127.0.0.1",
+            'history_api_port': 9091,
+            'history_api_cache_entries': 256,
+            'history_api_open_ttl': 10,  # Seconds a chunk that may still get rows is reused
+            'history_api_settle': 120,  # Chunks older than this are final and cached until evicted
+            'history_api_max_points': 11000,
+            'history_api_max_alert_hours': 168,  # Longest alerts range, one cached chunk per hour
             # Prometheus integration settings
             'prometheus_enabled': False,
-            'prometheus_port': 9090
+            'prometheus_port': 9090,
+            'self_metrics_enabled': False,
+            # Prometheus remote_write push
+            'remote_write_enabled': False,
+            'remote_write_url': "",
+            'remote_write_username': "",
+            'remote_write_password': "",
+            'remote_write_labels': "",  # Extra labels, e.g. "job=system_monitor,instance=web-1"
+            'remote_write_shards': 2,
+            'remote_write_queue_capacity': 10000,
+            'remote_write_max_samples_per_send': 500,
+            'remote_write_batch_deadline': 5,
+            'remote_write_timeout': 10,
+            'remote_write_wal_dir': "/var/lib/memory-monitor/wal",
+            'remote_write_wal_max_mb': 64,
+            # Zabbix trapper (sender protocol) integration
+            'zabbix_enabled': False,
+            'zabbix_server': "localhost",
+            'zabbix_port': 10051,
+            'zabbix_host': "",  # Zabbix host name; system hostname if empty
+            'zabbix_key_prefix': "memory_monitor",
+            'zabbix_batch_cycles': 1,
+            'zabbix_buffer_size': 100000,
+            'zabbix_compress': True,
+            'zabbix_timeout': 5,
+            # Zabbix passive checks answered from the latest sample
+            'zabbix_agent_enabled': False,
+            'zabbix_agent_listen': "0.0.0.0",
+            'zabbix_agent_port': 10050,
+            'zabbix_agent_allowed': "",  # Comma separated server/proxy addresses; any if empty
+            'zabbix_agent_fs_paths': "/",  # Filesystems answered by vfs.fs.size (disk_path is always included)
+            # Low-level discovery of filesystems, interfaces and process groups
+            'discovery_enabled': False,
+            'discovery_fs_types': DEFAULT_FS_TYPES,
+            'discovery_if_exclude': DEFAULT_IF_EXCLUDE,
+            'discovery_group_min_rss_mb': 100,
+            'discovery_group_min_cpu': 5,
+            'discovery_group_hold': 3600,
+            'discovery_resend_interval': 3600,
+            # Own memory footprint
+            'memory_budget_mb': 0,  # Drop caches and trim the heap above this RSS; 0 disables
+            'memory_diag_enabled': False,
+            'memory_diag_listen': "127.0.0.1",
+            'memory_diag_port': 9102,
+            'memory_diag_frames': 5
         }
         
         if not os.path.exists(self.config_file):
-            print(f"XATO: Konfiguratsiya fayli topilmadi: {self.config_file}")
-            print("Standart konfiguratsiya qiymatlari ishlatiladi.")
+            print(f"XATO: Konfiguratsiya fayli topilmadi: {self.config_file}", file=sys.stderr)
+            print("Standart konfiguratsiya qiymatlari ishlatiladi.", file=sys.stderr)
             return config
         
         try:
+            # memory-monitor.sh style KEY=VALUE file, as installed by install.sh
+            shell_values = read_shell_config(self.config_file)
+            if shell_values is not None:
+                unknown = apply_shell_config(config, shell_values)
+                if unknown:
+                    print(f"Noma'lum sozlamalar e'tiborsiz qoldirildi: {', '.join(unknown)}", file=sys.stderr)
+            
             # Read configuration file
             parser = configparser.ConfigParser()
-            parser.read(self.config_file)
+            if shell_values is None:
+                parser.read(self.config_file)
             
             # General settings
             if 'General' in parser:
-                for key in ['bot_token', 'chat_id', 'log_file', 'log_level', 'alert_message_title']:
+                for key in ['bot_token', 'chat_id', 'log_file', 'log_level', 'alert_message_title', 'record_file',
+                            'log_format', 'log_rotate', 'log_rotate_when', 'log_console_level', 'alert_rules_file',
+                            'schedule_intervals']:
                     if key in parser['General']:
                         config[key] = parser['General'][key]
                 
-                for key in ['threshold', 'check_interval', 'top_processes_count']:
+                for key in ['threshold', 'check_interval', 'top_processes_count', 'smaps_cache_ttl',
+                            'log_max_mb', 'log_backup_count', 'log_queue_size', 'schedule_min_interval',
+                            'schedule_idle_factor', 'schedule_approach_percent', 'schedule_change_percent']:
                     if key in parser['General']:
                         config[key] = parser['General'].getint(key)
                 
                 if 'include_top_processes' in parser['General']:
                     config['include_top_processes'] = parser['General'].getboolean('include_top_processes')
+                
+                for key in ['procfs_fast_path', 'process_memory_detail', 'schedule_enabled']:
+                    if key in parser['General']:
+                        config[key] = parser['General'].getboolean(key)
             
             # CPU monitoring
             if 'CPU' in parser:
@@ -147,16 +335,82 @@ class SystemMonitor:
                     config['network_interface'] = parser['Network']['network_interface']
                 if 'network_threshold' in parser['Network']:
                     config['network_threshold'] = parser['Network'].getint('network_threshold')
+                for key in ['monitor_sockets', 'socket_listen_overflow_alert']:
+                    if key in parser['Network']:
+                        config[key] = parser['Network'].getboolean(key)
+                for key in ['socket_top_remotes', 'socket_ephemeral_threshold', 'socket_time_wait_threshold']:
+                    if key in parser['Network']:
+                        config[key] = parser['Network'].getint(key)
+            
+            # cgroup v2 monitoring
+            if 'Cgroup' in parser:
+                for key in ['monitor_cgroups', 'cgroup_aware_ram']:
+                    if key in parser['Cgroup']:
+                        config[key] = parser['Cgroup'].getboolean(key)
+                for key in ['cgroup_max_depth', 'cgroup_max_groups', 'cgroup_scan_budget', 'cgroup_rescan_interval',
+                            'cgroup_memory_threshold', 'cgroup_throttle_threshold']:
+                    if key in parser['Cgroup']:
+                        config[key] = parser['Cgroup'].getint(key)
+                for key in ['cgroup_root', 'cgroup_memory_thresholds', 'cgroup_throttle_thresholds']:
+                    if key in parser['Cgroup']:
+                        config[key] = parser['Cgroup'][key]
+            
+            # Process group aggregation
+            if 'Processes' in parser:
+                if 'process_groups_enabled' in parser['Processes']:
+                    config['process_groups_enabled'] = parser['Processes'].getboolean('process_groups_enabled')
+                if 'process_group_by' in parser['Processes']:
+                    config['process_group_by'] = parser['Processes']['process_group_by']
+                for key in ['process_groups_count', 'process_scan_workers', 'process_scan_parallel_min']:
+                    if key in parser['Processes']:
+                        config[key] = parser['Processes'].getint(key)
+            
+            # Pressure Stall Information
+            if 'Pressure' in parser:
+                if 'monitor_pressure' in parser['Pressure']:
+                    config['monitor_pressure'] = parser['Pressure'].getboolean('monitor_pressure')
+                for key in ['pressure_cpu_threshold', 'pressure_memory_threshold', 'pressure_io_threshold']:
+                    if key in parser['Pressure']:
+                        config[key] = parser['Pressure'].getint(key)
+                if 'pressure_triggers' in parser['Pressure']:
+                    config['pressure_triggers'] = parser['Pressure']['pressure_triggers']
+            
+            # NUMA nodes
+            if 'NUMA' in parser:
+                if 'monitor_numa' in parser['NUMA']:
+                    config['monitor_numa'] = parser['NUMA'].getboolean('monitor_numa')
+                for key in ['numa_memory_threshold', 'numa_miss_threshold']:
+                    if key in parser['NUMA']:
+                        config[key] = parser['NUMA'].getint(key)
+            
+            # Forensic snapshots
+            if 'Forensics' in parser:
+                if 'forensics_enabled' in parser['Forensics']:
+                    config['forensics_enabled'] = parser['Forensics'].getboolean('forensics_enabled')
+                if 'forensics_dir' in parser['Forensics']:
+                    config['forensics_dir'] = parser['Forensics']['forensics_dir']
+                for key in ['forensics_cpu_budget_ms', 'forensics_max_kb', 'forensics_top_processes',
+                            'forensics_min_interval', 'forensics_retention_days', 'forensics_max_files']:
+                    if key in parser['Forensics']:
+                        config[key] = parser['Forensics'].getint(key)
             
             # Database integration
             if 'Database' in parser:
                 if 'db_enabled' in parser['Database']:
                     config['db_enabled'] = parser['Database'].getboolean('db_enabled')
-                for key in ['db_type', 'db_host', 'db_name', 'db_user', 'db_password']:
+                for key in ['db_type', 'db_host', 'db_name', 'db_user', 'db_password', 'db_path']:
                     if key in parser['Database']:
                         config[key] = parser['Database'][key]
                 if 'db_port' in parser['Database']:
                     config['db_port'] = parser['Database'].getint('db_port')
+                if 'history_api_enabled' in parser['Database']:
+                    config['history_api_enabled'] = parser['Database'].getboolean('history_api_enabled')
+                for key in ['history_api_port', 'history_api_cache_entries', 'history_api_open_ttl',
+                            'history_api_settle', 'history_api_max_points', 'history_api_max_alert_hours']:
+                    if key in parser['Database']:
+                        config[key] = parser['Database'].getint(key)
+                if 'history_api_listen' in parser['Database']:
+                    config['history_api_listen'] = parser['Database']['history_api_listen']
             
             # Prometheus integration
             if 'Prometheus' in parser:
@@ -164,14 +418,62 @@ class SystemMonitor:
                     config['prometheus_enabled'] = parser['Prometheus'].getboolean('prometheus_enabled')
                 if 'prometheus_port' in parser['Prometheus']:
                     config['prometheus_port'] = parser['Prometheus'].getint('prometheus_port')
+                if 'self_metrics_enabled' in parser['Prometheus']:
+                    config['self_metrics_enabled'] = parser['Prometheus'].getboolean('self_metrics_enabled')
+                if 'remote_write_enabled' in parser['Prometheus']:
+                    config['remote_write_enabled'] = parser['Prometheus'].getboolean('remote_write_enabled')
+                for key in ['remote_write_shards', 'remote_write_queue_capacity', 'remote_write_max_samples_per_send',
+                            'remote_write_batch_deadline', 'remote_write_timeout', 'remote_write_wal_max_mb']:
+                    if key in parser['Prometheus']:
+                        config[key] = parser['Prometheus'].getint(key)
+                for key in ['remote_write_url', 'remote_write_username', 'remote_write_password',
+                            'remote_write_labels', 'remote_write_wal_dir']:
+                    if key in parser['Prometheus']:
+                        config[key] = parser['Prometheus'][key]
+            
+            # Low-level discovery
+            if 'Discovery' in parser:
+                if 'discovery_enabled' in parser['Discovery']:
+                    config['discovery_enabled'] = parser['Discovery'].getboolean('discovery_enabled')
+                for key in ['discovery_group_min_rss_mb', 'discovery_group_min_cpu', 'discovery_group_hold',
+                            'discovery_resend_interval']:
+                    if key in parser['Discovery']:
+                        config[key] = parser['Discovery'].getint(key)
+                for key in ['discovery_fs_types', 'discovery_if_exclude']:
+                    if key in parser['Discovery']:
+                        config[key] = parser['Discovery'][key]
+            
+            # Memory footprint and diagnostics endpoint
+            if 'Diagnostics' in parser:
+                if 'memory_diag_enabled' in parser['Diagnostics']:
+                    config['memory_diag_enabled'] = parser['Diagnostics'].getboolean('memory_diag_enabled')
+                for key in ['memory_budget_mb', 'memory_diag_port', 'memory_diag_frames']:
+                    if key in parser['Diagnostics']:
+                        config[key] = parser['Diagnostics'].getint(key)
+                if 'memory_diag_listen' in parser['Diagnostics']:
+                    config['memory_diag_listen'] = parser['Diagnostics']['memory_diag_listen']
+            
+            # Zabbix integration
+            if 'Zabbix' in parser:
+                for key in ['zabbix_enabled', 'zabbix_compress', 'zabbix_agent_enabled']:
+                    if key in parser['Zabbix']:
+                        config[key] = parser['Zabbix'].getboolean(key)
+                for key in ['zabbix_port', 'zabbix_batch_cycles', 'zabbix_buffer_size', 'zabbix_timeout',
+                            'zabbix_agent_port']:
+                    if key in parser['Zabbix']:
+                        config[key] = parser['Zabbix'].getint(key)
+                for key in ['zabbix_server', 'zabbix_host', 'zabbix_key_prefix', 'zabbix_agent_listen',
+                            'zabbix_agent_allowed', 'zabbix_agent_fs_paths']:
+                    if key in parser['Zabbix']:
+                        config[key] = parser['Zabbix'][key]
             
         except Exception as e:
-            print(f"Konfiguratsiya faylini o'qishda xatolik: {e}")
-            print("Standart konfiguratsiya qiymatlari ishlatiladi.")
+            print(f"Konfiguratsiya faylini o'qishda xatolik: {e}", file=sys.stderr)
+            print("Standart konfiguratsiya qiymatlari ishlatiladi.", file=sys.stderr)
         
         # Validate required settings
-        if not config['bot_token'] or not config['chat_id']:
-            print("XATO: BOT_TOKEN va CHAT_ID konfiguratsiya faylida ko'rsatilishi kerak.")
+        if require_telegram and (not config['bot_token'] or not config['chat_id']):
+            print("XATO: BOT_TOKEN va CHAT_ID konfiguratsiya faylida ko'rsatilishi kerak.", file=sys.stderr)
             sys.exit(1)
         
         # Set default network interface if not specified
@@ -185,38 +487,366 @@ class SystemMonitor:
         return config
 
     def _setup_logging(self):
-        """Set up logging configuration."""
-        log_levels = {
-            'DEBUG': logging.DEBUG,
-            'INFO': logging.INFO,
-            'WARNING': logging.WARNING,
-            'ERROR': logging.ERROR
-        }
-        
-        log_level = log_levels.get(self.config['log_level'], logging.INFO)
-        
+        """Set up the queued logging pipeline."""
         # Create log directory if it doesn't exist
         log_dir = os.path.dirname(self.config['log_file'])
         if log_dir and not os.path.exists(log_dir):
             os.makedirs(log_dir)
         
-        # Configure logging
-        logging.basicConfig(
-            filename=self.config['log_file'],
-            level=log_level,
-            format='%(asctime)s - [%(levelname)s] - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        
-        # Add console handler for DEBUG and ERROR levels
-        console = logging.StreamHandler()
-        console.setLevel(logging.DEBUG)
-        formatter = logging.Formatter('%(asctime)s - [%(levelname)s] - %(message)s')
-        console.setFormatter(formatter)
-        
-        # Add the handler to the root logger
+        # File and console writes happen on the listener thread, never in the monitoring cycle
+        self.log_handler = setup_log_pipeline(self.config)
         self.logger = logging.getLogger('')
-        self.logger.addHandler(console)
+
+    def _setup_proc_reader(self):
+        """Open the /proc fast path readers if enabled and supported."""
+        if not self.config['procfs_fast_path']:
+            return None
+        
+        if not PROCFS_AVAILABLE:
+            self.logger.warning("/proc fast path faqat Linuxda ishlaydi, psutil ishlatiladi")
+            return None
+        
+        try:
+            reader = ProcReader()
+            self.logger.info("/proc fast path yoqildi")
+            return reader
+        except OSError as e:
+            self.logger.warning(f"/proc fast path ochilmadi, psutil ishlatiladi: {str(e)}")
+            return None
+
+    def _setup_cgroup_collector(self):
+        """Open the cgroup v2 tree if cgroup monitoring is enabled."""
+        if not self.config['monitor_cgroups']:
+            return None
+        
+        try:
+            collector = CgroupCollector(self.config)
+            self.logger.info(f"Cgroup monitoring yoqildi: {len(collector.nodes)} ta cgroup ({self.config['cgroup_root']})")
+            return collector
+        except OSError as e:
+            self.logger.warning(f"Cgroup monitoring ishga tushmadi: {str(e)}")
+            return None
+
+    def _setup_process_groups(self):
+        """Create the process group aggregator if enabled."""
+        if not self.config['process_groups_enabled']:
+            return None
+        
+        try:
+            return ProcessGroupAggregator(self.config['process_group_by'])
+        except ValueError as e:
+            self.logger.error(f"Jarayon guruhlash sozlamasida xatolik: {str(e)}")
+            return None
+
+    def _setup_proc_scanner(self):
+        """Create the parallel /proc scanner for top-process lists if enabled and supported."""
+        if self.config['process_scan_workers'] <= 0:
+            return None
+        
+        if not PROCFS_AVAILABLE:
+            self.logger.warning("Parallel /proc skaneri faqat Linuxda ishlaydi, psutil ishlatiladi")
+            return None
+        
+        scanner = ParallelProcScanner(self.config['process_scan_workers'], self.config['process_scan_parallel_min'])
+        self.logger.info(f"Parallel /proc skaneri yoqildi: {scanner.workers} ta worker")
+        return scanner
+
+    def _setup_history_api(self):
+        """Start the history query API if enabled."""
+        if not self.config['history_api_enabled']:
+            return None
+        
+        if not self.config['db_enabled']:
+            self.logger.error("history_api_enabled uchun db_enabled yoqilgan bo'lishi kerak")
+            return None
+        
+        query = HistoryQuery(self.config, self_metrics=self.self_metrics)
+        try:
+            server = HistoryAPIServer(self.config, query)
+        except OSError as e:
+            self.logger.error(f"History API porti ochilmadi ({self.config['history_api_port']}): {str(e)}")
+            query.close()
+            return None
+        server.start()
+        self.logger.info(f"History API: http://{self.config['history_api_listen']}:"
+                         f"{self.config['history_api_port']}/api/v1/metrics")
+        return server
+
+    def _setup_remote_write(self):
+        """Start the remote_write sink if enabled."""
+        if not self.config['remote_write_enabled']:
+            return None
+        
+        if not self.config['remote_write_url']:
+            self.logger.error("remote_write_enabled yoqilgan, lekin remote_write_url ko'rsatilmagan")
+            return None
+        
+        if not self.prometheus_exporter.enabled:
+            self.logger.error("Remote write uchun prometheus_client paketi kerak")
+            return None
+        
+        try:
+            client = RemoteWriteClient(self.config, self_metrics=self.self_metrics)
+        except OSError as e:
+            self.logger.error(f"Remote write WAL katalogi ochilmadi: {str(e)}")
+            return None
+        self.logger.info(f"Prometheus remote_write yoqildi: {self.config['remote_write_url']}")
+        return client
+
+    def _setup_zabbix_agent(self):
+        """Start the Zabbix passive check listener if enabled."""
+        if not self.config['zabbix_agent_enabled']:
+            return None
+        
+        responder = PassiveCheckResponder(self.config)
+        try:
+            server = PassiveCheckServer(self.config, responder)
+        except OSError as e:
+            self.logger.error(f"Zabbix passive check porti ochilmadi ({self.config['zabbix_agent_port']}): {str(e)}")
+            return None
+        server.start()
+        self.logger.info(f"Zabbix passive check tinglovchisi ishga tushdi: "
+                         f"{self.config['zabbix_agent_listen']}:{self.config['zabbix_agent_port']}")
+        return responder
+
+    def _setup_discovery(self):
+        """Run the initial discovery if enabled."""
+        if not self.config['discovery_enabled']:
+            return None
+        
+        try:
+            discovery = DiscoveryCache(self.config)
+        except OSError as e:
+            self.logger.warning(f"Discovery ishga tushmadi: {str(e)}")
+            return None
+        self.logger.info(f"Discovery: {len(discovery.filesystems)} ta fayl tizimi, "
+                         f"{len(discovery.interfaces)} ta tarmoq interfeysi")
+        return discovery
+
+    def _setup_alert_rules(self):
+        """Load and compile the alert rules file if one is configured."""
+        if not self.config['alert_rules_file']:
+            return None
+        
+        try:
+            engine = AlertRuleEngine.from_file(self.config['alert_rules_file'],
+                                               default_repeat=self.config['check_interval'] * 10)
+        except ValueError as e:
+            self.logger.error(f"Alert qoidalari yuklanmadi ({self.config['alert_rules_file']}): {str(e)}")
+            return None
+        self.logger.info(f"Alert qoidalari: {len(engine.rules)} ta ({self.config['alert_rules_file']})")
+        return engine
+
+    def _setup_scheduler(self):
+        """Create the adaptive per-probe scheduler if enabled."""
+        if not self.config['schedule_enabled']:
+            return None
+        
+        try:
+            scheduler = ProbeScheduler(self.config, [name for name, key, check in self._probe_checks()])
+        except ValueError as e:
+            self.logger.error(f"Probe intervallari noto'g'ri, umumiy interval ishlatiladi: {str(e)}")
+            return None
+        intervals = ", ".join(f"{name}={interval:g}s" for name, interval in scheduler.intervals().items())
+        self.logger.info(f"Moslashuvchan jadval yoqildi: {intervals}")
+        return scheduler
+
+    def _setup_forensics(self):
+        """Start the forensic snapshot worker if enabled."""
+        if not self.config['forensics_enabled']:
+            return None
+        
+        # The collectors' latest samples cost nothing to add; the worker reads /proc itself for the rest
+        sources = {}
+        if self.cgroup_collector:
+            sources['cgroups'] = lambda: [{key: sample.get(key) for key in sample.__slots__}
+                                          for sample in self.cgroup_collector.last_samples]
+        if self.socket_stats:
+            sources['sockets'] = lambda: self.last_sockets
+        if self.numa_collector:
+            sources['numa'] = lambda: self.last_numa
+        
+        try:
+            capture = ForensicCapture(self.config, sources, self.self_metrics,
+                                      on_failure=self.db_handler.clear_alert_snapshot)
+        except OSError as e:
+            self.logger.warning(f"Forensik snapshotlar yoqilmadi ({self.config['forensics_dir']}): {str(e)}")
+            return None
+        self.logger.info(f"Forensik snapshotlar yoqildi: {self.config['forensics_dir']} "
+                         f"({self.config['forensics_cpu_budget_ms']} ms CPU, {self.config['forensics_max_kb']} KB)")
+        return capture
+
+    def _probe_checks(self):
+        """(probe name, metrics key or None, check) for every enabled probe, dependencies first."""
+        # Scheduled probes run at different times, so rates come from the previous run instead of a 1 s sleep
+        scheduled = self.config['schedule_enabled']
+        checks = [
+            ('ram', 'ram', self.check_ram_usage),
+            ('cpu', 'cpu', self.check_cpu_since_last if scheduled else self.check_cpu_usage),
+            ('disk', 'disk', self.check_disk_usage),
+            ('swap', 'swap', self.check_swap_usage),
+            ('load', 'load', self.check_load_average),
+            ('network', 'network', self.check_network_since_last if scheduled else self.check_network_usage),
+        ]
+        if self.psi_collector:
+            checks.append(('pressure', 'pressure', self.check_pressure))
+        if self.socket_stats:
+            checks.append(('sockets', 'sockets', self.check_sockets))
+        if self.numa_collector:
+            checks.append(('numa', 'numa', self.check_numa))
+        if self.process_groups:
+            checks.append(('process_groups', 'process_groups', self.check_process_groups))
+        if self.discovery:
+            checks.append(('discovery', 'filesystems', lambda: self.check_discovery(self.last_process_groups)))
+        # Per-cgroup samples are exported separately, not stored with the host metrics
+        checks.append(('cgroup', None, self.check_cgroups))
+        return checks
+
+    def _probe_level(self, name, value):
+        """(value, threshold) the scheduler adapts a probe's interval to; (None, None) keeps it fixed."""
+        if name == 'ram':
+            return value, self.config['threshold']
+        if name in ('cpu', 'disk', 'swap', 'load'):
+            return value, self.config[f'{name}_threshold']
+        if name == 'network':
+            return max(value), self.config['network_threshold']
+        if name == 'pressure':
+            # Closest resource to its threshold, as a percentage of that threshold
+            ratios = [lines.get('some', {}).get('avg10', 0) / self.config[f'pressure_{resource}_threshold'] * 100
+                      for resource, lines in value.items() if self.config[f'pressure_{resource}_threshold']]
+            return (max(ratios), 100) if ratios else (None, None)
+        if name == 'sockets':
+            return value['ephemeral']['max_percent'], self.config['socket_ephemeral_threshold']
+        if name == 'numa' and value['nodes']:
+            return max(node.get('memory_percent', 0) for node in value['nodes']), self.config['numa_memory_threshold']
+        return None, None
+
+    def _setup_memory_diagnostics(self):
+        """Set up the memory budget and start the diagnostics endpoint if enabled."""
+        if not self.config['memory_budget_mb'] and not self.config['memory_diag_enabled']:
+            return None
+        
+        diagnostics = MemoryDiagnostics(self.config, self._memory_cache_sizes, self._release_caches)
+        if self.config['memory_diag_enabled']:
+            try:
+                server = MemoryDiagnosticsServer(self.config, diagnostics)
+            except OSError as e:
+                self.logger.error(f"Xotira diagnostika porti ochilmadi ({self.config['memory_diag_port']}): {str(e)}")
+                return diagnostics
+            server.start()
+            self.logger.info(f"Xotira diagnostikasi: http://{self.config['memory_diag_listen']}:"
+                             f"{self.config['memory_diag_port']}/memory")
+        return diagnostics
+
+    def _memory_cache_sizes(self):
+        """Entry counts of everything the monitor keeps between cycles."""
+        sizes = {
+            'smaps_cache': len(self.smaps_cache.entries),
+            'log_queue': self.log_handler.queue.qsize(),
+            'zabbix_buffer': len(self.zabbix_sender.buffer),
+        }
+        if self.cgroup_collector:
+            sizes['cgroup_nodes'] = len(self.cgroup_collector.nodes)
+            sizes['cgroup_samples'] = len(self.cgroup_collector.last_samples)
+        if self.process_groups:
+            sizes['process_group_processes'] = len(self.process_groups.processes)
+        if self.proc_scanner:
+            sizes['proc_scanner_previous'] = len(self.proc_scanner.previous)
+        if self.zabbix_agent and self.zabbix_agent.snapshot:
+            sizes['zabbix_agent_resolved'] = len(self.zabbix_agent.snapshot.resolved)
+        if self.discovery:
+            sizes['discovery_groups'] = len(self.discovery.group_last_seen)
+        if self.history_api:
+            sizes['history_api_chunks'] = len(self.history_api.query.cache)
+        if self.remote_write:
+            sizes['remote_write_queued'] = sum(len(shard.queue) for shard in self.remote_write.shards)
+        return sizes
+
+    def _release_caches(self):
+        """Drop what is cheap to rebuild; called when the monitor is over its memory budget."""
+        self.smaps_cache.entries.clear()
+        if self.history_api:
+            with self.history_api.query.cache.lock:
+                self.history_api.query.cache.entries.clear()
+        if self.zabbix_agent and self.zabbix_agent.snapshot:
+            self.zabbix_agent.snapshot.resolved.clear()
+
+    def check_memory_budget(self):
+        """Report own RSS and shrink back under memory_budget_mb when it is exceeded."""
+        if self.memory_diagnostics:
+            was_over_budget = self.memory_diagnostics.over_budget
+            trimmed = self.memory_diagnostics.enforce_budget()
+            if trimmed:
+                self.self_metrics.inc('memory_budget_trims_total')
+                if not was_over_budget:
+                    # Once per crossing; the trims counter shows how long it stays over
+                    before, after = trimmed
+                    self.logger.warning(f"Monitor xotirasi chegaradan oshdi: {before / 1024 / 1024:.1f} MB, "
+                                        f"keshlar tozalangach {after / 1024 / 1024:.1f} MB "
+                                        f"(chegara {self.config['memory_budget_mb']} MB)")
+        rss = read_rss()
+        if rss is not None:
+            self.self_metrics.set('resident_memory_bytes', rss)
+
+    def _setup_socket_stats(self):
+        """Open the /proc/net socket tables if socket monitoring is enabled."""
+        if not self.config['monitor_sockets']:
+            return None
+        
+        try:
+            collector = SocketStatsCollector(self.config)
+        except OSError as e:
+            self.logger.warning(f"Socket monitoring ishga tushmadi: {str(e)}")
+            return None
+        self.logger.info(f"Socket monitoring yoqildi: {', '.join(collector.tables)}")
+        return collector
+
+    def _setup_numa(self):
+        """Open the per-node memory files if NUMA monitoring is enabled."""
+        if not self.config['monitor_numa']:
+            return None
+        
+        try:
+            collector = NumaCollector()
+        except OSError as e:
+            self.logger.warning(f"NUMA monitoring ishga tushmadi: {str(e)}")
+            return None
+        self.logger.info(f"NUMA monitoring yoqildi: {len(collector.nodes)} ta node")
+        return collector
+
+    def _setup_pressure(self):
+        """Open PSI files and register kernel pressure triggers if enabled."""
+        if not self.config['monitor_pressure']:
+            return None, None
+        
+        if not PSI_AVAILABLE:
+            self.logger.warning("PSI (/proc/pressure) bu yadroda mavjud emas")
+            return None, None
+        
+        try:
+            collector = PsiCollector()
+        except OSError as e:
+            self.logger.warning(f"PSI fayllarini ochib bo'lmadi: {str(e)}")
+            return None, None
+        
+        watcher = None
+        try:
+            triggers = parse_triggers(self.config['pressure_triggers'])
+        except ValueError as e:
+            self.logger.error(f"PSI trigger sozlamasida xatolik: {str(e)}")
+            triggers = []
+        if triggers:
+            watcher = PsiTriggerWatcher(triggers, self._on_pressure_trigger)
+            if not watcher.start():
+                watcher = None
+        
+        return collector, watcher
+
+    def _on_pressure_trigger(self, resource, kind, stall_us, window_us):
+        """Alert immediately when a kernel PSI trigger fires (runs on the watcher thread)."""
+        value = f"{resource} {kind}: {window_us / 1000:.0f} ms ichida {stall_us / 1000:.0f} ms dan ortiq kutish"
+        self.logger.warning(f"PSI trigger ishladi: {value}")
+        self.send_telegram_alert("Pressure", value)
 
     def get_system_info(self):
         """Get system information."""
@@ -275,6 +905,17 @@ class SystemMonitor:
 
     def check_ram_usage(self):
         """Check RAM usage and return usage percentage."""
+        if self.cgroup_collector and self.config['cgroup_aware_ram']:
+            # Inside a memory-limited container the host-wide number is meaningless
+            usage_percent = self.cgroup_collector.container_memory_percent()
+            if usage_percent is not None:
+                return usage_percent
+        
+        if self.proc_reader:
+            usage_percent = self.proc_reader.ram_percent()
+            if usage_percent is not None:
+                return usage_percent
+        
         mem = psutil.virtual_memory()
         usage_percent = mem.percent
         return usage_percent
@@ -284,8 +925,30 @@ class SystemMonitor:
         if not self.config['monitor_cpu']:
             return 0
         
-        cpu_percent = psutil.cpu_percent(interval=1)
-        return cpu_percent
+        if self.proc_reader:
+            cpu_times_1 = self.proc_reader.cpu_times()
+            time.sleep(1)
+            return cpu_percent(cpu_times_1, self.proc_reader.cpu_times())
+        
+        return psutil.cpu_percent(interval=1)
+
+    def check_cpu_since_last(self):
+        """CPU usage averaged since the previous call, so spikes between scheduled runs are not missed."""
+        if not self.config['monitor_cpu']:
+            return 0
+        
+        if self.proc_reader:
+            previous = self.last_cpu_times
+            if previous is None:
+                previous = self.proc_reader.cpu_times()
+                time.sleep(1)
+            self.last_cpu_times = self.proc_reader.cpu_times()
+            return cpu_percent(previous, self.last_cpu_times)
+        
+        # psutil keeps the previous times itself; only the first call needs a sampling interval
+        interval = None if self.cpu_percent_primed else 1
+        self.cpu_percent_primed = True
+        return psutil.cpu_percent(interval=interval)
 
     def check_disk_usage(self):
         """Check disk usage and return usage percentage."""
@@ -300,6 +963,9 @@ class SystemMonitor:
         if not self.config['monitor_swap']:
             return 0
         
+        if self.proc_reader:
+            return self.proc_reader.swap_percent()
+        
         swap = psutil.swap_memory()
         if swap.total == 0:
             return 0
@@ -311,6 +977,9 @@ class SystemMonitor:
         if not self.config['monitor_load']:
             return 0
         
+        if self.proc_reader:
+            return self.proc_reader.loadavg() / self.proc_reader.cpu_count * 100
+        
         cpu_cores = psutil.cpu_count(logical=True)
         load_avg = os.getloadavg()[0]  # 1 minute load average
         load_per_core = load_avg / cpu_cores
@@ -324,6 +993,9 @@ class SystemMonitor:
         
         interface = self.config['network_interface']
         
+        if self.proc_reader:
+            return self._check_network_usage_procfs(interface)
+        
         # Check if interface exists
         if interface not in psutil.net_if_addrs():
             self.logger.warning(f"Network interfeysi topilmadi: {interface}")
@@ -352,27 +1024,174 @@ class SystemMonitor:
         
         return rx_rate, tx_rate
 
+    def check_network_since_last(self):
+        """Network rates in Mbps averaged since the previous call."""
+        if not self.config['monitor_network']:
+            return 0, 0
+        
+        interface = self.config['network_interface']
+        if self.proc_reader:
+            counters = self.proc_reader.net_bytes(interface)
+        else:
+            counters = psutil.net_io_counters(pernic=True).get(interface)
+            if counters is not None:
+                counters = (counters.bytes_recv, counters.bytes_sent)
+        
+        now = time.monotonic()
+        previous, self.last_net_counters = self.last_net_counters, (now, counters) if counters else None
+        if counters is None or previous is None:
+            # First run or missing interface: the one second sample also logs the missing interface
+            return self.check_network_usage()
+        
+        elapsed = now - previous[0]
+        rx_rate = (counters[0] - previous[1][0]) * 8 / 1024 / 1024 / elapsed  # Convert to Mbps
+        tx_rate = (counters[1] - previous[1][1]) * 8 / 1024 / 1024 / elapsed  # Convert to Mbps
+        return rx_rate, tx_rate
+
+    def check_pressure(self):
+        """Read PSI averages for cpu, memory and io."""
+        if not self.psi_collector:
+            return {}
+        
+        return self.psi_collector.collect()
+
+    def check_sockets(self):
+        """Summarise TCP/UDP sockets by state, remote address and ephemeral port use."""
+        if not self.socket_stats:
+            return {}
+        
+        self.last_sockets = self.socket_stats.collect()
+        return self.last_sockets
+
+    def check_numa(self):
+        """Read per-node memory, NUMA miss counters, hugepage pools and THP activity."""
+        if not self.numa_collector:
+            return {}
+        
+        self.last_numa = self.numa_collector.collect()
+        return self.last_numa
+
+    def check_process_groups(self):
+        """Fold this cycle's process table into the group totals and return the top groups."""
+        if not self.process_groups:
+            return []
+        
+        self.self_metrics.set('process_scan_size', self.process_groups.update())
+        self.last_process_groups = self.process_groups.top_groups(self.config['process_groups_count'])
+        return self.last_process_groups
+
+    def check_cgroups(self):
+        """Sample every cgroup and alert on those above their thresholds."""
+        if not self.cgroup_collector:
+            return []
+        
+        samples = self.cgroup_collector.collect()
+        self.prometheus_exporter.update_cgroup_metrics(samples)
+        
+        breaches = self.cgroup_collector.breaches(samples)
+        if breaches:
+            summary = ", ".join(f"{cgroup} {kind}: {value:.1f}% (chegara {threshold:g}%)"
+                                for cgroup, kind, value, threshold in breaches[:5])
+            if len(breaches) > 5:
+                summary += f" va yana {len(breaches) - 5} ta"
+            self.logger.warning(f"Cgroup chegaralari oshdi: {summary}")
+            self.send_telegram_alert("Cgroup", summary)
+        
+        return samples
+
+    def check_discovery(self, process_groups):
+        """Refresh discovery from its change signals and sample every discovered filesystem."""
+        if not self.discovery:
+            return {}
+        
+        changed = self.discovery.refresh(process_groups if self.process_groups else None)
+        
+        filesystems = {}
+        for entry in self.discovery.filesystems:
+            try:
+                usage = psutil.disk_usage(entry['fsname'])
+            except OSError:
+                continue  # Unmounted or inaccessible since discovery
+            filesystems[entry['fsname']] = (usage.total, usage.used, usage.free)
+        self.last_filesystems = filesystems
+        
+        percents = {path: round(used / (used + free) * 100, 1) if used + free else 0.0
+                    for path, (total, used, free) in filesystems.items()}
+        self.prometheus_exporter.update_discovery(self.discovery, percents)
+        
+        # Trapper discovery rules need the LLD value on change and periodically so entities are not lost
+        if self.config['zabbix_enabled']:
+            now = time.time()
+            if now - self.last_discovery_sent >= self.config['discovery_resend_interval']:
+                changed = set(self.discovery.lld)
+                self.last_discovery_sent = now
+            prefix = self.config['zabbix_key_prefix']
+            keys = {'filesystems': 'fs', 'interfaces': 'net', 'process_groups': 'process_group'}
+            for kind in changed:
+                self.zabbix_sender.add_value(f"{prefix}.{keys[kind]}.discovery", self.discovery.lld[kind])
+        
+        return percents
+
+    def _check_network_usage_procfs(self, interface):
+        """Network rates from /proc/net/dev via the fast path."""
+        counters_1 = self.proc_reader.net_bytes(interface)
+        if counters_1 is None:
+            self.logger.warning(f"Network interfeysi topilmadi: {interface}")
+            return 0, 0
+        
+        time.sleep(1)
+        
+        counters_2 = self.proc_reader.net_bytes(interface)
+        if counters_2 is None:
+            self.logger.warning(f"Network interfeysi statistikasi topilmadi: {interface}")
+            return 0, 0
+        
+        rx_rate = (counters_2[0] - counters_1[0]) * 8 / 1024 / 1024  # Convert to Mbps
+        tx_rate = (counters_2[1] - counters_1[1]) * 8 / 1024 / 1024  # Convert to Mbps
+        
+        return rx_rate, tx_rate
+
     def get_top_processes(self, resource_type):
         """Get top processes based on resource type."""
+        with self.self_metrics.time('process_scan_duration_seconds', (resource_type,)):
+            return self._get_top_processes(resource_type)
+
+    def _scan_top_processes(self, key, limit):
+        """Top processes by 'rss' or 'cpu' from the parallel /proc scanner, as psutil-style dicts."""
+        processes = self.proc_scanner.top(limit, key)
+        self.self_metrics.set('process_scan_size', self.proc_scanner.last_size)
+        return processes
+
+    def _get_top_processes(self, resource_type):
+        """Scan the process table and format the top processes for resource_type."""
         count = self.config['top_processes_count']
         
         if resource_type == "RAM":
-            processes = []
-            for proc in psutil.process_iter(['pid', 'ppid', 'name', 'memory_percent', 'cpu_percent']):
-                try:
-                    processes.append({
-                        'pid': proc.info['pid'],
-                        'ppid': proc.info['ppid'],
-                        'name': proc.info['name'],
-                        'memory_percent': proc.info['memory_percent'],
-                        'cpu_percent': proc.info['cpu_percent']
-                    })
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    pass
-            
-            # Sort by memory usage
+            if self.proc_scanner:
+                # The memory detail path re-ranks the first count * 2 by PSS
+                processes = self._scan_top_processes('rss', count * 2)
+            else:
+                processes = []
+                for proc in psutil.process_iter(['pid', 'ppid', 'name', 'memory_percent', 'cpu_percent', 'create_time']):
+                    try:
+                        processes.append({
+                            'pid': proc.info['pid'],
+                            'ppid': proc.info['ppid'],
+                            'name': proc.info['name'],
+                            'memory_percent': proc.info['memory_percent'] or 0.0,
+                            'cpu_percent': proc.info['cpu_percent'] or 0.0,
+                            'create_time': proc.info['create_time']
+                        })
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                        pass
+                self.self_metrics.set('process_scan_size', len(processes))
+            
+            # Sort by memory usage (RSS based, cheap for every process)
             processes.sort(key=lambda x: x['memory_percent'], reverse=True)
             
+            if self.config['process_memory_detail']:
+                return self._format_memory_detail(processes, count)
+            
             # Format output
             result = "PID PPID COMMAND %MEM% %CPU%\n"
             for proc in processes[:count]:
@@ -381,18 +1200,22 @@ class SystemMonitor:
             return result
         
         elif resource_type == "CPU":
-            processes = []
-            for proc in psutil.process_iter(['pid', 'ppid', 'name', 'cpu_percent', 'memory_percent']):
-                try:
-                    processes.append({
-                        'pid': proc.info['pid'],
-                        'ppid': proc.info['ppid'],
-                        'name': proc.info['name'],
-                        'cpu_percent': proc.info['cpu_percent'],
-                        'memory_percent': proc.info['memory_percent']
-                    })
-                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                    pass
+            if self.proc_scanner:
+                processes = self._scan_top_processes('cpu', count)
+            else:
+                processes = []
+                for proc in psutil.process_iter(['pid', 'ppid', 'name', 'cpu_percent', 'memory_percent']):
+                    try:
+                        processes.append({
+                            'pid': proc.info['pid'],
+                            'ppid': proc.info['ppid'],
+                            'name': proc.info['name'],
+                            'cpu_percent': proc.info['cpu_percent'],
+                            'memory_percent': proc.info['memory_percent']
+                        })
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                        pass
+                self.self_metrics.set('process_scan_size', len(processes))
             
             # Sort by CPU usage
             processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
@@ -408,5 +1231,635 @@ class SystemMonitor:
             try:
                 # Use subprocess to get disk usage by directory
                 output = subprocess.check_output(
-                    f"du -h {self.config
-(Content truncated due to size limit. Use line ranges to read in chunks)
\ No newline at end of file
+                    f"du -h {self.config['disk_path']}/* 2>/dev/null | sort -rh | head -n {count}",
+                    shell=True, text=True
+                )
+                return output
+            except subprocess.SubprocessError:
+                return "Could not get disk usage information"
+        
+        elif resource_type == "Swap":
+            if self.proc_scanner:
+                processes = self._scan_top_processes('rss', count)
+            else:
+                processes = []
+                for proc in psutil.process_iter(['pid', 'ppid', 'name', 'memory_percent']):
+                    try:
+                        processes.append({
+                            'pid': proc.info['pid'],
+                            'ppid': proc.info['ppid'],
+                            'name': proc.info['name'],
+                            'memory_percent': proc.info['memory_percent']
+                        })
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                        pass
+                self.self_metrics.set('process_scan_size', len(processes))
+            
+            # Sort by memory usage (as a proxy for swap usage)
+            processes.sort(key=lambda x: x['memory_percent'], reverse=True)
+            
+            # Format output
+            result = "PID PPID COMMAND %MEM%\n"
+            for proc in processes[:count]:
+                result += f"{proc['pid']} {proc['ppid']} {proc['name']} {proc['memory_percent']:.1f}%\n"
+            
+            return result
+        
+        elif resource_type == "Load":
+            if self.proc_scanner:
+                processes = self._scan_top_processes('cpu', count)
+            else:
+                processes = []
+                for proc in psutil.process_iter(['pid', 'ppid', 'name', 'cpu_percent']):
+                    try:
+                        processes.append({
+                            'pid': proc.info['pid'],
+                            'ppid': proc.info['ppid'],
+                            'name': proc.info['name'],
+                            'cpu_percent': proc.info['cpu_percent']
+                        })
+                    except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+                        pass
+                self.self_metrics.set('process_scan_size', len(processes))
+            
+            # Sort by CPU usage
+            processes.sort(key=lambda x: x['cpu_percent'], reverse=True)
+            
+            # Format output
+            result = "PID PPID COMMAND %CPU%\n"
+            for proc in processes[:count]:
+                result += f"{proc['pid']} {proc['ppid']} {proc['name']} {proc['cpu_percent']:.1f}%\n"
+            
+            return result
+        
+        elif resource_type == "Network":
+            try:
+                # Use subprocess to get network connections
+                output = subprocess.check_output(
+                    f"netstat -tunapl 2>/dev/null | grep -v '127.0.0.1' | awk '{{print $5,$6,$7}}' | sort | uniq -c | sort -nr | head -n {count}",
+                    shell=True, text=True
+                )
+                return output
+            except subprocess.SubprocessError:
+                return "Could not get network connection information"
+        
+        elif resource_type == "NUMA" and self.last_numa:
+            return NumaCollector.format_table(self.last_numa)
+        
+        elif resource_type == "Socket" and self.last_sockets:
+            return SocketStatsCollector.format_table(self.last_sockets)
+        
+        elif resource_type == "Pressure" and self.psi_collector:
+            return PsiCollector.format_table(self.psi_collector.collect())
+        
+        elif resource_type == "Cgroup" and self.cgroup_collector:
+            return self.cgroup_collector.format_top(count)
+        
+        return "Unknown resource type"
+
+    def _format_memory_detail(self, processes, count):
+        """Re-rank the top RSS candidates by PSS read from smaps_rollup."""
+        # RSS double-counts shared pages, so look a bit past the first `count` entries
+        candidates = processes[:count * 2]
+        for proc in candidates:
+            proc['smaps'] = self.smaps_cache.get(proc['pid'], proc['create_time'])
+        # Processes whose smaps_rollup cannot be read keep their RSS as the ranking key
+        total_memory = psutil.virtual_memory().total
+        candidates.sort(key=lambda x: x['smaps']['pss'] if x['smaps'] else x['memory_percent'] / 100 * total_memory,
+                        reverse=True)
+        
+        mb = 1024 * 1024
+        result = "PID PPID COMMAND PSS(MB) USS(MB) SWAP(MB) %MEM% %CPU%\n"
+        for proc in candidates[:count]:
+            smaps = proc['smaps']
+            if smaps:
+                detail = f"{smaps['pss'] / mb:.0f} {smaps['uss'] / mb:.0f} {smaps['swap'] / mb:.0f}"
+            else:
+                detail = "- - -"
+            result += f"{proc['pid']} {proc['ppid']} {proc['name']} {detail} {proc['memory_percent']:.1f}% {proc['cpu_percent']:.1f}%\n"
+        
+        return result
+
+    def send_telegram_alert(self, alert_type, usage_value, cooldown=True):
+        """Send alert via Telegram."""
+        # PSI triggers send alerts from their own thread
+        with self.alert_lock:
+            return self._send_telegram_alert(alert_type, usage_value, cooldown)
+
+    def alert_cooldown_passed(self, alert_type, current_time):
+        """Check the per-type rate limit; last_alert_times is only updated once an alert is delivered."""
+        alert_interval = self.config['check_interval'] * 10  # Minimum time between alerts
+        alert_key = alert_type.lower()
+        if alert_key not in self.last_alert_times:
+            self.last_alert_times[alert_key] = 0
+        
+        time_since_last_alert = current_time - self.last_alert_times[alert_key]
+        if time_since_last_alert < alert_interval:
+            self.logger.debug(f"{alert_type} alert cheklandi (so'nggi xabardan {time_since_last_alert} soniya o'tdi)")
+            return False
+        return True
+
+    def _send_telegram_alert(self, alert_type, usage_value, cooldown=True):
+        """Rate-limit, format and deliver a single alert."""
+        current_time = int(time.time())
+        
+        # Check if we should send an alert (rate limiting)
+        alert_key = alert_type.lower()
+        if cooldown and not self.alert_cooldown_passed(alert_type, current_time):
+            return False
+        
+        # Start the snapshot first, so it records the state before the message work below
+        snapshot = self.forensics.request(alert_type, usage_value) if self.forensics else None
+        
+        # Prepare message
+        date_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        system_info = self.get_system_info()
+        
+        message = f"{self.config['alert_message_title']} - *{alert_type}*\n"
+        message += f"📅 Sana: {date_str}\n"
+        message += f"🖥️ Hostname: `{system_info['hostname']}`\n"
+        message += f"🌐 Server IP: `{system_info['ip']}`\n"
+        message += f"💥 {alert_type} foydalanish: *{usage_value}*\n"
+        
+        # Add top processes if enabled (generic rule alerts have no resource to rank by)
+        if self.config['include_top_processes'] and alert_type != "Rule":
+            top_processes = self.get_top_processes(alert_type)
+            message += f"\n🔍 Top jarayonlar:\n```\n{top_processes}```\n"
+        
+        # Many small workers only show up when grouped
+        if self.last_process_groups and alert_type in ("RAM", "CPU", "Swap", "Load"):
+            groups = ProcessGroupAggregator.format_table(self.last_process_groups, self.config['process_group_by'])
+            message += f"\n📦 Top jarayon guruhlari:\n```\n{groups}```\n"
+        
+        if snapshot:
+            message += f"\n🗂️ Snapshot: `{snapshot}`\n"
+        
+        # Add system info
+        sys_info_str = "\n".join([f"{k}: {v}" for k, v in system_info.items()])
+        message += f"\n📊 Tizim ma'lumotlari:\n```\n{sys_info_str}```"
+        
+        # Log the message
+        self.logger.info("-" * 40)
+        self.logger.info(message)
+        
+        # Send to Telegram with retry
+        max_retries = 3
+        retry = 0
+        success = False
+        send_started = time.perf_counter()
+        
+        while retry < max_retries and not success:
+            try:
+                self.logger.debug(f"Telegramga xabar yuborilmoqda: {alert_type}")
+                
+                # Send message
+                url = f"https://api.telegram.org/bot{self.config['bot_token']}/sendMessage"
+                payload = {
+                    'chat_id': self.config['chat_id'],
+                    'text': message,
+                    'parse_mode': 'Markdown'
+                }
+                
+                response = requests.post(url, data=payload, timeout=30)
+                response_json = response.json()
+                
+                if response_json.get('ok'):
+                    self.logger.info(f"{alert_type} alert xabari Telegramga muvaffaqiyatli yuborildi")
+                    success = True
+                    self.last_alert_times[alert_key] = current_time
+                else:
+                    retry += 1
+                    error_description = response_json.get('description', 'Unknown error')
+                    self.logger.warning(f"Telegramga xabar yuborishda xatolik ({retry}/{max_retries}): {error_description}")
+                    time.sleep(2)  # Wait before retrying
+            
+            except Exception as e:
+                retry += 1
+                self.logger.warning(f"Telegramga xabar yuborishda xatolik ({retry}/{max_retries}): {str(e)}")
+                time.sleep(2)  # Wait before retrying
+        
+        self.self_metrics.observe('alert_send_duration_seconds', time.perf_counter() - send_started, (alert_type,))
+        if snapshot:
+            # A capture that failed meanwhile must not leave the row pointing at a missing file
+            self.forensics.link(snapshot, lambda path: self.store_alert_in_database(
+                alert_type, usage_value, message, success, system_info, path))
+        else:
+            self.store_alert_in_database(alert_type, usage_value, message, success, system_info)
+        self.prometheus_exporter.increment_alert_counter(alert_type)
+        
+        # If all retries failed
+        if not success:
+            self.self_metrics.inc('alert_send_errors_total', labels=(alert_type,))
+            self.logger.error(f"Telegramga xabar yuborib bo'lmadi ({max_retries} urinishdan so'ng)")
+            self.logger.error(f"BOT_TOKEN: {self.config['bot_token'][:5]}...{self.config['bot_token'][-5:]}")
+            self.logger.error(f"CHAT_ID: {self.config['chat_id']}")
+            return False
+        
+        return True
+
+    def test_telegram_connection(self):
+        """Test Telegram connection at startup."""
+        self.logger.info("Telegram bog'lanishini tekshirish...")
+        
+        system_info = self.get_system_info()
+        date_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        test_message = f"🔄 System Monitor xizmati ishga tushirildi.\n"
+        test_message += f"🖥️ Hostname: `{system_info['hostname']}`\n"
+        test_message += f"🌐 Server IP: `{system_info['ip']}`\n"
+        test_message += f"⏱️ Vaqt: {date_str}"
+        
+        try:
+            url = f"https://api.telegram.org/bot{self.config['bot_token']}/sendMessage"
+            payload = {
+                'chat_id': self.config['chat_id'],
+                'text': test_message,
+                'parse_mode': 'Markdown'
+            }
+            
+            response = requests.post(url, data=payload, timeout=10)
+            response_json = response.json()
+            
+            if response_json.get('ok'):
+                self.logger.info("Telegram bog'lanishi muvaffaqiyatli tekshirildi")
+                return True
+            else:
+                error_description = response_json.get('description', 'Unknown error')
+                self.logger.error(f"Telegram bog'lanishini tekshirishda xatolik: {error_description}")
+                self.logger.error(f"BOT_TOKEN: {self.config['bot_token'][:5]}...{self.config['bot_token'][-5:]}")
+                self.logger.error(f"CHAT_ID: {self.config['chat_id']}")
+                return False
+                
+        except Exception as e:
+            self.logger.error(f"Telegram bog'lanishini tekshirishda xatolik: {str(e)}")
+            return False
+
+    def store_metrics_in_database(self, metrics, system_info):
+        """Store metrics in database if enabled."""
+        if not self.config['db_enabled']:
+            return
+        
+        with self.self_metrics.time('db_write_duration_seconds', ('metrics',)):
+            stored = self.db_handler.store_metrics(metrics, system_info)
+        
+        if stored:
+            self.logger.debug(f"Ma'lumotlar bazasiga metrikalar saqlandi: {metrics}")
+        else:
+            self.self_metrics.inc('db_errors_total', labels=('metrics',))
+
+    def store_alert_in_database(self, alert_type, usage_value, message, sent_successfully, system_info, snapshot=None):
+        """Store alert in database if enabled."""
+        if not self.config['db_enabled']:
+            return
+        
+        with self.self_metrics.time('db_write_duration_seconds', ('alert',)):
+            stored = self.db_handler.store_alert(alert_type, usage_value, message, sent_successfully, system_info,
+                                                 snapshot=snapshot)
+        
+        if not stored:
+            self.self_metrics.inc('db_errors_total', labels=('alert',))
+
+    def expose_prometheus_metrics(self, metrics, system_info):
+        """Expose metrics for Prometheus if enabled."""
+        if not self.config['prometheus_enabled'] and not self.remote_write:
+            return
+        
+        if self.prometheus_exporter.update_metrics(metrics, system_info):
+            self.logger.debug(f"Prometheus uchun metrikalar tayyorlandi: {metrics}")
+
+    def push_remote_write(self):
+        """Queue the current registry samples for remote_write if enabled."""
+        if not self.remote_write:
+            return
+        
+        self.remote_write.enqueue(self.prometheus_exporter.collect_samples())
+
+    def send_metrics_to_zabbix(self, metrics):
+        """Queue metrics for the Zabbix trapper and send the batch when it is due."""
+        if not self.config['zabbix_enabled']:
+            return
+        
+        self.zabbix_sender.add_metrics(metrics)
+        if self.zabbix_sender.batch_due():
+            with self.self_metrics.time('zabbix_send_duration_seconds'):
+                self.zabbix_sender.flush()
+        self.self_metrics.set('zabbix_buffered_values', len(self.zabbix_sender.buffer))
+
+    def update_zabbix_agent(self, metrics):
+        """Publish this cycle's sample to the passive check responder."""
+        if not self.zabbix_agent:
+            return
+        
+        if self.proc_reader:
+            memory = {key: value * 1024 if value is not None else None
+                      for key, value in self.proc_reader.memory().items()}
+            cpu_count = self.proc_reader.cpu_count
+        else:
+            mem = psutil.virtual_memory()
+            swap = psutil.swap_memory()
+            memory = {'mem_total': mem.total, 'mem_free': mem.free, 'mem_available': mem.available,
+                      'swap_total': swap.total, 'swap_free': swap.free}
+            cpu_count = psutil.cpu_count(logical=True)
+        
+        filesystems = dict(self.last_filesystems)
+        paths = {self.config['disk_path']}
+        paths.update(path.strip() for path in self.config['zabbix_agent_fs_paths'].split(',') if path.strip())
+        for path in paths - filesystems.keys():
+            try:
+                usage = psutil.disk_usage(path)
+                filesystems[path] = (usage.total, usage.used, usage.free)
+            except OSError as e:
+                self.logger.debug(f"Fayl tizimi o'qilmadi ({path}): {str(e)}")
+        
+        discovery = dict(self.discovery.lld) if self.discovery else None
+        self.zabbix_agent.update(AgentSnapshot(metrics, memory, filesystems, os.getloadavg(), cpu_count,
+                                               self.config['zabbix_key_prefix'], discovery))
+
+    def record_sample(self, metrics):
+        """Append the sample to record_file as a JSON line if recording is enabled."""
+        if not self.config['record_file']:
+            return
+        
+        try:
+            with open(self.config['record_file'], 'a') as f:
+                f.write(json.dumps({'timestamp': time.time(), **metrics}) + "\n")
+        except (OSError, TypeError, ValueError) as e:
+            self.logger.error(f"Namuna faylga yozilmadi ({self.config['record_file']}): {str(e)}")
+
+    def update_status_file(self, metrics):
+        """Update status file with current metrics."""
+        status_file = "/tmp/memory-monitor-status.tmp"
+        date_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        try:
+            with open(status_file, 'w') as f:
+                f.write(f"So'nggi tekshirish: {date_str}\n")
+                
+                for key, value in metrics.items():
+                    if key == 'ram':
+                        f.write(f"RAM: {value}%\n")
+                    elif key == 'cpu' and self.config['monitor_cpu']:
+                        f.write(f"CPU: {value}%\n")
+                    elif key == 'disk' and self.config['monitor_disk']:
+                        f.write(f"Disk ({self.config['disk_path']}): {value}%\n")
+                    elif key == 'swap' and self.config['monitor_swap'] and value > 0:
+                        f.write(f"Swap: {value}%\n")
+                    elif key == 'load' and self.config['monitor_load']:
+                        load_per_core = value / 100  # Convert back from percentage
+                        load_1min = load_per_core * psutil.cpu_count(logical=True)
+                        f.write(f"Load: {load_1min:.2f} (core boshiga: {load_per_core:.2f})\n")
+                    elif key == 'network' and self.config['monitor_network']:
+                        rx_rate, tx_rate = value
+                        f.write(f"Network ({self.config['network_interface']}): RX: {rx_rate:.2f} Mbps, TX: {tx_rate:.2f} Mbps\n")
+        
+        except Exception as e:
+            self.logger.error(f"Status faylini yangilashda xatolik: {str(e)}")
+
+    def evaluate_alerts(self, metrics, cpu_count=None):
+        """Return (alert_type, usage_value, log_message) for every threshold the sample breaches.
+        
+        Keys missing from the sample are skipped: a scheduled probe that has not succeeded yet has no value.
+        """
+        alerts = []
+        
+        # RAM check
+        if 'ram' in metrics and metrics['ram'] >= self.config['threshold']:
+            alerts.append(("RAM", f"{metrics['ram']}%", f"Yuqori RAM ishlatilishi: {metrics['ram']}%"))
+        
+        # CPU check
+        if self.config['monitor_cpu'] and 'cpu' in metrics and metrics['cpu'] >= self.config['cpu_threshold']:
+            alerts.append(("CPU", f"{metrics['cpu']}%", f"Yuqori CPU ishlatilishi: {metrics['cpu']}%"))
+        
+        # Disk check
+        if self.config['monitor_disk'] and 'disk' in metrics and metrics['disk'] >= self.config['disk_threshold']:
+            alerts.append(("Disk", f"{metrics['disk']}%",
+                           f"Yuqori disk ishlatilishi ({self.config['disk_path']}): {metrics['disk']}%"))
+        
+        # Swap check
+        if self.config['monitor_swap'] and 'swap' in metrics and metrics['swap'] >= self.config['swap_threshold'] and metrics['swap'] > 0:
+            alerts.append(("Swap", f"{metrics['swap']}%", f"Yuqori swap ishlatilishi: {metrics['swap']}%"))
+        
+        # Load check
+        if self.config['monitor_load'] and 'load' in metrics and metrics['load'] >= self.config['load_threshold']:
+            load_per_core = metrics['load'] / 100  # Convert back from percentage
+            load_1min = load_per_core * (cpu_count or psutil.cpu_count(logical=True))
+            alerts.append(("Load", f"{load_1min:.2f} (core boshiga: {load_per_core:.2f})",
+                           f"Yuqori load average: {load_1min:.2f} (core boshiga: {load_per_core:.2f})"))
+        
+        # Network check
+        if self.config['monitor_network'] and 'network' in metrics:
+            rx_rate, tx_rate = metrics['network']
+            if rx_rate >= self.config['network_threshold'] or tx_rate >= self.config['network_threshold']:
+                alerts.append(("Network", f"RX: {rx_rate:.2f} Mbps, TX: {tx_rate:.2f} Mbps",
+                               f"Yuqori network trafigi ({self.config['network_interface']}): "
+                               f"RX: {rx_rate:.2f} Mbps, TX: {tx_rate:.2f} Mbps"))
+        
+        # Pressure check (share of time some tasks stalled over the last 10 seconds)
+        for resource, lines in metrics.get('pressure', {}).items():
+            threshold = self.config[f'pressure_{resource}_threshold']
+            some_avg10 = lines.get('some', {}).get('avg10', 0)
+            if threshold and some_avg10 >= threshold:
+                alerts.append(("Pressure", f"{resource} some avg10: {some_avg10:.2f}%",
+                               f"Yuqori {resource} pressure: some avg10 {some_avg10:.2f}%"))
+        
+        # NUMA checks (a single node can run out while the host total looks fine)
+        for node in metrics.get('numa', {}).get('nodes', []):
+            percent = node.get('memory_percent', 0)
+            if percent >= self.config['numa_memory_threshold']:
+                alerts.append(("NUMA", f"node{node['node']}: {percent}%",
+                               f"Yuqori NUMA node{node['node']} xotira ishlatilishi: {percent}%"))
+            miss = node['miss_percent']
+            if self.config['numa_miss_threshold'] and miss >= self.config['numa_miss_threshold']:
+                alerts.append(("NUMA", f"node{node['node']} numa_foreign: {miss}%",
+                               f"NUMA node{node['node']} ajratmalarining {miss}% boshqa nodedan olindi"))
+        
+        # Socket checks (accept queue drops, ephemeral port exhaustion, TIME_WAIT floods)
+        sockets = metrics.get('sockets')
+        if sockets:
+            overflows = sockets.get('listen_overflows', 0)
+            if self.config['socket_listen_overflow_alert'] and overflows:
+                alerts.append(("Socket", f"listen queue overflow: {overflows}",
+                               f"Listen navbati to'ldi: {overflows} ta ulanish tashlandi"))
+            ephemeral = sockets['ephemeral']
+            if ephemeral['max_percent'] >= self.config['socket_ephemeral_threshold']:
+                alerts.append(("Socket", f"ephemeral ports {ephemeral['max_destination']}: {ephemeral['max_percent']}%",
+                               f"Ephemeral portlar tugamoqda ({ephemeral['max_destination']}): "
+                               f"{ephemeral['max_percent']}%"))
+            time_wait = sockets['tcp']['time_wait']
+            if self.config['socket_time_wait_threshold'] and time_wait >= self.config['socket_time_wait_threshold']:
+                alerts.append(("Socket", f"TIME_WAIT: {time_wait}", f"Ko'p TIME_WAIT socketlar: {time_wait}"))
+        
+        return alerts
+
+    def evaluate_rules(self, metrics):
+        """Advance the alert rules by one cycle and return (alert_type, usage_value, log_message) to send."""
+        cgroup_samples = self.cgroup_collector.last_samples if self.cgroup_collector else None
+        series = series_from_metrics(metrics, self.config, cgroup_samples)
+        alerts = []
+        for rule, event, labels, value in self.alert_rules.evaluate(series):
+            description = rule.describe(labels, value)
+            if event == 'resolved':
+                self.logger.info(f"Qoida [{rule.name}] tiklandi: {description}")
+                continue
+            alerts.append((rule.alert_type, f"{rule.name}: {description}", f"Qoida [{rule.name}]: {description}"))
+        self.self_metrics.set('alert_rules_firing', self.alert_rules.firing_count())
+        return alerts
+
+    def _probe(self, name, check):
+        """Run a single metric probe, timing it when self-instrumentation is enabled."""
+        with self.self_metrics.time('probe_duration_seconds', (name,)):
+            return check()
+
+    def publish(self, metrics):
+        """Store, export and record a complete sample."""
+        if self.config['db_enabled'] or self.config['prometheus_enabled'] or self.remote_write:
+            system_info = self.get_system_info()
+            
+            # Store metrics in database if enabled
+            self.store_metrics_in_database(metrics, system_info)
+            
+            # Expose metrics for Prometheus if enabled
+            self.expose_prometheus_metrics(metrics, system_info)
+            
+            # Push the same samples through remote_write if enabled
+            self.push_remote_write()
+        
+        # Push metrics to Zabbix if enabled
+        self.send_metrics_to_zabbix(metrics)
+        
+        # Serve Zabbix passive checks from this sample
+        self._probe('zabbix_agent', lambda: self.update_zabbix_agent(metrics))
+        
+        # Record the sample for replay if enabled
+        self.record_sample(metrics)
+        
+        # Update status file
+        self.update_status_file(metrics)
+
+    def send_rule_alerts(self, metrics):
+        """Evaluate the alert rules against the sample and send what fires."""
+        # Rule instances carry their own for/repeat state, so the per-type cooldown is skipped
+        if self.alert_rules:
+            for alert_type, usage_value, log_message in self._probe('rules', lambda: self.evaluate_rules(metrics)):
+                self.logger.warning(log_message)
+                self.send_telegram_alert(alert_type, usage_value, cooldown=False)
+
+    def _end_cycle(self, cycle_started, earlier_work=0.0):
+        """Self-instrumentation and memory budget bookkeeping after a cycle.
+        
+        earlier_work is time already spent on this cycle before cycle_started (scheduled probe wakeups).
+        """
+        cycle_duration = earlier_work + time.perf_counter() - cycle_started
+        self.self_metrics.observe('cycle_duration_seconds', cycle_duration)
+        self.self_metrics.set('log_records_dropped_total', self.log_handler.dropped)
+        self.check_memory_budget()
+        if cycle_duration > self.config['check_interval']:
+            self.self_metrics.inc('cycle_overruns_total')
+
+    def run(self):
+        """Run the monitoring loop."""
+        if self.scheduler:
+            return self.run_scheduled()
+        
+        self.logger.info(f"Monitoring boshlandi. Interval: {self.config['check_interval']} soniya")
+        
+        while True:
+            cycle_started = time.perf_counter()
+            try:
+                # Collect all metrics
+                metrics = {}
+                for name, key, check in self._probe_checks():
+                    value = self._probe(name, check)
+                    if key:
+                        metrics[key] = value
+                
+                self.publish(metrics)
+                
+                # Check thresholds and send alerts
+                for alert_type, usage_value, log_message in self.evaluate_alerts(metrics):
+                    self.logger.warning(log_message)
+                    self.send_telegram_alert(alert_type, usage_value)
+                
+                self.send_rule_alerts(metrics)
+                
+            except Exception as e:
+                self.logger.error(f"Monitoring jarayonida xatolik: {str(e)}")
+            
+            self._end_cycle(cycle_started)
+            
+            # Wait for next check
+            time.sleep(self.config['check_interval'])
+
+    def run_scheduled(self):
+        """Run each probe when it is due and publish the latest values every check_interval."""
+        self.logger.info(f"Monitoring boshlandi (moslashuvchan jadval). Saqlash intervali: "
+                         f"{self.config['check_interval']} soniya")
+        
+        checks = {name: (key, check) for name, key, check in self._probe_checks()}
+        metrics = {}
+        next_publish = time.monotonic()
+        # A cycle is one publish interval; probe wakeups in between add their work to it
+        cycle_work = 0.0
+        
+        while True:
+            time.sleep(max(0.0, min(self.scheduler.next_due(), next_publish) - time.monotonic()))
+            cycle_started = time.perf_counter()
+            published = False
+            try:
+                sampled = set()
+                for name in self.scheduler.pop_due(time.monotonic()):
+                    key, check = checks[name]
+                    try:
+                        value = self._probe(name, check)
+                    except Exception as e:
+                        # A failing probe keeps its slot instead of dropping out of the heap
+                        self.scheduler.reschedule(name, time.monotonic())
+                        self.logger.error(f"[{name}] o'lchashda xatolik: {str(e)}")
+                        continue
+                    level, threshold = self._probe_level(name, value)
+                    interval = self.scheduler.reschedule(name, time.monotonic(), level, threshold)
+                    self.self_metrics.set('probe_interval_seconds', interval, (name,))
+                    if key:
+                        metrics[key] = value
+                        sampled.add(key)
+                
+                # Only freshly sampled metrics are checked, so a stale value is not reported twice
+                for alert_type, usage_value, log_message in self.evaluate_alerts(metrics):
+                    if ALERT_METRICS[alert_type] in sampled:
+                        self.logger.warning(log_message)
+                        self.send_telegram_alert(alert_type, usage_value)
+                
+                now = time.monotonic()
+                if now >= next_publish:
+                    next_publish += self.config['check_interval']
+                    if next_publish < now:
+                        next_publish = now + self.config['check_interval']
+                    published = True
+                    self.publish(metrics)
+                    self.send_rule_alerts(metrics)
+                
+            except Exception as e:
+                self.logger.error(f"Monitoring jarayonida xatolik: {str(e)}")
+            
+            if published:
+                self._end_cycle(cycle_started, cycle_work)
+                cycle_work = 0.0
+            else:
+                cycle_work += time.perf_counter() - cycle_started
+
+def main():
+    """Main function to parse arguments and start monitoring."""
+    parser = argparse.ArgumentParser(description='System Resource Monitoring Tool')
+    parser.add_argument('--config', dest='config_file', default=DEFAULT_CONFIG_FILE,
+                        help=f'Path to configuration file (default: {DEFAULT_CONFIG_FILE})')
+    parser.add_argument('--version', action='version', version='System Monitor 1.0.0')
+    
+    args = parser.parse_args()
+    
+    # Start monitoring
+    monitor = SystemMonitor(config_file=args.config_file)
+    monitor.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NUMA-node and hugepage memory metrics for System Monitor
+Reads per-node meminfo, numastat and hugepage pools from
+/sys/devices/system/node and the transparent hugepage counters from
+/proc/vmstat through cached descriptors, so a node running out of memory
+is visible while the machine-wide RAM percentage still looks healthy
+"""
+
+import os
+import re
+import time
+import logging
+import argparse
+from typing import Dict, Any, List, Optional
+
+from procfs_reader import ProcFile, parse_field
+
+NODE_ROOT = "/sys/devices/system/node"
+THP_ROOT = "/sys/kernel/mm/transparent_hugepage"
+
+# Per-node meminfo fields in kB (lines look like 'Node 0 MemFree:   3900348 kB')
+NODE_MEMINFO = {
+    'total': b'MemTotal:', 'free': b'MemFree:', 'anon': b'AnonPages:', 'file': b'FilePages:',
+    'shmem': b'Shmem:', 'slab': b'Slab:', 'anon_huge': b'AnonHugePages:',
+    'active_file': b'Active(file):', 'inactive_file': b'Inactive(file):', 'slab_reclaimable': b'SReclaimable:',
+}
+
+NUMASTAT_EVENTS = ('numa_hit', 'numa_miss', 'numa_foreign', 'interleave_hit', 'local_node', 'other_node')
+
+HUGEPAGE_FILES = {'total': 'nr_hugepages', 'free': 'free_hugepages', 'surplus': 'surplus_hugepages'}
+
+# Transparent hugepage allocation outcomes from /proc/vmstat
+THP_EVENTS = ('thp_fault_alloc', 'thp_fault_fallback', 'thp_collapse_alloc', 'thp_collapse_alloc_failed',
+              'thp_split_page', 'thp_split_page_failed')
+
+NODE_DIR = re.compile(r'node(\d+)$')
+
+
+def node_ids(root: str = NODE_ROOT) -> List[str]:
+    """NUMA node numbers present under root, in numeric order."""
+    nodes = [match.group(1) for match in map(NODE_DIR.match, os.listdir(root)) if match]
+    return sorted(nodes, key=int)
+
+
+def _read_mode(proc_file: Optional[ProcFile]) -> str:
+    """The bracketed choice of a sysfs mode file like 'always [madvise] never'."""
+    if proc_file is None:
+        return ''
+    buffer, length = proc_file.read()
+    start = buffer.find(b'[', 0, length)
+    end = buffer.find(b']', start, length)
+    return buffer[start + 1:end].decode('ascii') if start >= 0 and end > start else ''
+
+
+class _Node:
+    """Cached descriptors of one NUMA node."""
+
+    __slots__ = ('node', 'meminfo', 'numastat', 'hugepages', 'previous')
+
+    def __init__(self, root: str, node: str):
+        path = os.path.join(root, f"node{node}")
+        self.node = node
+        self.meminfo = ProcFile(os.path.join(path, 'meminfo'))
+        self.numastat = ProcFile(os.path.join(path, 'numastat'), 512)
+        self.hugepages = {}
+        pools = os.path.join(path, 'hugepages')
+        for pool in sorted(os.listdir(pools)) if os.path.isdir(pools) else ():
+            # 'hugepages-2048kB' -> '2048kB'
+            size = pool.partition('-')[2]
+            self.hugepages[size] = {key: ProcFile(os.path.join(pools, pool, name), 64)
+                                    for key, name in HUGEPAGE_FILES.items()}
+        self.previous = None
+
+    def close(self) -> None:
+        for proc_file in [self.meminfo, self.numastat] + [f for files in self.hugepages.values() for f in files.values()]:
+            proc_file.close()
+
+
+class NumaCollector:
+    """Per-node memory, NUMA allocation counters, hugepage pools and THP activity."""
+
+    def __init__(self, root: str = NODE_ROOT, proc_root: str = '/proc', thp_root: str = THP_ROOT):
+        """Open every node's files; raises OSError when the kernel exposes no NUMA nodes."""
+        self.logger = logging.getLogger('memory_monitor.numa')
+        self.nodes = [_Node(root, node) for node in node_ids(root)]
+        if not self.nodes:
+            raise OSError(f"No NUMA nodes in {root}")
+        self.vmstat = ProcFile(os.path.join(proc_root, 'vmstat'), 16384)
+        self.thp_modes = {}
+        for name in ('enabled', 'defrag'):
+            try:
+                self.thp_modes[name] = ProcFile(os.path.join(thp_root, name), 128)
+            except OSError:
+                pass  # Kernel built without THP
+
+    def _node_sample(self, node: _Node) -> Dict[str, Any]:
+        buffer, length = node.meminfo.read()
+        memory = {key: parse_field(buffer, length, field) for key, field in NODE_MEMINFO.items()}
+        buffer, length = node.numastat.read()
+        events = {event: parse_field(buffer, length, event.encode() + b' ') for event in NUMASTAT_EVENTS}
+
+        sample = {'node': node.node}
+        for key, value in memory.items():
+            if value is not None:
+                sample[f"{key}_bytes"] = value * 1024
+        # The node files have no MemAvailable; free plus the file LRU and reclaimable slab is the usual estimate
+        total = memory['total']
+        if total:
+            available = sum(memory[key] or 0 for key in ('free', 'active_file', 'inactive_file', 'slab_reclaimable'))
+            sample['available_bytes'] = min(available, total) * 1024
+            sample['memory_percent'] = round((total - min(available, total)) / total * 100, 1)
+
+        sample['events'] = {event: value for event, value in events.items() if value is not None}
+        # Share of the allocations meant for this node that had to come from another node since the
+        # previous sample. That is numa_foreign on the intended node; numa_miss counts the reverse
+        # (other nodes' allocations that landed here) and would point at the neighbour absorbing the spill.
+        previous, node.previous = node.previous, sample['events']
+        sample['miss_percent'] = 0.0
+        if previous and 'numa_hit' in previous and 'numa_foreign' in previous:
+            hits = sample['events'].get('numa_hit', 0) - previous['numa_hit']
+            foreign = sample['events'].get('numa_foreign', 0) - previous['numa_foreign']
+            if hits >= 0 and foreign > 0:
+                sample['miss_percent'] = round(foreign / (hits + foreign) * 100, 2)
+
+        hugepages = {}
+        for size, files in node.hugepages.items():
+            pool = {}
+            for key, proc_file in files.items():
+                buffer, length = proc_file.read()
+                pool[key] = int(buffer[:length])
+            hugepages[size] = pool
+        sample['hugepages'] = hugepages
+        return sample
+
+    def collect(self) -> Dict[str, Any]:
+        """Return {'nodes': [per-node sample, ...], 'thp': {...}}."""
+        nodes = []
+        for node in self.nodes:
+            try:
+                nodes.append(self._node_sample(node))
+            except (OSError, ValueError) as e:
+                self.logger.debug(f"node{node.node} o'qilmadi: {str(e)}")
+
+        buffer, length = self.vmstat.read()
+        thp = {'mode': _read_mode(self.thp_modes.get('enabled')), 'defrag': _read_mode(self.thp_modes.get('defrag'))}
+        events = {event: parse_field(buffer, length, event.encode() + b' ') for event in THP_EVENTS}
+        thp['events'] = {event: value for event, value in events.items() if value is not None}
+        thp['anon_bytes'] = (parse_field(buffer, length, b'nr_anon_transparent_hugepages ') or 0) * 2 * 1024 * 1024
+        return {'nodes': nodes, 'thp': thp}
+
+    @staticmethod
+    def format_table(numa: Dict[str, Any]) -> str:
+        """Format a collect() result for alert messages."""
+        mb = 1024 * 1024
+        result = "NODE USED% AVAIL(MB) ANON(MB) FILE(MB) MISS% HUGEPAGES(FREE/TOTAL)\n"
+        for sample in numa['nodes']:
+            pools = " ".join(f"{size}:{pool['free']}/{pool['total']}" for size, pool in sample['hugepages'].items()
+                             if pool['total'])
+            result += (f"{sample['node']} {sample.get('memory_percent', 0):.1f}% "
+                       f"{sample.get('available_bytes', 0) / mb:.0f} {sample.get('anon_bytes', 0) / mb:.0f} "
+                       f"{sample.get('file_bytes', 0) / mb:.0f} {sample['miss_percent']:.2f}% {pools or '-'}\n")
+        if numa['thp']['mode']:
+            result += f"\nTHP: {numa['thp']['mode']} (defrag {numa['thp']['defrag']})\n"
+        return result
+
+    def close(self) -> None:
+        """Close all cached file descriptors."""
+        for node in self.nodes:
+            node.close()
+        self.vmstat.close()
+        for proc_file in self.thp_modes.values():
+            proc_file.close()
+
+
+def main():
+    """Print per-node memory and time a collection."""
+    parser = argparse.ArgumentParser(description='System Monitor NUMA and hugepage metrics')
+    parser.add_argument('--interval', type=float, default=1, help='Seconds between the two samples (default: 1)')
+    args = parser.parse_args()
+
+    collector = NumaCollector()
+    collector.collect()
+    time.sleep(args.interval)
+    started = time.perf_counter()
+    numa = collector.collect()
+    duration = time.perf_counter() - started
+    collector.close()
+
+    print(NumaCollector.format_table(numa))
+    for event, value in numa['thp']['events'].items():
+        print(f"{event}: {value}")
+    print(f"\n{len(numa['nodes'])} node(s) read in {duration * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Parquet export for System Monitor
+Streams the metrics and alerts tables in chunks into Parquet files
+partitioned by host and day (metrics/host=<name>/date=<YYYY-MM-DD>/part-*.parquet)
+with dictionary-encoded hostnames, continuing from a watermark on every run so
+months of fleet history can be loaded with memory-mapped reads
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+from urllib.parse import quote
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from db_handler import DatabaseHandler
+from replay import ReplayMonitor, _parse_time
+from memory_monitor import DEFAULT_CONFIG_FILE
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.dataset as ds
+    import pyarrow.fs
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+WATERMARK_FILE = "_watermark.json"
+
+TABLES = ('metrics', 'alerts')
+
+# Rows newer than this may still be arriving from buffered writers, so they wait for the next run
+DEFAULT_SETTLE = 300
+
+
+def _schemas() -> Dict[str, 'pa.Schema']:
+    # Hostnames and alert types repeat on every row, so they are stored once per row group
+    label = pa.dictionary(pa.int32(), pa.string())
+    return {
+        'metrics': pa.schema([
+            ('timestamp', pa.timestamp('us')), ('hostname', label),
+            ('ram_usage', pa.float64()), ('cpu_usage', pa.float64()), ('disk_usage', pa.float64()),
+            ('swap_usage', pa.float64()), ('load_average', pa.float64()),
+            ('network_rx', pa.float64()), ('network_tx', pa.float64()), ('extra_data', pa.string()),
+        ]),
+        'alerts': pa.schema([
+            ('timestamp', pa.timestamp('us')), ('hostname', label), ('alert_type', label),
+            ('value', pa.string()), ('message', pa.string()), ('sent_successfully', pa.bool_()),
+            ('snapshot', pa.string()),
+        ]),
+    }
+
+
+def _datetime(value: Any) -> datetime.datetime:
+    """SQLite hands back ISO strings, MySQL and PostgreSQL datetime objects."""
+    if isinstance(value, str):
+        return datetime.datetime.fromisoformat(value)
+    return value
+
+
+class _Partition:
+    """Column buffers and the open writer of one host/day file."""
+
+    __slots__ = ('path', 'columns', 'rows', 'writer')
+
+    def __init__(self, path: str, names: List[str]):
+        self.path = path
+        self.columns = {name: [] for name in names}
+        self.rows = 0
+        self.writer = None
+
+
+class ParquetExporter:
+    """Writes table rows as host/day partitioned Parquet files with bounded memory."""
+
+    def __init__(self, directory: str, chunk_rows: int = 100000, compression: str = 'zstd'):
+        """Export into directory, holding at most chunk_rows buffered rows before writing row groups."""
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Parquet export requires the pyarrow package")
+        self.directory = directory
+        self.chunk_rows = chunk_rows
+        self.compression = compression
+        self.schemas = _schemas()
+        self.logger = logging.getLogger('memory_monitor.parquet')
+
+    def read_watermark(self) -> Dict[str, str]:
+        """{table: ISO time up to which rows are already exported}."""
+        try:
+            with open(os.path.join(self.directory, WATERMARK_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def write_watermark(self, watermark: Dict[str, str]) -> None:
+        path = os.path.join(self.directory, WATERMARK_FILE)
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(watermark, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def export_table(self, table: str, rows: Iterator[Dict[str, Any]], run_id: str) -> Tuple[int, List[str]]:
+        """Write rows (ascending by time) and return (row count, temporary file paths to publish)."""
+        schema = self.schemas[table]
+        names = schema.names
+        partitions = {}
+        written = []
+        buffered = 0
+        count = 0
+        day = None
+
+        for row in rows:
+            timestamp = _datetime(row['timestamp'])
+            row_day = timestamp.date().isoformat()
+            # Rows come in time order, so a new day means every open file of the previous day is complete
+            if row_day != day:
+                self._flush(partitions, schema, close=True, written=written)
+                partitions = {}
+                buffered = 0
+                day = row_day
+            hostname = row['hostname']
+            partition = partitions.get(hostname)
+            if partition is None:
+                path = os.path.join(self.directory, table, f"host={quote(hostname, safe='')}", f"date={day}",
+                                    f"part-{run_id}.parquet")
+                partition = partitions[hostname] = _Partition(path, names)
+            columns = partition.columns
+            columns['timestamp'].append(timestamp)
+            for name in names[1:]:
+                columns[name].append(row[name])
+            if table == 'alerts':
+                # SQLite stores the flag as 0/1
+                columns['sent_successfully'][-1] = bool(columns['sent_successfully'][-1])
+            partition.rows += 1
+            buffered += 1
+            count += 1
+            if buffered >= self.chunk_rows:
+                self._flush(partitions, schema, close=False, written=written)
+                buffered = 0
+
+        self._flush(partitions, schema, close=True, written=written)
+        return count, written
+
+    def _flush(self, partitions: Dict[str, _Partition], schema: 'pa.Schema', close: bool, written: List[str]) -> None:
+        """Append every buffered partition as a row group, closing the files when their day is done."""
+        for partition in partitions.values():
+            if partition.rows:
+                batch = pa.record_batch([pa.array(partition.columns[name], type=field.type)
+                                         for name, field in zip(schema.names, schema)], schema=schema)
+                if partition.writer is None:
+                    os.makedirs(os.path.dirname(partition.path), exist_ok=True)
+                    partition.writer = pq.ParquetWriter(f"{partition.path}.tmp", schema,
+                                                        compression=self.compression)
+                    written.append(partition.path)
+                partition.writer.write_batch(batch)
+                for column in partition.columns.values():
+                    column.clear()
+                partition.rows = 0
+            if close and partition.writer is not None:
+                partition.writer.close()
+                partition.writer = None
+
+    def export(self, handler: DatabaseHandler, tables: Tuple[str, ...], start: datetime.datetime,
+               end: datetime.datetime, full: bool = False) -> Dict[str, int]:
+        """Export [watermark or start, end) of each table and advance the watermark; returns rows per table."""
+        watermark = {} if full else self.read_watermark()
+        run_id = end.strftime('%Y%m%d%H%M%S')
+        counts = {}
+        pending = []
+        for table in tables:
+            table_start = datetime.datetime.fromisoformat(watermark[table]) if table in watermark else start
+            if table_start >= end:
+                counts[table] = 0
+                continue
+            iterate = handler.iter_metrics if table == 'metrics' else handler.iter_alerts
+            counts[table], written = self.export_table(table, iterate(table_start, end, batch_size=self.chunk_rows),
+                                                       run_id)
+            pending.extend(written)
+            watermark[table] = end.isoformat()
+            self.logger.info(f"{table}: {counts[table]} qator, {len(written)} fayl ({table_start} - {end})")
+
+        # Files become visible together and before the watermark moves, so a failed run is simply repeated
+        for path in pending:
+            os.replace(f"{path}.tmp", path)
+        self.write_watermark(watermark)
+        return counts
+
+
+def load(directory: str, table: str = 'metrics', hosts: Optional[List[str]] = None,
+         start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+         columns: Optional[List[str]] = None) -> 'pa.Table':
+    """Read an export back through memory-mapped files, pruning partitions by host and day."""
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Parquet export requires the pyarrow package")
+    # Dates stay strings so the partition filter below compares like the directory names
+    partitioning = ds.partitioning(pa.schema([('host', pa.string()), ('date', pa.string())]), flavor='hive')
+    dataset = ds.dataset(os.path.join(directory, table), format='parquet', partitioning=partitioning,
+                         filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True))
+    condition = None
+    parts = []
+    if hosts:
+        parts.append(ds.field('host').isin(hosts))
+    if start is not None:
+        parts.append(ds.field('date') >= start.date().isoformat())
+        parts.append(ds.field('timestamp') >= pa.scalar(start, pa.timestamp('us')))
+    if end is not None:
+        parts.append(ds.field('date') <= end.date().isoformat())
+        parts.append(ds.field('timestamp') < pa.scalar(end, pa.timestamp('us')))
+    for part in parts:
+        condition = part if condition is None else condition & part
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def main():
+    """Export new rows since the last run, or time a memory-mapped read of an export."""
+    parser = argparse.ArgumentParser(description='Export System Monitor history to partitioned Parquet files')
+    parser.add_argument('output', help='Export directory (holds the partitions and the watermark)')
+    parser.add_argument('--config', default=DEFAULT_CONFIG_FILE, help='Configuration with the [Database] section')
+    parser.add_argument('--tables', default=','.join(TABLES), help='Comma separated tables (default: metrics,alerts)')
+    parser.add_argument('--since', default='90d',
+                        help="Start when there is no watermark: 'YYYY-MM-DD HH:MM' or '<N>h'/'<N>d' (default: 90d)")
+    parser.add_argument('--settle', type=int, default=DEFAULT_SETTLE,
+                        help=f'Leave rows newer than this many seconds for the next run (default: {DEFAULT_SETTLE})')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore the watermark and export from --since into a new directory')
+    parser.add_argument('--chunk-rows', type=int, default=100000, help='Rows fetched and buffered at a time')
+    parser.add_argument('--compression', default='zstd', help='Parquet compression codec (default: zstd)')
+    parser.add_argument('--read', action='store_true', help='Load the export instead and report its size and speed')
+    parser.add_argument('--host', action='append', help='With --read: only these hostnames')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(levelname)s] - %(message)s')
+    if not PYARROW_AVAILABLE:
+        print("XATO: Parquet eksporti uchun pyarrow paketi kerak (pip install pyarrow)")
+        sys.exit(1)
+    tables = tuple(table.strip() for table in args.tables.split(',') if table.strip())
+    unknown = [table for table in tables if table not in TABLES]
+    if unknown:
+        parser.error(f"Unknown table(s): {', '.join(unknown)}")
+
+    if args.read:
+        for table in tables:
+            if not os.path.isdir(os.path.join(args.output, table)):
+                continue
+            started = time.perf_counter()
+            data = load(args.output, table, args.host, _parse_time(args.since))
+            print(f"{table}: {data.num_rows} qator, {data.nbytes / 1048576:.1f} MB xotirada, "
+                  f"{time.perf_counter() - started:.2f} s")
+        return
+
+    config = ReplayMonitor(args.config).config
+    if not config['db_enabled']:
+        print("XATO: konfiguratsiyada db_enabled o'chirilgan")
+        sys.exit(1)
+
+    os.makedirs(args.output, exist_ok=True)
+    exporter = ParquetExporter(args.output, args.chunk_rows, args.compression)
+    end = (datetime.datetime.now() - datetime.timedelta(seconds=args.settle)).replace(microsecond=0)
+    handler = DatabaseHandler(config)
+    started = time.perf_counter()
+    try:
+        counts = exporter.export(handler, tables, _parse_time(args.since), end, args.full)
+    finally:
+        handler.close()
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(f"{total} qator {elapsed:.1f} s da eksport qilindi ({total / elapsed if elapsed else 0:.0f} qator/s): "
+          + ", ".join(f"{table}={count}" for table, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
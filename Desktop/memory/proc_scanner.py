@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Parallel process table scanner for System Monitor (Linux only)
+Splits the PID list across a pool of worker processes that parse
+/proc/<pid>/stat and return packed arrays, then merges them and picks
+the top processes in the parent
+"""
+
+import os
+import sys
+import time
+import heapq
+import logging
+import argparse
+import multiprocessing
+from array import array
+from typing import Dict, Any, List, Tuple
+
+import psutil
+
+# Fields per process in the packed arrays
+FIELDS = ('pid', 'ppid', 'rss', 'cpu_ticks', 'start_ticks')
+STRIDE = len(FIELDS)
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def scan_chunk(task: Tuple[str, bytes]) -> bytes:
+    """Worker: parse /proc/<pid>/stat for a packed chunk of PIDs and return a packed result array."""
+    proc_root, packed_pids = task
+    pids = array('i')
+    pids.frombytes(packed_pids)
+    out = array('q')
+    for pid in pids:
+        try:
+            with open(f"{proc_root}/{pid}/stat", 'rb') as f:
+                data = f.read()
+            # comm may contain spaces and parentheses, so fields are counted from the last ')'
+            fields = data[data.rindex(b')') + 2:].split()
+            out.extend((pid, int(fields[1]), int(fields[21]) * PAGE_SIZE,
+                        int(fields[11]) + int(fields[12]), int(fields[19])))
+        except (OSError, ValueError, IndexError):
+            continue  # Exited during the scan
+    return out.tobytes()
+
+
+class ParallelProcScanner:
+    """Process table scanner that fans /proc parsing out to a worker pool."""
+
+    def __init__(self, workers: int, parallel_min: int = 5000, proc_root: str = '/proc'):
+        """Initialize the scanner; the pool is started on first use."""
+        self.workers = max(1, workers)
+        self.parallel_min = parallel_min
+        self.proc_root = proc_root
+        self.logger = logging.getLogger('memory_monitor.proc_scanner')
+        self.pool = None
+        self.boot_time = psutil.boot_time()
+        self.mem_total = psutil.virtual_memory().total
+        # (pid, start_ticks) -> cpu_ticks from the previous scan, for per-interval CPU percent
+        self.previous = {}
+        self.previous_time = None
+        self.last_size = 0
+
+    def _get_pool(self):
+        if self.pool is None:
+            # forkserver: the monitor runs threads (PSI, exporters) that must not be forked mid-operation
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self.pool = context.Pool(self.workers)
+            self.logger.info(f"Process scanner pool started with {self.workers} workers")
+        return self.pool
+
+    def _list_pids(self) -> array:
+        pids = array('i')
+        with os.scandir(self.proc_root) as entries:
+            for entry in entries:
+                if entry.name.isdigit():
+                    pids.append(int(entry.name))
+        return pids
+
+    def scan(self) -> array:
+        """Return the packed table of every process (STRIDE values per process)."""
+        pids = self._list_pids()
+        self.last_size = len(pids)
+        if self.workers == 1 or len(pids) < self.parallel_min:
+            # IPC costs more than it saves on small tables
+            table = array('q')
+            table.frombytes(scan_chunk((self.proc_root, pids.tobytes())))
+            return table
+
+        # Several chunks per worker keep the pool busy when some ranges are denser or slower
+        chunks = self.workers * 4
+        size = -(-len(pids) // chunks)
+        tasks = [(self.proc_root, pids[i:i + size].tobytes()) for i in range(0, len(pids), size)]
+        table = array('q')
+        for packed in self._get_pool().imap(scan_chunk, tasks):
+            table.frombytes(packed)
+        return table
+
+    def top(self, count: int, key: str = 'rss') -> List[Dict[str, Any]]:
+        """Scan and return the `count` largest processes by 'rss' or 'cpu', formatted like psutil rows."""
+        table = self.scan()
+        now = time.monotonic()
+        elapsed = now - self.previous_time if self.previous_time is not None else 0.0
+        uptime_ticks = (time.time() - self.boot_time) * CLOCK_TICKS
+
+        previous = self.previous
+        current = {}
+        cpu = array('d', bytes(8 * (len(table) // STRIDE)))
+        for index in range(len(table) // STRIDE):
+            base = index * STRIDE
+            pid, ticks, start = table[base], table[base + 3], table[base + 4]
+            current[(pid, start)] = ticks
+            before = previous.get((pid, start))
+            if before is not None and elapsed > 0:
+                cpu[index] = (ticks - before) / CLOCK_TICKS / elapsed * 100
+            elif uptime_ticks > start:
+                # First sighting: lifetime average, as ps reports it
+                cpu[index] = ticks / (uptime_ticks - start) * 100
+        self.previous = current
+        self.previous_time = now
+
+        if key == 'rss':
+            order = heapq.nlargest(count, range(len(cpu)), key=lambda i: table[i * STRIDE + 2])
+        else:
+            order = heapq.nlargest(count, range(len(cpu)), key=cpu.__getitem__)
+
+        result = []
+        for index in order:
+            base = index * STRIDE
+            pid = table[base]
+            result.append({
+                'pid': pid,
+                'ppid': table[base + 1],
+                'name': self._name(pid),
+                'memory_percent': table[base + 2] / self.mem_total * 100 if self.mem_total else 0.0,
+                'cpu_percent': round(cpu[index], 1),
+                'create_time': self.boot_time + table[base + 4] / CLOCK_TICKS,
+            })
+        return result
+
+    def _name(self, pid: int) -> str:
+        try:
+            with open(f"{self.proc_root}/{pid}/comm", 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return "?"
+
+    def close(self) -> None:
+        """Stop the worker pool."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+
+def main():
+    """Compare psutil.process_iter with the serial and parallel scanners."""
+    parser = argparse.ArgumentParser(description='System Monitor process scanner benchmark')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes')
+    parser.add_argument('--count', type=int, default=10, help='Top processes to select')
+    parser.add_argument('--rounds', type=int, default=3, help='Scans per method')
+    args = parser.parse_args()
+
+    if not sys.platform.startswith('linux'):
+        print("The process scanner is only available on Linux")
+        sys.exit(1)
+
+    def psutil_top():
+        rows = [p.info for p in psutil.process_iter(['pid', 'ppid', 'name', 'memory_percent', 'cpu_percent'])]
+        return heapq.nlargest(args.count, rows, key=lambda row: row['memory_percent'] or 0.0)
+
+    serial = ParallelProcScanner(1)
+    parallel = ParallelProcScanner(args.workers, parallel_min=0)
+    parallel.scan()  # Start the pool outside the measurement
+
+    print(f"{parallel.last_size} processes, {args.workers} workers")
+    for label, func in (('psutil.process_iter', psutil_top),
+                        ('serial /proc scan', lambda: serial.top(args.count)),
+                        ('parallel /proc scan', lambda: parallel.top(args.count))):
+        timings = []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        print(f"  {label:22s} best {min(timings) * 1000:8.1f} ms")
+
+    serial_top = [row['pid'] for row in serial.top(args.count)]
+    parallel_top = [row['pid'] for row in parallel.top(args.count)]
+    print(f"Top-{args.count} by RSS identical: {serial_top == parallel_top}")
+    parallel.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Process group aggregation for System Monitor
+Groups the per-cycle process snapshot by command name, user, cgroup or
+parent subtree and keeps group totals up to date incrementally
+"""
+
+import time
+import heapq
+import logging
+from typing import Dict, Any, List, Tuple
+
+import psutil
+
+GROUP_BY_OPTIONS = ('name', 'user', 'cgroup', 'subtree')
+
+
+def _read_cgroup(pid: int) -> str:
+    """Return the cgroup v2 path (or first v1 hierarchy path) of a process."""
+    try:
+        with open(f"/proc/{pid}/cgroup", 'r') as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return "?"
+    for line in lines:
+        if line.startswith('0::'):
+            return line[3:] or "/"
+    return lines[0].split(':', 2)[2] if lines else "?"
+
+
+class ProcessGroupAggregator:
+    """Incrementally maintained per-group RSS, CPU and process-count totals."""
+
+    def __init__(self, group_by: str = 'name'):
+        """Initialize an empty aggregator for the given grouping."""
+        if group_by not in GROUP_BY_OPTIONS:
+            raise ValueError(f"Unsupported process grouping: {group_by}")
+        self.group_by = group_by
+        self.logger = logging.getLogger('memory_monitor.process_groups')
+        # pid -> (create_time, group, rss, cpu_seconds)
+        self.processes = {}
+        # group -> [rss, cpu_seconds_delta, count]
+        self.groups = {}
+        self.cgroup_cache = {}
+        self.last_update = None
+        self.elapsed = 0.0
+
+    def _group_key(self, info: Dict[str, Any], parents: Dict[int, Tuple[int, str]]) -> str:
+        """Return the group a process belongs to."""
+        if self.group_by == 'name':
+            return info['name'] or "?"
+        if self.group_by == 'user':
+            return info['username'] or "?"
+        if self.group_by == 'cgroup':
+            key = (info['pid'], info['create_time'])
+            cgroup = self.cgroup_cache.get(key)
+            if cgroup is None:
+                cgroup = self.cgroup_cache[key] = _read_cgroup(info['pid'])
+            return cgroup
+
+        # subtree: the ancestor directly below init; kernel threads share kthreadd's group
+        pid = info['pid']
+        seen = 0
+        while seen < 64:
+            ppid, name = parents.get(pid, (0, "?"))
+            if ppid == 2:
+                return f"2:{parents.get(2, (0, 'kthreadd'))[1]}"
+            if ppid in (0, 1) or ppid not in parents:
+                return f"{pid}:{name}"
+            pid = ppid
+            seen += 1
+        return f"{pid}:{parents.get(pid, (0, '?'))[1]}"
+
+    def _adjust(self, group: str, rss: int, cpu: float, count: int) -> None:
+        """Add deltas to a group's totals, dropping empty groups."""
+        totals = self.groups.get(group)
+        if totals is None:
+            totals = self.groups[group] = [0, 0.0, 0]
+        totals[0] += rss
+        totals[1] += cpu
+        totals[2] += count
+        if totals[2] <= 0:
+            del self.groups[group]
+
+    def update(self) -> int:
+        """Scan the process table once and fold the changes into the group totals."""
+        now = time.monotonic()
+        snapshot = []
+        parents = {}
+        for proc in psutil.process_iter(['pid', 'ppid', 'name', 'username', 'memory_info', 'cpu_times', 'create_time']):
+            info = proc.info
+            if info['memory_info'] is None or info['cpu_times'] is None:
+                continue
+            parents[info['pid']] = (info['ppid'], info['name'])
+            snapshot.append(info)
+
+        # CPU deltas are per cycle, so the previous cycle's deltas are cleared first
+        for totals in self.groups.values():
+            totals[1] = 0.0
+
+        seen = set()
+        for info in snapshot:
+            pid = info['pid']
+            seen.add(pid)
+            rss = info['memory_info'].rss
+            cpu = info['cpu_times'].user + info['cpu_times'].system
+            group = self._group_key(info, parents)
+            previous = self.processes.get(pid)
+
+            if previous is not None and previous[0] == info['create_time']:
+                _, old_group, old_rss, old_cpu = previous
+                cpu_delta = max(0.0, cpu - old_cpu)
+                if old_group == group:
+                    self._adjust(group, rss - old_rss, cpu_delta, 0)
+                else:
+                    self._adjust(old_group, -old_rss, 0.0, -1)
+                    self._adjust(group, rss, cpu_delta, 1)
+            else:
+                if previous is not None:
+                    # PID was recycled
+                    self._adjust(previous[1], -previous[2], 0.0, -1)
+                self._adjust(group, rss, 0.0, 1)
+
+            self.processes[pid] = (info['create_time'], group, rss, cpu)
+
+        for pid in [pid for pid in self.processes if pid not in seen]:
+            _, old_group, old_rss, _ = self.processes.pop(pid)
+            self._adjust(old_group, -old_rss, 0.0, -1)
+        if self.group_by == 'cgroup':
+            self.cgroup_cache = {key: value for key, value in self.cgroup_cache.items() if key[0] in seen}
+
+        self.elapsed = now - self.last_update if self.last_update is not None else 0.0
+        self.last_update = now
+        return len(snapshot)
+
+    def top(self, count: int, key: str = 'rss') -> List[Dict[str, Any]]:
+        """Return the largest groups by 'rss' or 'cpu'."""
+        index = 0 if key == 'rss' else 1
+        largest = heapq.nlargest(count, self.groups.items(), key=lambda item: item[1][index])
+        return [self._group_dict(group, totals) for group, totals in largest]
+
+    def _group_dict(self, group: str, totals: List) -> Dict[str, Any]:
+        """Convert internal totals into an exported group record."""
+        cpu_percent = totals[1] / self.elapsed * 100 if self.elapsed else 0.0
+        return {
+            'group': group,
+            'processes': totals[2],
+            'rss_mb': round(totals[0] / 1024 / 1024, 1),
+            'cpu_percent': round(cpu_percent, 1),
+        }
+
+    def top_groups(self, count: int) -> List[Dict[str, Any]]:
+        """Union of the top groups by RSS and by CPU, largest RSS first."""
+        result = self.top(count, 'rss')
+        names = {group['group'] for group in result}
+        result.extend(group for group in self.top(count, 'cpu') if group['group'] not in names)
+        return result
+
+    @staticmethod
+    def format_table(groups: List[Dict[str, Any]], group_by: str) -> str:
+        """Format group records for alert messages."""
+        result = f"{group_by.upper()} COUNT RSS(MB) %CPU%\n"
+        for group in groups:
+            result += f"{group['group']} {group['processes']} {group['rss_mb']:.0f} {group['cpu_percent']:.1f}%\n"
+        return result
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fast /proc readers for System Monitor (Linux only)
+Keeps /proc files open and re-reads them with pread into reusable buffers,
+parsing only the fields the monitor needs
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+PROCFS_AVAILABLE = sys.platform.startswith('linux') and hasattr(os, 'preadv')
+
+
+class ProcFile:
+    """An open /proc file re-read from offset 0 into a reusable buffer."""
+
+    __slots__ = ('path', 'fd', 'buffer')
+
+    def __init__(self, path: str, size: int = 4096, dir_fd: Optional[int] = None):
+        """Open the file (relative to dir_fd if given); raises OSError if it does not exist."""
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0), dir_fd=dir_fd)
+        self.buffer = bytearray(size)
+
+    def read(self) -> Tuple[bytearray, int]:
+        """Re-read the whole file and return (buffer, length); the buffer is reused on the next call."""
+        buffer = self.buffer
+        length = 0
+        while True:
+            if length == len(buffer):
+                # Grow once and keep the larger buffer for subsequent reads
+                grown = bytearray(len(buffer) * 2)
+                grown[:length] = buffer[:length]
+                buffer = self.buffer = grown
+            with memoryview(buffer) as view:
+                count = os.preadv(self.fd, [view[length:]], length)
+            if count == 0:
+                return buffer, length
+            length += count
+
+    def close(self) -> None:
+        """Close the file descriptor."""
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def parse_field(buffer: bytearray, length: int, key: bytes) -> Optional[int]:
+    """Return the first integer after `key` (e.g. b'MemTotal:') in a key/value /proc file."""
+    start = buffer.find(key, 0, length)
+    if start < 0:
+        return None
+    end = buffer.find(b'\n', start, length)
+    return int(buffer[start + len(key):end if end >= 0 else length].split()[0])
+
+
+class ProcReader:
+    """Core metric readers over cached /proc file descriptors.
+
+    Buffers are shared between calls, so one instance must only be used
+    from a single thread (the monitoring loop).
+    """
+
+    def __init__(self, proc_root: str = '/proc'):
+        """Open the /proc files used by the fast path."""
+        self.logger = logging.getLogger('memory_monitor.procfs')
+        self.meminfo = ProcFile(os.path.join(proc_root, 'meminfo'))
+        self.stat = ProcFile(os.path.join(proc_root, 'stat'), 16384)
+        self.loadavg_file = ProcFile(os.path.join(proc_root, 'loadavg'), 256)
+        self.net_dev = ProcFile(os.path.join(proc_root, 'net', 'dev'), 8192)
+        self.cpu_count = os.cpu_count() or 1
+
+    def memory(self) -> Dict[str, Optional[int]]:
+        """Return MemTotal, MemFree, MemAvailable, SwapTotal and SwapFree in kB."""
+        buffer, length = self.meminfo.read()
+        return {
+            'mem_total': parse_field(buffer, length, b'MemTotal:'),
+            'mem_free': parse_field(buffer, length, b'MemFree:'),
+            'mem_available': parse_field(buffer, length, b'MemAvailable:'),
+            'swap_total': parse_field(buffer, length, b'SwapTotal:'),
+            'swap_free': parse_field(buffer, length, b'SwapFree:'),
+        }
+
+    def ram_percent(self) -> Optional[float]:
+        """Return RAM usage percent as psutil.virtual_memory().percent does, or None without MemAvailable."""
+        buffer, length = self.meminfo.read()
+        total = parse_field(buffer, length, b'MemTotal:')
+        available = parse_field(buffer, length, b'MemAvailable:')
+        if not total or available is None:
+            return None
+        return round((total - available) / total * 100, 1)
+
+    def swap_percent(self) -> float:
+        """Return swap usage percent as psutil.swap_memory().percent does (0 without swap)."""
+        buffer, length = self.meminfo.read()
+        total = parse_field(buffer, length, b'SwapTotal:')
+        if not total:
+            return 0
+        free = parse_field(buffer, length, b'SwapFree:')
+        return round((total - free) / total * 100, 1)
+
+    def loadavg(self) -> float:
+        """Return the 1 minute load average."""
+        buffer, length = self.loadavg_file.read()
+        return float(buffer[:buffer.find(b' ', 0, length)])
+
+    def cpu_times(self) -> Tuple[int, int]:
+        """Return (busy, total) jiffies from the aggregate cpu line of /proc/stat."""
+        buffer, length = self.stat.read()
+        end = buffer.find(b'\n', 0, length)
+        fields = [int(value) for value in buffer[4:end].split()]
+        # guest and guest_nice are already included in user and nice
+        total = sum(fields[:8])
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+        return total - idle, total
+
+    def net_bytes(self, interface: str) -> Optional[Tuple[int, int]]:
+        """Return (rx_bytes, tx_bytes) for an interface, or None if it is not listed."""
+        buffer, length = self.net_dev.read()
+        key = interface.encode() + b':'
+        start = buffer.find(key, 0, length)
+        while start > 0 and buffer[start - 1] not in b' \n':
+            start = buffer.find(key, start + 1, length)
+        if start < 0:
+            return None
+        end = buffer.find(b'\n', start, length)
+        fields = buffer[start + len(key):end if end >= 0 else length].split()
+        return int(fields[0]), int(fields[8])
+
+    def close(self) -> None:
+        """Close all cached file descriptors."""
+        for proc_file in (self.meminfo, self.stat, self.loadavg_file, self.net_dev):
+            proc_file.close()
+
+
+def read_smaps_rollup(pid: int, proc_root: str = '/proc') -> Optional[Dict[str, int]]:
+    """Return PSS, USS and swap in bytes from /proc/<pid>/smaps_rollup, or None if unreadable."""
+    try:
+        with open(f"{proc_root}/{pid}/smaps_rollup", 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    values = {}
+    for line in data.splitlines()[1:]:
+        key, _, rest = line.partition(b':')
+        if key in (b'Pss', b'Private_Clean', b'Private_Dirty', b'Swap'):
+            values[key] = int(rest.split()[0]) * 1024
+    if b'Pss' not in values:
+        return None
+    return {
+        'pss': values[b'Pss'],
+        'uss': values.get(b'Private_Clean', 0) + values.get(b'Private_Dirty', 0),
+        'swap': values.get(b'Swap', 0),
+    }
+
+
+class SmapsCache:
+    """Short-lived per-PID cache of smaps_rollup results.
+
+    Entries are keyed by PID and invalidated when the process start time
+    changes, so a recycled PID never reuses another process's numbers.
+    """
+
+    def __init__(self, ttl: float = 30, max_entries: int = 256, proc_root: str = '/proc'):
+        """Initialize an empty cache."""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.proc_root = proc_root
+        self.entries = OrderedDict()
+
+    def get(self, pid: int, create_time: float) -> Optional[Dict[str, int]]:
+        """Return cached or freshly read smaps_rollup values for a process."""
+        now = time.monotonic()
+        entry = self.entries.get(pid)
+        if entry is not None and entry[0] == create_time and now - entry[1] < self.ttl:
+            self.entries.move_to_end(pid)
+            return entry[2]
+
+        value = read_smaps_rollup(pid, self.proc_root)
+        self.entries[pid] = (create_time, now, value)
+        self.entries.move_to_end(pid)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return value
+
+
+def cpu_percent(previous: Tuple[int, int], current: Tuple[int, int]) -> float:
+    """Return CPU usage percent between two cpu_times() samples, like psutil.cpu_percent()."""
+    total_delta = current[1] - previous[1]
+    if total_delta <= 0:
+        return 0.0
+    busy_delta = max(0, current[0] - previous[0])
+    return round(min(100.0, busy_delta / total_delta * 100), 1)
+
+
+def compare_with_psutil(reader: ProcReader, interface: Optional[str] = None) -> Dict[str, Tuple[Any, Any]]:
+    """Read each value through the fast path and through psutil, returning {name: (fast, psutil)}."""
+    import psutil
+
+    results = {
+        'ram_percent': (reader.ram_percent(), psutil.virtual_memory().percent),
+        'swap_percent': (reader.swap_percent(), psutil.swap_memory().percent if psutil.swap_memory().total else 0),
+        'loadavg': (reader.loadavg(), os.getloadavg()[0]),
+        'cpu_count': (reader.cpu_count, psutil.cpu_count(logical=True)),
+    }
+
+    before_fast = reader.cpu_times()
+    psutil.cpu_percent(interval=None)
+    time.sleep(0.5)
+    results['cpu_percent'] = (cpu_percent(before_fast, reader.cpu_times()), psutil.cpu_percent(interval=None))
+
+    counters = psutil.net_io_counters(pernic=True)
+    for name in ([interface] if interface else counters):
+        if name in counters:
+            results[f"net_bytes[{name}]"] = (reader.net_bytes(name),
+                                             (counters[name].bytes_recv, counters[name].bytes_sent))
+    return results
+
+
+def _benchmark(reader: ProcReader, interface: str, iterations: int) -> Dict[str, Tuple[float, float]]:
+    """Return {probe: (fast_us, psutil_us)} CPU time per call."""
+    import psutil
+
+    probes = {
+        'ram': (reader.ram_percent, lambda: psutil.virtual_memory().percent),
+        'swap': (reader.swap_percent, lambda: psutil.swap_memory().percent),
+        'load': (lambda: reader.loadavg() / reader.cpu_count,
+                 lambda: os.getloadavg()[0] / psutil.cpu_count(logical=True)),
+        'cpu_times': (reader.cpu_times, lambda: psutil.cpu_times()),
+        'network': (lambda: reader.net_bytes(interface),
+                    lambda: psutil.net_io_counters(pernic=True).get(interface)),
+    }
+    results = {}
+    for name, (fast, slow) in probes.items():
+        timings = []
+        for func in (fast, slow):
+            started = time.process_time()
+            for _ in range(iterations):
+                func()
+            timings.append((time.process_time() - started) / iterations * 1e6)
+        results[name] = tuple(timings)
+    return results
+
+
+def main():
+    """Check parity with psutil and optionally compare CPU cost per call."""
+    parser = argparse.ArgumentParser(description='System Monitor /proc fast path parity check')
+    parser.add_argument('--interface', default=None, help='Network interface to compare (default: all)')
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help='Allowed difference for percentages that change between reads')
+    parser.add_argument('--benchmark', type=int, default=0, metavar='N',
+                        help='Also time N calls of each probe through both paths')
+    args = parser.parse_args()
+
+    if not PROCFS_AVAILABLE:
+        print("The /proc fast path is only available on Linux")
+        sys.exit(1)
+
+    reader = ProcReader()
+    failures = 0
+    for name, (fast, reference) in compare_with_psutil(reader, args.interface).items():
+        if isinstance(fast, tuple) or isinstance(reference, tuple):
+            # Byte counters only move forward; the fast path is read first
+            ok = fast is not None and reference is not None and all(
+                0 <= ref - value <= 10 * 1024 * 1024 for value, ref in zip(fast, reference))
+        elif name == 'cpu_percent':
+            ok = abs(fast - reference) <= max(args.tolerance, 5.0)
+        else:
+            ok = fast is not None and abs(fast - reference) <= args.tolerance
+        failures += 0 if ok else 1
+        print(f"{'OK  ' if ok else 'FAIL'} {name}: fast={fast} psutil={reference}")
+
+    if args.benchmark:
+        interface = args.interface or next((n for n in os.listdir('/sys/class/net') if n != 'lo'), 'lo')
+        print(f"\nCPU time per call over {args.benchmark} iterations (interface {interface}):")
+        for name, (fast_us, psutil_us) in _benchmark(reader, interface, args.benchmark).items():
+            print(f"  {name:10s} fast={fast_us:8.1f}us psutil={psutil_us:8.1f}us")
+
+    reader.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
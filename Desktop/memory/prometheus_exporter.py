@@ -6,16 +6,20 @@ Prometheus metrics exporter for System Monitor
 Exposes system metrics for Prometheus scraping
 """
 
+import sys
 import time
 import logging
+import argparse
 import threading
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import json
 
 try:
     from prometheus_client import start_http_server, Gauge, Counter, Info
-    from prometheus_client.core import CollectorRegistry
+    from prometheus_client.core import (
+        CollectorRegistry, CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+    )
     PROMETHEUS_AVAILABLE = True
 except ImportError:
     PROMETHEUS_AVAILABLE = False
@@ -24,13 +28,23 @@ except ImportError:
 class PrometheusExporter:
     """Prometheus metrics exporter for System Monitor."""
 
-    def __init__(self, config: Dict[str, Any]):
-        """Initialize Prometheus exporter with configuration."""
+    def __init__(self, config: Dict[str, Any], self_metrics=None, serve: bool = True):
+        """Initialize Prometheus exporter with configuration; serve=False only builds the registry."""
         self.config = config
+        self.self_metrics = self_metrics
+        self.serve = serve
         self.logger = logging.getLogger('memory_monitor.prometheus')
-        self.enabled = config.get('prometheus_enabled', False)
+        # remote_write and the rule generator need the same registry even when nothing scrapes it
+        self.enabled = (config.get('prometheus_enabled', False) or config.get('remote_write_enabled', False)
+                        or not serve)
         self.port = config.get('prometheus_port', 9090)
         self.metrics = {}
+        self.cgroup_samples = []
+        self.process_groups = []
+        self.sockets = None
+        self.numa = None
+        self.discovery = None
+        self.filesystems = {}
         self.registry = None
         self.server = None
         self.server_thread = None
@@ -70,10 +84,45 @@ class PrometheusExporter:
             self.metrics['swap_alerts'] = Counter('system_monitor_swap_alerts_total', 'Total number of swap alerts', registry=self.registry)
             self.metrics['load_alerts'] = Counter('system_monitor_load_alerts_total', 'Total number of load alerts', registry=self.registry)
             self.metrics['network_alerts'] = Counter('system_monitor_network_alerts_total', 'Total number of network alerts', registry=self.registry)
+            self.metrics['cgroup_alerts'] = Counter('system_monitor_cgroup_alerts_total', 'Total number of cgroup alerts', registry=self.registry)
+            self.metrics['pressure_alerts'] = Counter('system_monitor_pressure_alerts_total', 'Total number of pressure stall alerts', registry=self.registry)
+            self.metrics['numa_alerts'] = Counter('system_monitor_numa_alerts_total', 'Total number of NUMA node memory alerts', registry=self.registry)
+            self.metrics['socket_alerts'] = Counter('system_monitor_socket_alerts_total', 'Total number of socket alerts', registry=self.registry)
+            self.metrics['rule_alerts'] = Counter('system_monitor_rule_alerts_total', 'Total number of alert rule notifications without a resource type', registry=self.registry)
+            
+            # Pressure Stall Information
+            for window in ('avg10', 'avg60', 'avg300'):
+                self.metrics[f'pressure_{window}'] = Gauge(f'system_monitor_pressure_{window}_percent', f'PSI {window} share of time stalled in percent', ['resource', 'kind'], registry=self.registry)
+            self.metrics['pressure_stall'] = Gauge('system_monitor_pressure_stall_seconds', 'Cumulative PSI stall time in seconds', ['resource', 'kind'], registry=self.registry)
+            
+            # Monitor self-instrumentation, read from SelfMetrics at scrape time
+            if self.self_metrics is not None and self.self_metrics.enabled:
+                self.registry.register(SelfMetricsCollector(self.self_metrics))
+            
+            # Per-cgroup series, rebuilt from the latest sample at scrape time
+            if self.config.get('monitor_cgroups', False):
+                self.registry.register(CgroupMetricsCollector(self))
+            
+            # Top process groups, replaced every cycle
+            if self.config.get('process_groups_enabled', False):
+                self.registry.register(ProcessGroupCollector(self))
+            
+            # Socket states, remote addresses and kernel drop counters
+            if self.config.get('monitor_sockets', False):
+                self.registry.register(SocketCollector(self))
+            
+            # Per NUMA node memory, hugepage pools and THP counters
+            if self.config.get('monitor_numa', False):
+                self.registry.register(NumaMetricsCollector(self))
+            
+            # Discovered filesystems, interfaces and process groups as label sets
+            if self.config.get('discovery_enabled', False):
+                self.registry.register(DiscoveryCollector(self))
             
             # Start the server
-            self._start_server()
-            self.logger.info(f"Prometheus exporter initialized on port {self.port}")
+            if self.serve and self.config.get('prometheus_enabled', False):
+                self._start_server()
+                self.logger.info(f"Prometheus exporter initialized on port {self.port}")
             
         except Exception as e:
             self.logger.error(f"Failed to initialize Prometheus metrics: {str(e)}")
@@ -124,6 +173,18 @@ class PrometheusExporter:
                 self.metrics['network_rx'].set(rx_rate)
                 self.metrics['network_tx'].set(tx_rate)
             
+            # Top process groups are read by ProcessGroupCollector at scrape time
+            self.process_groups = metrics.get('process_groups', [])
+            self.sockets = metrics.get('sockets')
+            self.numa = metrics.get('numa')
+            
+            # Update pressure stall metrics
+            for resource, lines in metrics.get('pressure', {}).items():
+                for kind, values in lines.items():
+                    for window in ('avg10', 'avg60', 'avg300'):
+                        self.metrics[f'pressure_{window}'].labels(resource, kind).set(values.get(window, 0))
+                    self.metrics['pressure_stall'].labels(resource, kind).set(values.get('total', 0) / 1e6)
+            
             self.logger.debug("Prometheus metrics updated successfully")
             return True
             
@@ -131,6 +192,44 @@ class PrometheusExporter:
             self.logger.error(f"Failed to update Prometheus metrics: {str(e)}")
             return False
     
+    def update_cgroup_metrics(self, samples: List[Dict[str, Any]]) -> bool:
+        """Replace the per-cgroup samples exported on the next scrape."""
+        if not self.enabled or not PROMETHEUS_AVAILABLE:
+            return False
+        
+        self.cgroup_samples = samples
+        return True
+    
+    def update_discovery(self, discovery, filesystems: Dict[str, float]) -> bool:
+        """Replace the discovery results and per-filesystem usage exported on the next scrape."""
+        if not self.enabled or not PROMETHEUS_AVAILABLE:
+            return False
+        
+        self.discovery = discovery
+        self.filesystems = filesystems
+        return True
+    
+    def collect_samples(self) -> List[Tuple[Tuple[Tuple[str, str], ...], float]]:
+        """Return every registered sample as (sorted labels including __name__, value) for push sinks."""
+        if not self.enabled or self.registry is None:
+            return []
+        
+        samples = []
+        for family in self.registry.collect():
+            for sample in family.samples:
+                if sample.name.endswith('_created'):
+                    continue
+                labels = dict(sample.labels)
+                labels['__name__'] = sample.name
+                samples.append((tuple(sorted(labels.items())), float(sample.value)))
+        return samples
+    
+    def metric_families(self) -> List[Tuple[str, str, str]]:
+        """Return (name, type, help) of every metric family the registry exposes."""
+        if not self.enabled or not PROMETHEUS_AVAILABLE:
+            return []
+        return [(family.name, family.type, family.documentation) for family in self.registry.collect()]
+    
     def increment_alert_counter(self, alert_type: str) -> bool:
         """Increment alert counter for the specified type."""
         if not self.enabled or not PROMETHEUS_AVAILABLE:
@@ -158,6 +257,220 @@ class PrometheusExporter:
             self.logger.info("Prometheus HTTP server will stop when the process exits")
 
 
+class SelfMetricsCollector:
+    """Prometheus collector exposing SelfMetrics under system_monitor_self_*."""
+    
+    def __init__(self, self_metrics):
+        """Initialize collector with the SelfMetrics registry to read from."""
+        self.self_metrics = self_metrics
+    
+    def collect(self):
+        """Convert a SelfMetrics snapshot into Prometheus metric families."""
+        for name, metric_type, help_text, label_names, series in self.self_metrics.snapshot():
+            full_name = f"system_monitor_self_{name}"
+            
+            if metric_type == 'histogram':
+                family = HistogramMetricFamily(full_name, help_text, labels=label_names)
+                for labels, (buckets, counts, total, _count) in series.items():
+                    cumulative = 0
+                    prom_buckets = []
+                    for bound, count in zip(buckets, counts):
+                        cumulative += count
+                        prom_buckets.append((str(bound), cumulative))
+                    cumulative += counts[-1]
+                    prom_buckets.append(('+Inf', cumulative))
+                    family.add_metric(list(labels), prom_buckets, total)
+            
+            elif metric_type == 'counter':
+                family = CounterMetricFamily(full_name.replace('_total', ''), help_text, labels=label_names)
+                for labels, value in series.items():
+                    family.add_metric(list(labels), value)
+            
+            else:
+                family = GaugeMetricFamily(full_name, help_text, labels=label_names)
+                for labels, value in series.items():
+                    family.add_metric(list(labels), value)
+            
+            yield family
+
+
+class CgroupMetricsCollector:
+    """Prometheus collector exposing the latest cgroup samples with a cgroup label."""
+    
+    # (sample key, metric name, help text, type)
+    FAMILIES = [
+        ('memory_current', 'system_monitor_cgroup_memory_current_bytes', 'cgroup memory.current in bytes', 'gauge'),
+        ('memory_max', 'system_monitor_cgroup_memory_max_bytes', 'cgroup memory.max in bytes (limited cgroups only)', 'gauge'),
+        ('memory_percent', 'system_monitor_cgroup_memory_usage_percent', 'cgroup memory.current as percent of memory.max', 'gauge'),
+        ('cpu_usage_cores', 'system_monitor_cgroup_cpu_usage_cores', 'cgroup CPU usage in cores since the previous sample', 'gauge'),
+        ('throttled_percent', 'system_monitor_cgroup_cpu_throttled_percent', 'Percent of CFS periods throttled since the previous sample', 'gauge'),
+        ('cpu_usage_usec', 'system_monitor_cgroup_cpu_usage_microseconds', 'cgroup cpu.stat usage_usec', 'counter'),
+        ('throttled_usec', 'system_monitor_cgroup_cpu_throttled_microseconds', 'cgroup cpu.stat throttled_usec', 'counter'),
+        ('io_rbytes', 'system_monitor_cgroup_io_read_bytes', 'cgroup io.stat rbytes summed over devices', 'counter'),
+        ('io_wbytes', 'system_monitor_cgroup_io_write_bytes', 'cgroup io.stat wbytes summed over devices', 'counter'),
+        ('io_rios', 'system_monitor_cgroup_io_read_ios', 'cgroup io.stat rios summed over devices', 'counter'),
+        ('io_wios', 'system_monitor_cgroup_io_write_ios', 'cgroup io.stat wios summed over devices', 'counter'),
+    ]
+    
+    def __init__(self, exporter: 'PrometheusExporter'):
+        """Initialize collector with the exporter holding the latest samples."""
+        self.exporter = exporter
+    
+    def collect(self):
+        """Build one metric family per cgroup statistic."""
+        samples = self.exporter.cgroup_samples
+        for key, name, help_text, metric_type in self.FAMILIES:
+            if metric_type == 'counter':
+                family = CounterMetricFamily(name, help_text, labels=['cgroup'])
+            else:
+                family = GaugeMetricFamily(name, help_text, labels=['cgroup'])
+            for sample in samples:
+                value = sample.get(key)
+                if value is not None:
+                    family.add_metric([sample['cgroup']], value)
+            yield family
+
+
+class ProcessGroupCollector:
+    """Prometheus collector exposing the latest top process groups."""
+    
+    def __init__(self, exporter: 'PrometheusExporter'):
+        """Initialize collector with the exporter holding the latest groups."""
+        self.exporter = exporter
+    
+    def collect(self):
+        """Build process group families labelled by group and grouping mode."""
+        group_by = self.exporter.config.get('process_group_by', 'name')
+        labels = ['group', 'group_by']
+        rss = GaugeMetricFamily('system_monitor_process_group_rss_bytes', 'Resident memory of a process group', labels=labels)
+        cpu = GaugeMetricFamily('system_monitor_process_group_cpu_percent', 'CPU usage of a process group since the previous cycle', labels=labels)
+        count = GaugeMetricFamily('system_monitor_process_group_processes', 'Number of processes in a process group', labels=labels)
+        for group in self.exporter.process_groups:
+            rss.add_metric([group['group'], group_by], group['rss_mb'] * 1024 * 1024)
+            cpu.add_metric([group['group'], group_by], group['cpu_percent'])
+            count.add_metric([group['group'], group_by], group['processes'])
+        yield rss
+        yield cpu
+        yield count
+
+
+class SocketCollector:
+    """Prometheus collector exposing the latest socket summary."""
+    
+    def __init__(self, exporter: 'PrometheusExporter'):
+        """Initialize collector with the exporter holding the latest summary."""
+        self.exporter = exporter
+    
+    def collect(self):
+        """Build socket state, remote address, ephemeral port and kernel counter families."""
+        sockets = self.exporter.sockets
+        if not sockets:
+            return
+        tcp = GaugeMetricFamily('system_monitor_tcp_sockets', 'TCP sockets by state', labels=['state'])
+        for state, count in sockets['tcp'].items():
+            if state != 'total':
+                tcp.add_metric([state], count)
+        yield tcp
+        yield GaugeMetricFamily('system_monitor_udp_sockets', 'UDP sockets', value=sockets['udp'])
+        remotes = GaugeMetricFamily('system_monitor_tcp_remote_connections', 'TCP sockets of the busiest remote addresses', labels=['address'])
+        for remote in sockets['remote_top']:
+            remotes.add_metric([remote['address']], remote['connections'])
+        yield remotes
+        ephemeral = sockets['ephemeral']
+        yield GaugeMetricFamily('system_monitor_ephemeral_ports_used', 'TCP sockets on an ephemeral local port', value=ephemeral['used'])
+        busiest = GaugeMetricFamily('system_monitor_ephemeral_ports_max_percent', 'Share of the ephemeral port range used towards the busiest destination', labels=['destination'])
+        busiest.add_metric([ephemeral['max_destination']], ephemeral['max_percent'])
+        yield busiest
+        counters = CounterMetricFamily('system_monitor_netstat', 'Kernel TCP/UDP counters from /proc/net/netstat and /proc/net/snmp', labels=['counter'])
+        for name, value in sockets['counters'].items():
+            counters.add_metric([name], value)
+        yield counters
+
+
+class NumaMetricsCollector:
+    """Prometheus collector exposing the latest per-node memory sample with a node label."""
+    
+    MEMORY_KINDS = ('total', 'free', 'available', 'anon', 'file', 'shmem', 'slab', 'anon_huge')
+    
+    def __init__(self, exporter: 'PrometheusExporter'):
+        """Initialize collector with the exporter holding the latest sample."""
+        self.exporter = exporter
+    
+    def collect(self):
+        """Build node memory, allocation counter, hugepage and THP families."""
+        numa = self.exporter.numa
+        if not numa:
+            return
+        memory = GaugeMetricFamily('system_monitor_numa_memory_bytes', 'NUMA node memory by kind', labels=['node', 'kind'])
+        usage = GaugeMetricFamily('system_monitor_numa_memory_usage_percent', 'NUMA node memory in use (not free, file cache or reclaimable slab)', labels=['node'])
+        miss = GaugeMetricFamily('system_monitor_numa_miss_percent', 'Allocations meant for the node served by another node since the previous sample', labels=['node'])
+        events = CounterMetricFamily('system_monitor_numa_events', 'numastat allocation counters', labels=['node', 'event'])
+        hugepages = GaugeMetricFamily('system_monitor_hugepages', 'Hugepage pool per node, page size and state', labels=['node', 'size', 'state'])
+        for node in numa['nodes']:
+            for kind in self.MEMORY_KINDS:
+                value = node.get(f"{kind}_bytes")
+                if value is not None:
+                    memory.add_metric([node['node'], kind], value)
+            if 'memory_percent' in node:
+                usage.add_metric([node['node']], node['memory_percent'])
+            miss.add_metric([node['node']], node['miss_percent'])
+            for event, value in node['events'].items():
+                events.add_metric([node['node'], event], value)
+            for size, pool in node['hugepages'].items():
+                for state, value in pool.items():
+                    hugepages.add_metric([node['node'], size, state], value)
+        yield memory
+        yield usage
+        yield miss
+        yield events
+        yield hugepages
+        thp = CounterMetricFamily('system_monitor_thp_events', 'Transparent hugepage events from /proc/vmstat', labels=['event'])
+        for event, value in numa['thp']['events'].items():
+            thp.add_metric([event], value)
+        yield thp
+        yield GaugeMetricFamily('system_monitor_thp_anon_bytes', 'Anonymous memory backed by transparent hugepages', value=numa['thp']['anon_bytes'])
+        mode = GaugeMetricFamily('system_monitor_thp_mode', 'Transparent hugepage enabled and defrag settings', labels=['setting', 'mode'])
+        for setting in ('mode', 'defrag'):
+            if numa['thp'][setting]:
+                mode.add_metric(['enabled' if setting == 'mode' else setting, numa['thp'][setting]], 1)
+        yield mode
+
+
+class DiscoveryCollector:
+    """Prometheus collector exposing discovered entities as info-style label sets."""
+    
+    def __init__(self, exporter: 'PrometheusExporter'):
+        """Initialize collector with the exporter holding the discovery cache."""
+        self.exporter = exporter
+    
+    def collect(self):
+        """Build one series per discovered filesystem, interface and process group."""
+        # Families are yielded (empty) before the first discovery so rule generation sees them
+        discovery = self.exporter.discovery
+        filesystems = discovery.filesystems if discovery else []
+        interfaces = discovery.interfaces if discovery else []
+        process_groups = discovery.process_groups if discovery else []
+        
+        filesystem_info = GaugeMetricFamily('system_monitor_filesystem_info', 'Discovered filesystem', labels=['mountpoint', 'fstype', 'device'])
+        filesystem_used = GaugeMetricFamily('system_monitor_filesystem_used_percent', 'Used space of a discovered filesystem in percent', labels=['mountpoint', 'fstype'])
+        for entry in filesystems:
+            filesystem_info.add_metric([entry['fsname'], entry['fstype'], entry['fsdevice']], 1)
+            if entry['fsname'] in self.exporter.filesystems:
+                filesystem_used.add_metric([entry['fsname'], entry['fstype']], self.exporter.filesystems[entry['fsname']])
+        yield filesystem_info
+        yield filesystem_used
+        
+        interface_info = GaugeMetricFamily('system_monitor_interface_info', 'Discovered network interface', labels=['interface'])
+        for entry in interfaces:
+            interface_info.add_metric([entry['ifname']], 1)
+        yield interface_info
+        
+        group_info = GaugeMetricFamily('system_monitor_process_group_info', 'Discovered significant process group', labels=['group', 'group_by'])
+        for entry in process_groups:
+            group_info.add_metric([entry['group'], entry['groupby']], 1)
+        yield group_info
+
+
 class GrafanaHandler:
     """Handler for Grafana integration recommendations."""
     
@@ -393,5 +706,667 @@ class GrafanaHandler:
                     "pointradius": 2,
                     "points": False,
                     "renderer": "flot",
-                    "seriesOverrid
-(Content truncated due to size limit. Use line ranges to read in chunks)
\ No newline at end of file
+                    "seriesOverrides": [],
+                    "spaceLength": 10,
+                    "stack": False,
+                    "steppedLine": False,
+                    "targets": [
+                        {
+                            "expr": "system_monitor_disk_usage_percent",
+                            "legendFormat": "Disk Usage",
+                            "refId": "A"
+                        }
+                    ],
+                    "thresholds": [],
+                    "timeFrom": None,
+                    "timeRegions": [],
+                    "timeShift": None,
+                    "title": "Disk Usage",
+                    "tooltip": {
+                        "shared": True,
+                        "sort": 0,
+                        "value_type": "individual"
+                    },
+                    "type": "graph",
+                    "xaxis": {
+                        "buckets": None,
+                        "mode": "time",
+                        "name": None,
+                        "show": True,
+                        "values": []
+                    },
+                    "yaxes": [
+                        {
+                            "format": "percent",
+                            "label": None,
+                            "logBase": 1,
+                            "max": "100",
+                            "min": "0",
+                            "show": True
+                        },
+                        {
+                            "format": "short",
+                            "label": None,
+                            "logBase": 1,
+                            "max": None,
+                            "min": None,
+                            "show": True
+                        }
+                    ],
+                    "yaxis": {
+                        "align": False,
+                        "alignLevel": None
+                    }
+                },
+                {
+                    "aliasColors": {},
+                    "bars": False,
+                    "dashLength": 10,
+                    "dashes": False,
+                    "datasource": "Prometheus",
+                    "fill": 1,
+                    "fillGradient": 0,
+                    "gridPos": {
+                        "h": 8,
+                        "w": 12,
+                        "x": 12,
+                        "y": 8
+                    },
+                    "hiddenSeries": False,
+                    "id": 4,
+                    "legend": {
+                        "avg": False,
+                        "current": False,
+                        "max": False,
+                        "min": False,
+                        "show": True,
+                        "total": False,
+                        "values": False
+                    },
+                    "lines": True,
+                    "linewidth": 1,
+                    "nullPointMode": "null",
+                    "options": {
+                        "dataLinks": []
+                    },
+                    "percentage": False,
+                    "pointradius": 2,
+                    "points": False,
+                    "renderer": "flot",
+                    "seriesOverrides": [],
+                    "spaceLength": 10,
+                    "stack": False,
+                    "steppedLine": False,
+                    "targets": [
+                        {
+                            "expr": "system_monitor_load_average",
+                            "legendFormat": "Load Average",
+                            "refId": "A"
+                        }
+                    ],
+                    "thresholds": [],
+                    "timeFrom": None,
+                    "timeRegions": [],
+                    "timeShift": None,
+                    "title": "Load Average",
+                    "tooltip": {
+                        "shared": True,
+                        "sort": 0,
+                        "value_type": "individual"
+                    },
+                    "type": "graph",
+                    "xaxis": {
+                        "buckets": None,
+                        "mode": "time",
+                        "name": None,
+                        "show": True,
+                        "values": []
+                    },
+                    "yaxes": [
+                        {
+                            "format": "short",
+                            "label": None,
+                            "logBase": 1,
+                            "max": None,
+                            "min": "0",
+                            "show": True
+                        },
+                        {
+                            "format": "short",
+                            "label": None,
+                            "logBase": 1,
+                            "max": None,
+                            "min": None,
+                            "show": True
+                        }
+                    ],
+                    "yaxis": {
+                        "align": False,
+                        "alignLevel": None
+                    }
+                },
+                {
+                    "aliasColors": {},
+                    "bars": False,
+                    "dashLength": 10,
+                    "dashes": False,
+                    "datasource": "Prometheus",
+                    "fill": 1,
+                    "fillGradient": 0,
+                    "gridPos": {
+                        "h": 8,
+                        "w": 12,
+                        "x": 0,
+                        "y": 16
+                    },
+                    "hiddenSeries": False,
+                    "id": 5,
+                    "legend": {
+                        "avg": False,
+                        "current": False,
+                        "max": False,
+                        "min": False,
+                        "show": True,
+                        "total": False,
+                        "values": False
+                    },
+                    "lines": True,
+                    "linewidth": 1,
+                    "nullPointMode": "null",
+                    "options": {
+                        "dataLinks": []
+                    },
+                    "percentage": False,
+                    "pointradius": 2,
+                    "points": False,
+                    "renderer": "flot",
+                    "seriesOverrides": [],
+                    "spaceLength": 10,
+                    "stack": False,
+                    "steppedLine": False,
+                    "targets": [
+                        {
+                            "expr": "system_monitor_network_rx_mbps",
+                            "legendFormat": "Network RX",
+                            "refId": "A"
+                        },
+                        {
+                            "expr": "system_monitor_network_tx_mbps",
+                            "legendFormat": "Network TX",
+                            "refId": "B"
+                        }
+                    ],
+                    "thresholds": [],
+                    "timeFrom": None,
+                    "timeRegions": [],
+                    "timeShift": None,
+                    "title": "Network Traffic",
+                    "tooltip": {
+                        "shared": True,
+                        "sort": 0,
+                        "value_type": "individual"
+                    },
+                    "type": "graph",
+                    "xaxis": {
+                        "buckets": None,
+                        "mode": "time",
+                        "name": None,
+                        "show": True,
+                        "values": []
+                    },
+                    "yaxes": [
+                        {
+                            "format": "Mbits",
+                            "label": None,
+                            "logBase": 1,
+                            "max": None,
+                            "min": "0",
+                            "show": True
+                        },
+                        {
+                            "format": "short",
+                            "label": None,
+                            "logBase": 1,
+                            "max": None,
+                            "min": None,
+                            "show": True
+                        }
+                    ],
+                    "yaxis": {
+                        "align": False,
+                        "alignLevel": None
+                    }
+                },
+                {
+                    "aliasColors": {},
+                    "bars": False,
+                    "dashLength": 10,
+                    "dashes": False,
+                    "datasource": "Prometheus",
+                    "fill": 1,
+                    "fillGradient": 0,
+                    "gridPos": {
+                        "h": 8,
+                        "w": 12,
+                        "x": 12,
+                        "y": 16
+                    },
+                    "hiddenSeries": False,
+                    "id": 6,
+                    "legend": {
+                        "avg": False,
+                        "current": False,
+                        "max": False,
+                        "min": False,
+                        "show": True,
+                        "total": False,
+                        "values": False
+                    },
+                    "lines": True,
+                    "linewidth": 1,
+                    "nullPointMode": "null",
+                    "options": {
+                        "dataLinks": []
+                    },
+                    "percentage": False,
+                    "pointradius": 2,
+                    "points": False,
+                    "renderer": "flot",
+                    "seriesOverrides": [],
+                    "spaceLength": 10,
+                    "stack": False,
+                    "steppedLine": False,
+                    "targets": [
+                        {
+                            "expr": "system_monitor_ram_alerts_total",
+                            "legendFormat": "RAM Alerts",
+                            "refId": "A"
+                        },
+                        {
+                            "expr": "system_monitor_cpu_alerts_total",
+                            "legendFormat": "CPU Alerts",
+                            "refId": "B"
+                        },
+                        {
+                            "expr": "system_monitor_disk_alerts_total",
+                            "legendFormat": "Disk Alerts",
+                            "refId": "C"
+                        },
+                        {
+                            "expr": "system_monitor_load_alerts_total",
+                            "legendFormat": "Load Alerts",
+                            "refId": "D"
+                        },
+                        {
+                            "expr": "system_monitor_network_alerts_total",
+                            "legendFormat": "Network Alerts",
+                            "refId": "E"
+                        }
+                    ],
+                    "thresholds": [],
+                    "timeFrom": None,
+                    "timeRegions": [],
+                    "timeShift": None,
+                    "title": "Alerts",
+                    "tooltip": {
+                        "shared": True,
+                        "sort": 0,
+                        "value_type": "individual"
+                    },
+                    "type": "graph",
+                    "xaxis": {
+                        "buckets": None,
+                        "mode": "time",
+                        "name": None,
+                        "show": True,
+                        "values": []
+                    },
+                    "yaxes": [
+                        {
+                            "format": "short",
+                            "label": None,
+                            "logBase": 1,
+                            "max": None,
+                            "min": "0",
+                            "show": True
+                        },
+                        {
+                            "format": "short",
+                            "label": None,
+                            "logBase": 1,
+                            "max": None,
+                            "min": None,
+                            "show": True
+                        }
+                    ],
+                    "yaxis": {
+                        "align": False,
+                        "alignLevel": None
+                    }
+                }
+            ],
+            "refresh": "5s",
+            "schemaVersion": 22,
+            "style": "dark",
+            "tags": ["system", "monitoring"],
+            "templating": {
+                "list": []
+            },
+            "time": {
+                "from": "now-1h",
+                "to": "now"
+            },
+            "timepicker": {
+                "refresh_intervals": [
+                    "5s",
+                    "10s",
+                    "30s",
+                    "1m",
+                    "5m",
+                    "15m",
+                    "30m",
+                    "1h",
+                    "2h",
+                    "1d"
+                ]
+            },
+            "timezone": "",
+            "title": f"{system_name} Dashboard",
+            "uid": "system_monitor",
+            "version": 1
+        }
+        
+        return json.dumps(dashboard, indent=2)
+    
+    # Gauges that hold cumulative values, so they are rated like counters
+    CUMULATIVE_GAUGES = {'system_monitor_pressure_stall_seconds'}
+    FLEET_QUANTILES = (0.5, 0.95, 0.99)
+    HISTOGRAM_QUANTILE = 0.95
+    
+    @staticmethod
+    def _unit(name: str, rated: bool = False) -> str:
+        """Grafana unit for a metric name suffix."""
+        if name.endswith('_percent'):
+            return 'percent'
+        if name.endswith('_bytes'):
+            return 'Bps' if rated else 'bytes'
+        if name.endswith('_mbps'):
+            return 'Mbits'
+        if name.endswith('_seconds'):
+            return 'short' if rated else 's'
+        return 'ops' if rated else 'short'
+    
+    @staticmethod
+    def plan_recorded_series(families: List[Tuple[str, str, str]],
+                             window: str = '5m') -> List[Dict[str, Any]]:
+        """Derive per-host and fleet recording rules for each registered metric family.
+        
+        Returns one entry per family with 'host' and 'fleet' lists of (record, expr) pairs;
+        info families and info-style gauges carry no values worth aggregating and are skipped.
+        """
+        plans = []
+        for name, metric_type, help_text in families:
+            host = []
+            fleet = []
+            if metric_type == 'gauge' and name.endswith('_info'):
+                continue
+            
+            if metric_type == 'gauge' and name not in GrafanaHandler.CUMULATIVE_GAUGES:
+                avg = f"instance:{name}:avg{window}"
+                peak = f"instance:{name}:max{window}"
+                host.append((avg, f"avg_over_time({name}[{window}])"))
+                host.append((peak, f"max_over_time({name}[{window}])"))
+                for quantile in GrafanaHandler.FLEET_QUANTILES:
+                    fleet.append((f"job:{name}:avg{window}_p{int(quantile * 100)}",
+                                  f"quantile without (instance) ({quantile}, {avg})"))
+                fleet.append((f"job:{name}:max{window}_max", f"max without (instance) ({peak})"))
+                unit = GrafanaHandler._unit(name)
+            
+            elif metric_type in ('counter', 'gauge'):
+                sample = f"{name}_total" if metric_type == 'counter' else name
+                rate = f"instance:{name}:rate{window}"
+                host.append((rate, f"rate({sample}[{window}])"))
+                fleet.append((f"job:{name}:rate{window}_sum", f"sum without (instance) ({rate})"))
+                unit = GrafanaHandler._unit(name, rated=True)
+            
+            elif metric_type == 'histogram':
+                buckets = f"instance:{name}_bucket:rate{window}"
+                label = f"p{int(GrafanaHandler.HISTOGRAM_QUANTILE * 100)}"
+                host.append((buckets, f"rate({name}_bucket[{window}])"))
+                host.append((f"instance:{name}:{label}_{window}",
+                             f"histogram_quantile({GrafanaHandler.HISTOGRAM_QUANTILE}, {buckets})"))
+                fleet.append((f"job:{name}:{label}_{window}",
+                              f"histogram_quantile({GrafanaHandler.HISTOGRAM_QUANTILE}, "
+                              f"sum without (instance) ({buckets}))"))
+                unit = GrafanaHandler._unit(name)
+            
+            else:
+                continue
+            
+            plans.append({'family': name, 'type': metric_type, 'help': help_text, 'unit': unit,
+                          'host': host, 'fleet': fleet})
+        return plans
+    
+    @staticmethod
+    def get_recording_rules(families: List[Tuple[str, str, str]], interval: str = '1m',
+                            window: str = '5m') -> str:
+        """Render the Prometheus recording rule file (YAML) for the registered metric families."""
+        plans = GrafanaHandler.plan_recorded_series(families, window)
+        lines = ["groups:", "  - name: system_monitor", f"    interval: {interval}", "    rules:"]
+        # Rules in one group run in order, so the fleet rules after the per-host ones read this
+        # evaluation's results; separate groups are evaluated independently and would lag a cycle
+        for key in ('host', 'fleet'):
+            for plan in plans:
+                for record, expr in plan[key]:
+                    lines.append(f"      - record: {record}")
+                    lines.append(f"        expr: {json.dumps(expr)}")
+        return "\n".join(lines) + "\n"
+    
+    @staticmethod
+    def _graph_panel(panel_id: int, title: str, exprs: List[str], unit: str,
+                     x: int, y: int, description: str = "") -> Dict[str, Any]:
+        """A graph panel in the same layout as the static dashboard."""
+        return {
+            "datasource": "Prometheus",
+            "description": description,
+            "fill": 1,
+            "gridPos": {"h": 8, "w": 12, "x": x, "y": y},
+            "id": panel_id,
+            "legend": {"show": True, "values": False},
+            "lines": True,
+            "linewidth": 1,
+            "nullPointMode": "null",
+            "targets": [{"expr": expr, "refId": chr(ord('A') + index)} for index, expr in enumerate(exprs)],
+            "title": title,
+            "tooltip": {"shared": True, "sort": 0, "value_type": "individual"},
+            "type": "graph",
+            "xaxis": {"mode": "time", "show": True},
+            "yaxes": [
+                {"format": unit, "logBase": 1, "min": "0", "max": None, "show": True},
+                {"format": "short", "logBase": 1, "show": False}
+            ]
+        }
+    
+    @staticmethod
+    def get_recorded_dashboard_json(families: List[Tuple[str, str, str]],
+                                    system_name: str = "System Monitor", window: str = '5m') -> str:
+        """Generate a Grafana dashboard whose panels query only the recorded series."""
+        plans = GrafanaHandler.plan_recorded_series(families, window)
+        panels = []
+        y = 0
+        
+        def add_row(title):
+            nonlocal y
+            panels.append({"collapsed": False, "gridPos": {"h": 1, "w": 24, "x": 0, "y": y},
+                           "id": len(panels) + 1, "panels": [], "title": title, "type": "row"})
+            y += 1
+        
+        def add_panels(selected, key, selector):
+            nonlocal y
+            for index, plan in enumerate(selected):
+                exprs = [record + selector for record, _ in plan[key] if '_bucket:' not in record]
+                title = plan['family'].replace('system_monitor_', '')
+                panels.append(GrafanaHandler._graph_panel(len(panels) + 1, title, exprs, plan['unit'],
+                                                          12 * (index % 2), y + 8 * (index // 2), plan['help']))
+            y += 8 * ((len(selected) + 1) // 2)
+        
+        system = [plan for plan in plans if not plan['family'].startswith('system_monitor_self_')]
+        monitor = [plan for plan in plans if plan['family'].startswith('system_monitor_self_')]
+        
+        add_row("Host: $instance")
+        add_panels(system, 'host', '{instance=~"$instance"}')
+        add_row("Fleet")
+        add_panels(system, 'fleet', '')
+        if monitor:
+            add_row("Monitor: $instance")
+            add_panels(monitor, 'host', '{instance=~"$instance"}')
+        
+        # The instance list also comes from a recorded series instead of a raw metric
+        anchor = next((plan['host'][0][0] for plan in plans if plan['host']), 'up')
+        dashboard = {
+            "editable": True,
+            "id": None,
+            "panels": panels,
+            "refresh": "1m",
+            "schemaVersion": 22,
+            "style": "dark",
+            "tags": ["system", "monitoring", "recorded"],
+            "templating": {
+                "list": [
+                    {
+                        "datasource": "Prometheus",
+                        "includeAll": True,
+                        "multi": True,
+                        "name": "instance",
+                        "query": f"label_values({anchor}, instance)",
+                        "refresh": 2,
+                        "sort": 1,
+                        "type": "query"
+                    }
+                ]
+            },
+            "time": {
+                "from": "now-24h",
+                "to": "now"
+            },
+            "timezone": "",
+            "title": f"{system_name} Fleet Dashboard",
+            "uid": "system_monitor_fleet",
+            "version": 1
+        }
+        
+        return json.dumps(dashboard, indent=2)
+    
+    @staticmethod
+    def get_setup_instructions() -> str:
+        """Get setup instructions for Grafana integration."""
+        instructions = """
+# Grafana Integration Setup Instructions
+
+## Prerequisites
+- Prometheus server running and configured to scrape metrics from System Monitor
+- Grafana server installed and running
+
+## Steps to Set Up Grafana Dashboard
+
+1. **Add Prometheus as a Data Source in Grafana**
+   - Open Grafana web interface (default: http://localhost:3000)
+   - Log in with your credentials (default: admin/admin)
+   - Go to Configuration > Data Sources
+   - Click "Add data source"
+   - Select "Prometheus"
+   - Set the URL to your Prometheus server (e.g., http://localhost:9090)
+   - Click "Save & Test" to verify the connection
+
+2. **Import the Dashboard**
+   - Go to Create > Import
+   - Copy the JSON content from the provided dashboard file
+   - Click "Load"
+   - Select your Prometheus data source
+   - Click "Import"
+
+3. **Configure Alerts (Optional)**
+   - In the dashboard, click on a panel title
+   - Select "Edit"
+   - Go to the "Alert" tab
+   - Click "Create Alert"
+   - Configure alert conditions based on your requirements
+   - Set notification channels
+   - Click "Save"
+
+## Recording Rules for Large Fleets
+- Panels of the sample dashboard query raw gauges, which gets expensive across many hosts
+- Generate recording rules and a dashboard that queries only the recorded series:
+  `python3 prometheus_exporter.py --config /etc/memory-monitor/config.conf --rules system_monitor.rules.yml --dashboard system_monitor_fleet.json`
+- Both are built from the metric families the exporter registers under that configuration,
+  so generate them with the configuration the fleet runs
+- Add the rule file to `rule_files` in prometheus.yml and reload Prometheus
+- Import the generated dashboard as in step 2
+
+## Customizing the Dashboard
+- You can customize the dashboard by adding, removing, or modifying panels
+- Adjust time ranges and refresh intervals as needed
+- Add variables for more dynamic dashboards
+
+## Troubleshooting
+- If metrics are not showing up, verify that:
+  - System Monitor is running with Prometheus integration enabled
+  - Prometheus is correctly scraping the metrics endpoint
+  - The Prometheus data source in Grafana is correctly configured
+- Check Prometheus targets page to ensure the System Monitor target is up
+- Verify that the metrics exist in Prometheus by querying them directly
+
+## Additional Resources
+- [Grafana Documentation](https://grafana.com/docs/)
+- [Prometheus Documentation](https://prometheus.io/docs/)
+- [Grafana Alerting](https://grafana.com/docs/grafana/latest/alerting/)
+"""
+        return instructions
+
+
+def main():
+    """Generate recording rules and a recorded-series dashboard from the registered metric families."""
+    parser = argparse.ArgumentParser(description='System Monitor Prometheus recording rule and dashboard generator')
+    parser.add_argument('--config', help='Monitor configuration deciding which families are registered '
+                                         '(default: the monitor default)')
+    parser.add_argument('--rules', help='Write the recording rule file here (default: stdout)')
+    parser.add_argument('--dashboard', help='Write the recorded-series dashboard JSON here')
+    parser.add_argument('--static-dashboard', help='Also write the sample raw-gauge dashboard JSON here')
+    parser.add_argument('--interval', default='1m', help='Rule evaluation interval (default: 1m)')
+    parser.add_argument('--window', default='5m', help='Aggregation window of the per-host rules (default: 5m)')
+    parser.add_argument('--name', default='System Monitor', help='Dashboard title prefix')
+    args = parser.parse_args()
+    
+    if not PROMETHEUS_AVAILABLE:
+        print("prometheus_client kerak: pip install prometheus_client")
+        sys.exit(1)
+    
+    # Config only: ReplayMonitor loads the configuration without starting any collector
+    from replay import ReplayMonitor
+    from memory_monitor import DEFAULT_CONFIG_FILE
+    from self_metrics import SelfMetrics
+    config = ReplayMonitor(args.config or DEFAULT_CONFIG_FILE).config
+    exporter = PrometheusExporter(config, self_metrics=SelfMetrics(config['self_metrics_enabled']), serve=False)
+    families = exporter.metric_families()
+    
+    rules = GrafanaHandler.get_recording_rules(families, args.interval, args.window)
+    if args.rules:
+        with open(args.rules, 'w') as f:
+            f.write(rules)
+    else:
+        sys.stdout.write(rules)
+    
+    outputs = [(args.dashboard, lambda: GrafanaHandler.get_recorded_dashboard_json(families, args.name, args.window)),
+               (args.static_dashboard, lambda: GrafanaHandler.get_dashboard_json(args.name))]
+    for path, render in outputs:
+        if path:
+            with open(path, 'w') as f:
+                f.write(render())
+    
+    plans = GrafanaHandler.plan_recorded_series(families, args.window)
+    print(f"{len(plans)} ta metrika oilasi, {sum(len(p['host']) + len(p['fleet']) for p in plans)} ta qoida",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
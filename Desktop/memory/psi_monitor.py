@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pressure Stall Information (PSI) support for System Monitor
+Reads /proc/pressure/{cpu,memory,io} and waits on kernel PSI triggers
+so stalls are reported as soon as they happen
+"""
+
+import os
+import select
+import logging
+import threading
+from typing import Dict, List, Tuple, Callable
+
+from procfs_reader import ProcFile
+
+PRESSURE_ROOT = "/proc/pressure"
+PRESSURE_RESOURCES = ('cpu', 'memory', 'io')
+PSI_AVAILABLE = os.path.isdir(PRESSURE_ROOT) and hasattr(select, 'poll')
+
+DEFAULT_TRIGGERS = "memory some 200000 2000000, io some 500000 2000000"
+
+
+def parse_triggers(value: str) -> List[Tuple[str, str, int, int]]:
+    """Parse 'memory some 150000 1000000, io full 500000 2000000' into trigger tuples."""
+    triggers = []
+    for item in value.split(','):
+        parts = item.split()
+        if not parts:
+            continue
+        if len(parts) != 4 or parts[0] not in PRESSURE_RESOURCES or parts[1] not in ('some', 'full'):
+            raise ValueError(f"Invalid PSI trigger: {item.strip()}")
+        triggers.append((parts[0], parts[1], int(parts[2]), int(parts[3])))
+    return triggers
+
+
+class PsiCollector:
+    """Reads the PSI averages and stall totals through cached descriptors."""
+
+    def __init__(self, root: str = PRESSURE_ROOT):
+        """Open the pressure files that exist on this kernel."""
+        self.lock = threading.Lock()  # The trigger thread reads through the same buffers
+        self.files = {}
+        for resource in PRESSURE_RESOURCES:
+            try:
+                self.files[resource] = ProcFile(os.path.join(root, resource), 256)
+            except OSError:
+                pass
+        if not self.files:
+            raise OSError(f"No PSI files in {root}")
+
+    def collect(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Return {resource: {'some'|'full': {'avg10', 'avg60', 'avg300', 'total'}}}."""
+        result = {}
+        for resource, proc_file in self.files.items():
+            with self.lock:
+                buffer, length = proc_file.read()
+                content = bytes(buffer[:length])
+            lines = {}
+            for line in content.splitlines():
+                fields = line.split()
+                values = {}
+                for item in fields[1:]:
+                    key, _, value = item.partition(b'=')
+                    values[key.decode()] = int(value) if key == b'total' else float(value)
+                lines[fields[0].decode()] = values
+            result[resource] = lines
+        return result
+
+    @staticmethod
+    def format_table(pressure: Dict[str, Dict[str, Dict[str, float]]]) -> str:
+        """Format a collect() result for alert messages."""
+        result = "RESOURCE SOME10 SOME60 FULL10 FULL60\n"
+        for resource, lines in pressure.items():
+            some = lines.get('some', {})
+            full = lines.get('full', {})
+            result += (f"{resource} {some.get('avg10', 0):.2f}% {some.get('avg60', 0):.2f}% "
+                       f"{full.get('avg10', 0):.2f}% {full.get('avg60', 0):.2f}%\n")
+        return result
+
+    def close(self) -> None:
+        """Close all cached file descriptors."""
+        for proc_file in self.files.values():
+            proc_file.close()
+
+
+class PsiTriggerWatcher:
+    """Registers kernel PSI triggers and waits on them with poll() in a background thread."""
+
+    def __init__(self, triggers: List[Tuple[str, str, int, int]],
+                 callback: Callable[[str, str, int, int], None], root: str = PRESSURE_ROOT):
+        """Initialize watcher; callback(resource, kind, stall_us, window_us) runs on the watcher thread."""
+        self.triggers = triggers
+        self.callback = callback
+        self.root = root
+        self.logger = logging.getLogger('memory_monitor.psi')
+        self.fds = {}
+        self.thread = None
+        self.stop_event = threading.Event()
+
+    def start(self) -> bool:
+        """Register every trigger and start the watcher thread."""
+        for trigger in self.triggers:
+            resource, kind, stall_us, window_us = trigger
+            try:
+                fd = os.open(os.path.join(self.root, resource), os.O_RDWR | os.O_NONBLOCK)
+                try:
+                    # The trigger lives as long as this descriptor stays open
+                    os.write(fd, f"{kind} {stall_us} {window_us}\0".encode())
+                except OSError:
+                    os.close(fd)
+                    raise
+                self.fds[fd] = trigger
+            except OSError as e:
+                self.logger.error(f"Failed to register PSI trigger '{resource} {kind} {stall_us} {window_us}': {str(e)}")
+
+        if not self.fds:
+            return False
+
+        self.thread = threading.Thread(target=self._run, name='psi-trigger-watcher', daemon=True)
+        self.thread.start()
+        self.logger.info(f"PSI trigger watcher started with {len(self.fds)} trigger(s)")
+        return True
+
+    def _run(self) -> None:
+        """Block in poll() until a trigger fires, then hand it to the callback."""
+        poller = select.poll()
+        for fd in self.fds:
+            poller.register(fd, select.POLLPRI)
+
+        while not self.stop_event.is_set() and self.fds:
+            try:
+                # The timeout only bounds how long stop() waits; events arrive immediately
+                events = poller.poll(1000)
+            except InterruptedError:
+                continue
+
+            for fd, event in events:
+                trigger = self.fds.get(fd)
+                if trigger is None:
+                    continue
+                if event & select.POLLERR:
+                    self.logger.error(f"PSI trigger for {trigger[0]} was destroyed by the kernel")
+                    poller.unregister(fd)
+                    del self.fds[fd]
+                    os.close(fd)
+                elif event & select.POLLPRI:
+                    try:
+                        self.callback(*trigger)
+                    except Exception as e:
+                        self.logger.error(f"PSI trigger callback failed: {str(e)}")
+
+    def stop(self) -> None:
+        """Stop the watcher thread and unregister all triggers."""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+        for fd in list(self.fds):
+            os.close(fd)
+        self.fds = {}
@@ -0,0 +1,577 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prometheus remote_write sink for System Monitor
+Pushes samples as snappy-compressed protobuf WriteRequests through
+sharded, bounded send queues, spilling to an on-disk write-ahead log
+while the receiver is unreachable
+"""
+
+import os
+import sys
+import time
+import zlib
+import struct
+import logging
+import argparse
+import threading
+from collections import deque, OrderedDict
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Tuple, Optional, Iterator
+
+import requests
+
+try:
+    import snappy
+    SNAPPY_AVAILABLE = True
+except ImportError:
+    SNAPPY_AVAILABLE = False
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[Labels, float, int]  # (sorted labels including __name__, value, timestamp in ms)
+
+REMOTE_WRITE_HEADERS = {
+    'Content-Encoding': 'snappy',
+    'Content-Type': 'application/x-protobuf',
+    'X-Prometheus-Remote-Write-Version': '0.1.0',
+}
+
+
+# --- protobuf (prometheus.WriteRequest) -------------------------------------
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _length_delimited(field: int, payload: bytes) -> bytes:
+    return _varint(field << 3 | 2) + _varint(len(payload)) + payload
+
+
+def encode_write_request(samples: List[Sample]) -> bytes:
+    """Encode samples as a WriteRequest, one TimeSeries per label set."""
+    series = OrderedDict()
+    for labels, value, timestamp in samples:
+        series.setdefault(labels, []).append((value, timestamp))
+
+    out = bytearray()
+    for labels, points in series.items():
+        body = bytearray()
+        for name, value in labels:
+            body += _length_delimited(1, _length_delimited(1, name.encode()) + _length_delimited(2, value.encode()))
+        for value, timestamp in points:
+            body += _length_delimited(2, b'\x09' + struct.pack('<d', value) + b'\x10' + _varint(timestamp))
+        out += _length_delimited(1, bytes(body))
+    return bytes(out)
+
+
+def _fields(data: bytes) -> Iterator[Tuple[int, Any]]:
+    """Iterate (field number, value) over a protobuf message, for the wire types used here."""
+    pos = 0
+    while pos < len(data):
+        key, pos = _read_varint(data, pos)
+        wire_type = key & 7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+        elif wire_type == 1:
+            value = data[pos:pos + 8]
+            pos += 8
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            value = data[pos:pos + length]
+            pos += length
+        else:
+            raise ValueError(f"Unsupported wire type {wire_type}")
+        yield key >> 3, value
+
+
+def decode_write_request(data: bytes) -> List[Sample]:
+    """Decode a WriteRequest back into samples (used by the stand-in receiver)."""
+    samples = []
+    for field, series in _fields(data):
+        if field != 1:
+            continue
+        labels = []
+        points = []
+        for series_field, value in _fields(series):
+            if series_field == 1:
+                label = dict(_fields(value))
+                labels.append((label.get(1, b'').decode(), label.get(2, b'').decode()))
+            elif series_field == 2:
+                point = dict(_fields(value))
+                points.append((struct.unpack('<d', point.get(1, b'\0' * 8))[0], point.get(2, 0)))
+        samples.extend((tuple(labels), value, timestamp) for value, timestamp in points)
+    return samples
+
+
+# --- snappy block format -----------------------------------------------------
+
+def _emit_literal(out: bytearray, data: bytes, start: int, end: int) -> None:
+    while start < end:
+        chunk = min(end - start, 65536)
+        length = chunk - 1
+        if length < 60:
+            out.append(length << 2)
+        elif length < 256:
+            out += bytes((60 << 2, length))
+        else:
+            out.append(61 << 2)
+            out += struct.pack('<H', length)
+        out += data[start:start + chunk]
+        start += chunk
+
+
+def snappy_compress(data: bytes) -> bytes:
+    """Compress to the snappy block format, using python-snappy when installed."""
+    if SNAPPY_AVAILABLE:
+        return snappy.compress(data)
+
+    # Greedy 4-byte hash matcher with 2-byte-offset copies; ratios are below libsnappy but the
+    # stream is standard snappy, which is all remote_write receivers require
+    out = bytearray(_varint(len(data)))
+    table = {}
+    length = len(data)
+    i = literal_start = 0
+    while i + 4 <= length:
+        key = data[i:i + 4]
+        candidate = table.get(key)
+        table[key] = i
+        if candidate is not None and i - candidate <= 65535:
+            match = 4
+            while i + match < length and match < 64 and data[candidate + match] == data[i + match]:
+                match += 1
+            _emit_literal(out, data, literal_start, i)
+            out.append((match - 1) << 2 | 2)
+            out += struct.pack('<H', i - candidate)
+            i += match
+            literal_start = i
+        else:
+            i += 1
+    _emit_literal(out, data, literal_start, length)
+    return bytes(out)
+
+
+def snappy_decompress(data: bytes) -> bytes:
+    """Decompress a snappy block, using python-snappy when installed."""
+    if SNAPPY_AVAILABLE:
+        return snappy.uncompress(data)
+
+    expected, pos = _read_varint(data, 0)
+    out = bytearray()
+    while pos < len(data):
+        tag = data[pos]
+        pos += 1
+        kind = tag & 3
+        if kind == 0:
+            length = tag >> 2
+            if length >= 60:
+                size = length - 59
+                length = int.from_bytes(data[pos:pos + size], 'little')
+                pos += size
+            length += 1
+            out += data[pos:pos + length]
+            pos += length
+            continue
+        if kind == 1:
+            length = 4 + (tag >> 2 & 7)
+            offset = (tag >> 5) << 8 | data[pos]
+            pos += 1
+        elif kind == 2:
+            length = (tag >> 2) + 1
+            offset = int.from_bytes(data[pos:pos + 2], 'little')
+            pos += 2
+        else:
+            length = (tag >> 2) + 1
+            offset = int.from_bytes(data[pos:pos + 4], 'little')
+            pos += 4
+        if not 0 < offset <= len(out):
+            raise ValueError("Invalid snappy copy offset")
+        start = len(out) - offset
+        for k in range(length):  # Copies may overlap their own output
+            out.append(out[start + k])
+    if len(out) != expected:
+        raise ValueError("Snappy length mismatch")
+    return bytes(out)
+
+
+# --- write-ahead log ---------------------------------------------------------
+
+class WriteAheadLog:
+    """Segmented append-only log of encoded WriteRequests awaiting delivery.
+
+    Records are `<length><crc32><sample count><payload>`; a torn record at the end of a
+    segment (crash during write) ends replay of that segment.
+    """
+
+    RECORD = struct.Struct('<III')
+
+    def __init__(self, directory: str, max_bytes: int, segment_bytes: int = 1024 * 1024):
+        """Open the log directory, picking up segments left by a previous run."""
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.logger = logging.getLogger('memory_monitor.remote_write')
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.segments = sorted(int(name[:-4]) for name in os.listdir(directory)
+                               if name.endswith('.wal') and name[:-4].isdigit())
+        self.current = None
+        self.current_id = None
+
+    def _path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{segment:08d}.wal")
+
+    def pending(self) -> bool:
+        """True while any undelivered record is on disk."""
+        return bool(self.segments)
+
+    def append(self, payload: bytes, count: int) -> None:
+        """Durably append one encoded WriteRequest holding `count` samples."""
+        with self.lock:
+            if self.current is None or self.current.tell() >= self.segment_bytes:
+                self._rotate()
+            self.current.write(self.RECORD.pack(len(payload), zlib.crc32(payload), count) + payload)
+            self.current.flush()
+            os.fsync(self.current.fileno())
+            self._enforce_limit()
+
+    def _rotate(self) -> None:
+        if self.current is not None:
+            self.current.close()
+        self.current_id = (self.segments[-1] + 1) if self.segments else 1
+        self.segments.append(self.current_id)
+        self.current = open(self._path(self.current_id), 'ab')
+
+    def _enforce_limit(self) -> None:
+        """Drop the oldest segments beyond max_bytes; the one being written is always kept."""
+        sizes = [(segment, os.path.getsize(self._path(segment))) for segment in self.segments]
+        total = sum(size for _, size in sizes)
+        for segment, size in sizes[:-1]:
+            if total <= self.max_bytes:
+                break
+            os.unlink(self._path(segment))
+            self.segments.remove(segment)
+            total -= size
+            self.logger.warning(f"Remote write WAL over {self.max_bytes} bytes, dropped segment {segment}")
+
+    def oldest(self) -> Optional[int]:
+        """Return the oldest segment, sealing it first if it is still being written."""
+        with self.lock:
+            if not self.segments:
+                return None
+            if self.segments[0] == self.current_id:
+                self.current.close()
+                self.current = self.current_id = None
+            return self.segments[0]
+
+    def records(self, segment: int) -> Iterator[Tuple[bytes, int]]:
+        """Yield (payload, sample count) for the intact records of a sealed segment."""
+        with open(self._path(segment), 'rb') as f:
+            while True:
+                header = f.read(self.RECORD.size)
+                if len(header) < self.RECORD.size:
+                    return
+                length, crc, count = self.RECORD.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    self.logger.warning(f"Remote write WAL segment {segment} has a torn record, skipping rest")
+                    return
+                yield payload, count
+
+    def remove(self, segment: int) -> None:
+        """Delete a fully delivered segment."""
+        with self.lock:
+            if segment in self.segments:
+                self.segments.remove(segment)
+            try:
+                os.unlink(self._path(segment))
+            except FileNotFoundError:
+                pass
+
+    def size(self) -> int:
+        with self.lock:
+            return sum(os.path.getsize(self._path(segment)) for segment in self.segments
+                       if os.path.exists(self._path(segment)))
+
+
+# --- client ------------------------------------------------------------------
+
+class _Shard:
+    """One bounded send queue drained by its own thread."""
+
+    def __init__(self, client: 'RemoteWriteClient', index: int):
+        self.client = client
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name=f'remote-write-shard-{index}', daemon=True)
+
+    def put(self, samples: List[Sample]) -> None:
+        client = self.client
+        with self.cond:
+            self.queue.extend(samples)
+            overflow = len(self.queue) - client.capacity
+            spilled = [self.queue.popleft() for _ in range(max(0, overflow))]
+            if len(self.queue) >= client.max_samples_per_send:
+                self.cond.notify()
+        if spilled:
+            # Memory stays bounded; the oldest samples move to disk instead of being dropped
+            client.spill(spilled)
+
+    def _take(self) -> List[Sample]:
+        client = self.client
+        with self.cond:
+            deadline = time.monotonic() + client.batch_deadline
+            while not client.stopping and len(self.queue) < client.max_samples_per_send:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            count = min(len(self.queue), client.max_samples_per_send)
+            return [self.queue.popleft() for _ in range(count)]
+
+    def _run(self) -> None:
+        client = self.client
+        while True:
+            batch = self._take()
+            if batch:
+                client.deliver(batch)
+            elif client.stopping:
+                return
+
+
+class RemoteWriteClient:
+    """Prometheus remote_write client with sharded queues and a write-ahead log."""
+
+    def __init__(self, config: Dict[str, Any], self_metrics=None):
+        """Initialize the client and start the shard and WAL replay threads."""
+        self.config = config
+        self.self_metrics = self_metrics
+        self.logger = logging.getLogger('memory_monitor.remote_write')
+        self.url = config.get('remote_write_url', '')
+        self.capacity = config.get('remote_write_queue_capacity', 10000)
+        self.max_samples_per_send = config.get('remote_write_max_samples_per_send', 500)
+        self.batch_deadline = config.get('remote_write_batch_deadline', 5)
+        self.timeout = config.get('remote_write_timeout', 10)
+        self.extra_labels = tuple(sorted(
+            (name.strip(), value.strip())
+            for name, _, value in (item.partition('=') for item in config.get('remote_write_labels', '').split(','))
+            if name.strip()))
+        self.stopping = False
+        self.backoff = 1.0
+        self.retry_at = 0.0
+        self.session = requests.Session()
+        self.session.headers.update(REMOTE_WRITE_HEADERS)
+        if config.get('remote_write_username'):
+            self.session.auth = (config['remote_write_username'], config.get('remote_write_password', ''))
+
+        self.wal = WriteAheadLog(config.get('remote_write_wal_dir', '/var/lib/memory-monitor/wal'),
+                                 config.get('remote_write_wal_max_mb', 64) * 1024 * 1024)
+        if self.wal.pending():
+            self.logger.info(f"Remote write WAL has {len(self.wal.segments)} undelivered segment(s), replaying")
+
+        self.shards = [_Shard(self, index) for index in range(max(1, config.get('remote_write_shards', 2)))]
+        for shard in self.shards:
+            shard.thread.start()
+        self.replay_event = threading.Event()
+        self.replay_thread = threading.Thread(target=self._replay_loop, name='remote-write-wal-replay', daemon=True)
+        self.replay_thread.start()
+
+    def enqueue(self, samples: List[Tuple[Labels, float]], timestamp: Optional[float] = None) -> None:
+        """Queue one scrape's worth of (labels, value) pairs; series are pinned to shards to keep their order."""
+        timestamp_ms = int((timestamp if timestamp is not None else time.time()) * 1000)
+        per_shard = [[] for _ in self.shards]
+        for labels, value in samples:
+            if self.extra_labels:
+                labels = tuple(sorted(dict(self.extra_labels + labels).items()))
+            per_shard[hash(labels) % len(self.shards)].append((labels, value, timestamp_ms))
+        for shard, shard_samples in zip(self.shards, per_shard):
+            if shard_samples:
+                shard.put(shard_samples)
+
+    def _count(self, outcome: str, amount: int) -> None:
+        if self.self_metrics is not None:
+            self.self_metrics.inc('remote_write_samples_total', amount, (outcome,))
+
+    def _post(self, payload: bytes) -> Optional[bool]:
+        """Send one encoded WriteRequest: True when delivered, False to retry later, None if rejected."""
+        if time.monotonic() < self.retry_at:
+            return False
+        try:
+            if self.self_metrics is not None:
+                with self.self_metrics.time('remote_write_send_duration_seconds'):
+                    response = self.session.post(self.url, data=snappy_compress(payload), timeout=self.timeout)
+            else:
+                response = self.session.post(self.url, data=snappy_compress(payload), timeout=self.timeout)
+        except requests.RequestException as e:
+            self._failed(f"{type(e).__name__}: {str(e)}")
+            return False
+
+        if response.status_code < 300:
+            self.backoff = 1.0
+            return True
+        if response.status_code == 429 or response.status_code >= 500:
+            self._failed(f"HTTP {response.status_code}")
+            return False
+        # Other 4xx answers will never succeed; retrying would block the queue
+        self.logger.error(f"Remote write rejected batch: HTTP {response.status_code} {response.text[:200]}")
+        return None
+
+    def _failed(self, reason: str) -> None:
+        self.retry_at = time.monotonic() + self.backoff
+        self.logger.warning(f"Remote write failed ({reason}), retrying in {self.backoff:.0f}s; samples go to the WAL")
+        self.backoff = min(self.backoff * 2, 60.0)
+
+    def spill(self, samples: List[Sample]) -> None:
+        """Write samples to the WAL."""
+        try:
+            self.wal.append(encode_write_request(samples), len(samples))
+            self._count('spilled', len(samples))
+        except OSError as e:
+            self.logger.error(f"Remote write WAL write failed, {len(samples)} samples lost: {str(e)}")
+            self._count('dropped', len(samples))
+        self.replay_event.set()
+
+    def deliver(self, samples: List[Sample]) -> None:
+        """Send a shard batch, or append it to the WAL while older data is still waiting there."""
+        if self.wal.pending():
+            # Sending now would overtake older samples of the same series
+            self.spill(samples)
+            return
+        result = self._post(encode_write_request(samples))
+        if result is True:
+            self._count('sent', len(samples))
+        elif result is False:
+            self.spill(samples)
+        else:
+            self._count('dropped', len(samples))
+
+    def _replay_loop(self) -> None:
+        """Drain WAL segments oldest first whenever the receiver is reachable."""
+        while not self.stopping:
+            self.replay_event.wait(max(1.0, self.retry_at - time.monotonic()))
+            self.replay_event.clear()
+            while not self.stopping:
+                segment = self.wal.oldest()
+                if segment is None:
+                    break
+                delivered = True
+                try:
+                    for payload, count in self.wal.records(segment):
+                        result = self._post(payload)
+                        if result is False:
+                            delivered = False
+                            break
+                        self._count('sent' if result else 'dropped', count)
+                except OSError as e:
+                    self.logger.error(f"Remote write WAL segment {segment} unreadable: {str(e)}")
+                if not delivered:
+                    break
+                # Records of a partially delivered segment are resent, which receivers ignore as duplicates
+                self.wal.remove(segment)
+            if self.self_metrics is not None:
+                self.self_metrics.set('remote_write_wal_bytes', self.wal.size())
+
+    def stop(self) -> None:
+        """Stop the threads and move whatever is still queued to the WAL."""
+        self.stopping = True
+        for shard in self.shards:
+            with shard.cond:
+                shard.cond.notify()
+                remaining = list(shard.queue)
+                shard.queue.clear()
+            if remaining:
+                self.spill(remaining)
+        self.replay_event.set()
+
+
+# --- stand-in receiver -------------------------------------------------------
+
+class _ReceiverHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        receiver = self.server.receiver
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if receiver.fail_status:
+            self.send_response(receiver.fail_status)
+            self.end_headers()
+            return
+        try:
+            samples = decode_write_request(snappy_decompress(body))
+        except (ValueError, IndexError, struct.error) as e:
+            self.send_response(400)
+            self.end_headers()
+            self.wfile.write(str(e).encode())
+            return
+        with receiver.lock:
+            receiver.requests += 1
+            receiver.samples.extend(samples)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RemoteWriteReceiver:
+    """Minimal stand-in remote_write endpoint that decodes and keeps what it receives."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        """Bind the HTTP server; port 0 picks a free port."""
+        self.server = HTTPServer((host, port), _ReceiverHandler)
+        self.server.receiver = self
+        self.port = self.server.server_address[1]
+        self.url = f"http://{host}:{self.port}/api/v1/write"
+        self.lock = threading.Lock()
+        self.samples = []
+        self.requests = 0
+        self.fail_status = 0  # Set to e.g. 503 to simulate an outage
+
+    def start(self) -> 'RemoteWriteReceiver':
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    """Run a stand-in remote_write receiver that prints incoming series."""
+    parser = argparse.ArgumentParser(description='System Monitor remote_write stand-in receiver')
+    parser.add_argument('--receiver', type=int, metavar='PORT', required=True, help='Port to listen on')
+    args = parser.parse_args()
+
+    receiver = RemoteWriteReceiver('0.0.0.0', args.receiver).start()
+    print(f"Stand-in remote_write receiver on port {receiver.port} "
+          f"(snappy: {'python-snappy' if SNAPPY_AVAILABLE else 'built-in'})")
+    seen = 0
+    try:
+        while True:
+            time.sleep(0.5)
+            with receiver.lock:
+                new = receiver.samples[seen:]
+                seen = len(receiver.samples)
+            for labels, value, timestamp in new:
+                print(timestamp, dict(labels), value)
+    except KeyboardInterrupt:
+        receiver.stop()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
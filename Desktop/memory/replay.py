@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Alert replay for System Monitor
+Runs historical samples from the metrics table or a recorded file through
+the monitor's own alert evaluation, cooldown logic and alert rules file under
+a candidate configuration, reporting the alerts that would have fired
+"""
+
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+from collections import Counter
+from typing import Dict, Any, Iterator, Tuple, Optional
+
+from memory_monitor import SystemMonitor, DEFAULT_CONFIG_FILE
+from db_handler import DatabaseHandler
+from alert_rules import series_from_metrics
+
+STANDARD_DEFAULTS = {'ram': 0.0, 'cpu': 0.0, 'disk': 0.0, 'swap': 0.0, 'load': 0.0, 'network': (0.0, 0.0)}
+
+
+class ReplayMonitor(SystemMonitor):
+    """A SystemMonitor holding only configuration and alert state; nothing is collected or sent."""
+
+    def __init__(self, config_file: str):
+        """Load the candidate configuration without starting any collector or integration."""
+        self.config_file = config_file
+        self.config = self._load_config(require_telegram=False)
+        self.logger = logging.getLogger('memory_monitor.replay')
+        self.last_alert_times = {}
+        self.alert_rules = self._setup_alert_rules()
+
+
+def _to_epoch(value: Any) -> float:
+    """Convert an epoch number, ISO string or datetime into epoch seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+def _normalize(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in the standard keys evaluate_alerts expects."""
+    for key, default in STANDARD_DEFAULTS.items():
+        if metrics.get(key) is None:
+            metrics[key] = default
+    if isinstance(metrics['network'], list):
+        metrics['network'] = tuple(metrics['network'])
+    return metrics
+
+
+def samples_from_file(path: str, start: Optional[float] = None,
+                      end: Optional[float] = None) -> Iterator[Tuple[float, Optional[str], Dict[str, Any]]]:
+    """Yield (timestamp, None, metrics) from a JSON-lines file written with record_file (one host)."""
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                metrics = json.loads(line)
+                timestamp = _to_epoch(metrics.pop('timestamp'))
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"{path}:{line_number}: o'tkazib yuborildi ({str(e)})", file=sys.stderr)
+                continue
+            if (start is not None and timestamp < start) or (end is not None and timestamp >= end):
+                continue
+            yield timestamp, None, _normalize(metrics)
+
+
+def samples_from_database(config: Dict[str, Any], start: datetime.datetime, end: Optional[datetime.datetime],
+                          hostname: Optional[str]) -> Iterator[Tuple[float, Optional[str], Dict[str, Any]]]:
+    """Yield (timestamp, hostname, metrics) from the metrics table in time order."""
+    handler = DatabaseHandler(config)
+    try:
+        for row in handler.iter_metrics(start, end, hostname):
+            metrics = {
+                'ram': row['ram_usage'],
+                'cpu': row['cpu_usage'],
+                'disk': row['disk_usage'],
+                'swap': row['swap_usage'],
+                'load': row['load_average'],
+                'network': (row['network_rx'] or 0.0, row['network_tx'] or 0.0),
+            }
+            if row['extra_data']:
+                try:
+                    metrics.update(json.loads(row['extra_data']))
+                except ValueError:
+                    pass
+            yield _to_epoch(row['timestamp']), row['hostname'], _normalize(metrics)
+    finally:
+        handler.close()
+
+
+def replay(monitor: ReplayMonitor, samples: Iterator[Tuple[float, Optional[str], Dict[str, Any]]],
+           cpu_count: Optional[int] = None) -> Dict[str, Any]:
+    """Evaluate every sample in order, advancing the cooldown clock with the sample timestamps."""
+    # Each live monitor has its own cooldowns and rule state, so interleaved hosts must not share them
+    hosts = {}
+    fired = []
+    breaches = Counter()
+    suppressed = Counter()
+    count = 0
+    first = last = None
+    started = time.perf_counter()
+
+    for timestamp, hostname, metrics in samples:
+        count += 1
+        state = hosts.get(hostname)
+        if state is None:
+            state = hosts[hostname] = ({}, monitor.alert_rules if not hosts else monitor._setup_alert_rules())
+        monitor.last_alert_times, monitor.alert_rules = state
+        if first is None:
+            first = timestamp
+        last = timestamp
+        current_time = int(timestamp)
+        for alert_type, usage_value, log_message in monitor.evaluate_alerts(metrics, cpu_count):
+            breaches[alert_type] += 1
+            if monitor.alert_cooldown_passed(alert_type, current_time):
+                # Replay assumes delivery succeeds, which is when the live monitor starts the cooldown
+                monitor.last_alert_times[alert_type.lower()] = current_time
+                fired.append({'timestamp': timestamp, 'host': hostname, 'type': alert_type,
+                              'value': usage_value, 'message': log_message})
+            else:
+                suppressed[alert_type] += 1
+        
+        # Rules keep their own for/repeat state, so like the live monitor they skip the cooldown;
+        # cgroup series are not stored, so rules over them never match in a replay
+        if monitor.alert_rules:
+            series = series_from_metrics(metrics, monitor.config)
+            for rule, event, labels, value in monitor.alert_rules.evaluate(series, timestamp):
+                if event == 'resolved':
+                    continue
+                description = rule.describe(labels, value)
+                breaches[rule.alert_type] += 1
+                fired.append({'timestamp': timestamp, 'host': hostname, 'type': rule.alert_type,
+                              'value': f"{rule.name}: {description}",
+                              'message': f"Qoida [{rule.name}]: {description}"})
+
+    elapsed = time.perf_counter() - started
+    return {
+        'samples': count,
+        'hosts': len(hosts),
+        'first_sample': first,
+        'last_sample': last,
+        'elapsed_seconds': round(elapsed, 3),
+        'samples_per_second': round(count / elapsed) if elapsed > 0 else None,
+        'alerts': fired,
+        'summary': {alert_type: {'breaches': breaches[alert_type],
+                                 'fired': sum(1 for alert in fired if alert['type'] == alert_type),
+                                 'suppressed': suppressed[alert_type]}
+                    for alert_type in sorted(breaches)},
+    }
+
+
+def _format_time(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return "-"
+    return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def print_report(result: Dict[str, Any], show_alerts: bool = True) -> None:
+    """Print a replay result as text."""
+    if show_alerts:
+        for alert in result['alerts']:
+            host = f"{alert['host']}  " if result['hosts'] > 1 else ""
+            print(f"{_format_time(alert['timestamp'])}  {host}{alert['type']:<8} {alert['value']}")
+        if result['alerts']:
+            print()
+
+    print(f"Namunalar: {result['samples']} ({_format_time(result['first_sample'])} - "
+          f"{_format_time(result['last_sample'])}), {result['elapsed_seconds']}s, "
+          f"{result['samples_per_second'] or '-'} namuna/s")
+    print(f"{'TYPE':<10}{'BREACHES':>10}{'FIRED':>8}{'SUPPRESSED':>12}")
+    for alert_type, counts in result['summary'].items():
+        print(f"{alert_type:<10}{counts['breaches']:>10}{counts['fired']:>8}{counts['suppressed']:>12}")
+
+
+def _parse_time(value: str) -> datetime.datetime:
+    """Parse 'YYYY-MM-DD[ HH:MM[:SS]]' or a relative '<N>h' / '<N>d'."""
+    if value[:-1].isdigit() and value[-1] in 'hd':
+        hours = int(value[:-1]) * (24 if value[-1] == 'd' else 1)
+        return datetime.datetime.now() - datetime.timedelta(hours=hours)
+    return datetime.datetime.fromisoformat(value)
+
+
+def main():
+    """Replay history under a candidate configuration."""
+    parser = argparse.ArgumentParser(description='Replay recorded metrics through the System Monitor alert logic')
+    parser.add_argument('--config', default=DEFAULT_CONFIG_FILE,
+                        help='Candidate configuration whose thresholds and interval are evaluated')
+    parser.add_argument('--file', help='JSON-lines file written with record_file (default: the metrics table)')
+    parser.add_argument('--db-config', help='Configuration with the [Database] section to read (default: --config)')
+    parser.add_argument('--since', default='7d', help="Start of the range: 'YYYY-MM-DD HH:MM' or '<N>h'/'<N>d' (default: 7d)")
+    parser.add_argument('--until', help='End of the range (default: now)')
+    parser.add_argument('--host', help='Only replay samples of this hostname (database source)')
+    parser.add_argument('--cpu-count', type=int, help='Cores of the recorded host, used in load alert text')
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+    parser.add_argument('--summary-only', action='store_true', help='Do not list individual alerts')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - [%(levelname)s] - %(message)s')
+    monitor = ReplayMonitor(args.config)
+    start = _parse_time(args.since)
+    end = _parse_time(args.until) if args.until else None
+
+    if args.file:
+        samples = samples_from_file(args.file, start.timestamp(), end.timestamp() if end else None)
+    else:
+        db_config = ReplayMonitor(args.db_config).config if args.db_config else monitor.config
+        if not db_config['db_enabled']:
+            print("XATO: --file ko'rsatilmagan va konfiguratsiyada db_enabled o'chirilgan")
+            sys.exit(1)
+        samples = samples_from_database(db_config, start, end, args.host)
+
+    result = replay(monitor, samples, args.cpu_count)
+    if args.json:
+        if args.summary_only:
+            result.pop('alerts')
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        print_report(result, show_alerts=not args.summary_only)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Self-instrumentation for System Monitor
+Lightweight histograms and counters describing the monitor's own work
+"""
+
+import time
+import bisect
+import threading
+from typing import Dict, Any, Tuple, Iterator
+
+# Bucket upper bounds in seconds, from sub-millisecond /proc reads to slow `du` runs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# name -> (type, help text, label names)
+SELF_METRICS = {
+    'probe_duration_seconds': ('histogram', 'Duration of each metric probe', ('probe',)),
+    'cycle_duration_seconds': ('histogram', 'Duration of a full monitoring cycle', ()),
+    'cycle_overruns_total': ('counter', 'Cycles that took longer than check_interval', ()),
+    'probe_interval_seconds': ('gauge', 'Current adaptive interval of each scheduled probe', ('probe',)),
+    'db_write_duration_seconds': ('histogram', 'Duration of database writes', ('operation',)),
+    'db_errors_total': ('counter', 'Failed database writes', ('operation',)),
+    'alert_send_duration_seconds': ('histogram', 'Duration of Telegram alert delivery', ('alert_type',)),
+    'alert_send_errors_total': ('counter', 'Telegram alerts that could not be delivered', ('alert_type',)),
+    'forensic_snapshots_total': ('counter', 'Forensic snapshots by outcome (written, truncated, skipped, failed)', ('outcome',)),
+    'process_scan_duration_seconds': ('histogram', 'Duration of the process table scan', ('resource',)),
+    'process_scan_size': ('gauge', 'Number of processes seen by the last process table scan', ()),
+    'zabbix_send_duration_seconds': ('histogram', 'Duration of Zabbix trapper batch sends', ()),
+    'zabbix_buffered_values': ('gauge', 'Values waiting in the Zabbix sender buffer', ()),
+    'remote_write_samples_total': ('counter', 'Remote write samples by outcome (sent, spilled, dropped)', ('outcome',)),
+    'remote_write_send_duration_seconds': ('histogram', 'Duration of remote write requests', ()),
+    'remote_write_wal_bytes': ('gauge', 'Size of the remote write WAL on disk', ()),
+    'log_records_dropped_total': ('counter', 'Log records dropped because the logging queue was full', ()),
+    'alert_rules_firing': ('gauge', 'Alert rule instances currently firing', ()),
+    'history_api_chunks_total': ('counter', 'History API result chunks by cache outcome (hit, miss)', ('outcome',)),
+    'history_api_responses_total': ('counter', 'History API responses by HTTP status', ('status',)),
+    'resident_memory_bytes': ('gauge', 'Resident set size of the monitor process', ()),
+    'memory_budget_trims_total': ('counter', 'Times caches were dropped because the monitor exceeded memory_budget_mb', ()),
+}
+
+
+class _Histogram:
+    """Cumulative-on-read histogram with fixed buckets."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Timer:
+    """Context manager that records its duration into a SelfMetrics histogram."""
+
+    __slots__ = ('registry', 'name', 'labels', 'started')
+
+    def __init__(self, registry: 'SelfMetrics', name: str, labels: Tuple[str, ...]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self) -> '_Timer':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.registry.observe(self.name, time.perf_counter() - self.started, self.labels)
+        return False
+
+
+class _NullTimer:
+    """Shared no-op timer returned while self-instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class SelfMetrics:
+    """Registry of the monitor's own timings and counters."""
+
+    def __init__(self, enabled: bool = False):
+        """Initialize the registry; a disabled registry records nothing."""
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._values = {name: {} for name in SELF_METRICS}
+
+    def time(self, name: str, labels: Tuple[str, ...] = ()):
+        """Return a context manager timing the enclosed block into histogram `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def observe(self, name: str, value: float, labels: Tuple[str, ...] = ()) -> None:
+        """Record a value in a histogram."""
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._values[name]
+            histogram = series.get(labels)
+            if histogram is None:
+                histogram = series[labels] = _Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, amount: float = 1, labels: Tuple[str, ...] = ()) -> None:
+        """Increment a counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            series = self._values[name]
+            series[labels] = series.get(labels, 0) + amount
+
+    def set(self, name: str, value: float, labels: Tuple[str, ...] = ()) -> None:
+        """Set a gauge."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[name][labels] = value
+
+    def snapshot(self) -> Iterator[Tuple[str, str, str, Tuple[str, ...], Dict[Tuple[str, ...], Any]]]:
+        """Yield (name, type, help, label_names, {labels: value}) with consistent copies of every series."""
+        with self._lock:
+            copies = {}
+            for name, series in self._values.items():
+                if SELF_METRICS[name][0] == 'histogram':
+                    copies[name] = {labels: (h.buckets, list(h.counts), h.sum, h.count)
+                                    for labels, h in series.items()}
+                else:
+                    copies[name] = dict(series)
+        for name, (metric_type, help_text, label_names) in SELF_METRICS.items():
+            yield name, metric_type, help_text, label_names, copies[name]
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+memory-monitor.sh configuration support for System Monitor
+Reads the shell-style KEY=VALUE config.conf written by install.sh and the
+shell script, so the Python daemon can replace the script without
+rewriting existing configurations
+"""
+
+import re
+import sys
+import shlex
+from typing import Dict, Any, List, Optional
+
+SECTION_HEADER = re.compile(r'^\s*\[[^\]]+\]\s*$', re.MULTILINE)
+
+# memory-monitor.sh treats a missing MONITOR_* switch as off, and has no
+# swap, load or network checks at all unless the file turns them on
+SHELL_DEFAULTS = {
+    'monitor_cpu': False,
+    'monitor_disk': False,
+    'monitor_swap': False,
+    'monitor_load': False,
+    'monitor_network': False,
+}
+
+# memory-monitor.sh ignores these switches, yet every config.conf it shipped
+# sets them to true, so only the Python daemon's own names turn the checks on
+LEGACY_SWITCHES = ('MONITOR_SWAP', 'MONITOR_LOAD', 'MONITOR_NETWORK')
+PYTHON_SWITCHES = {
+    'PY_MONITOR_SWAP': 'monitor_swap',
+    'PY_MONITOR_LOAD': 'monitor_load',
+    'PY_MONITOR_NETWORK': 'monitor_network',
+}
+
+TRUE_VALUES = ('true', 'yes', 'on', '1')
+
+
+def read_shell_config(path: str) -> Optional[Dict[str, str]]:
+    """Return {NAME: value} of a KEY=VALUE file, or None if the file has [Section] headers."""
+    with open(path, 'r') as f:
+        text = f.read()
+    if SECTION_HEADER.search(text):
+        return None
+
+    values = {}
+    for line_number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('export '):
+            line = line[len('export '):].lstrip()
+        name, separator, raw = line.partition('=')
+        if not separator or not name.isidentifier():
+            print(f"{path}:{line_number}: tushunarsiz qator o'tkazib yuborildi", file=sys.stderr)
+            continue
+        try:
+            # Quotes and trailing '# comments' follow the shell's rules
+            values[name] = ' '.join(shlex.split(raw, comments=True))
+        except ValueError as e:
+            print(f"{path}:{line_number}: {name} qiymati o'qilmadi ({str(e)})", file=sys.stderr)
+    return values
+
+
+def apply_shell_config(config: Dict[str, Any], values: Dict[str, str]) -> List[str]:
+    """Apply shell values over config defaults, typed like the defaults; return the unknown names."""
+    config.update(SHELL_DEFAULTS)
+    unknown = []
+    for name, raw in values.items():
+        if name in LEGACY_SWITCHES:
+            continue
+        key = PYTHON_SWITCHES.get(name, name.lower())
+        if key not in config:
+            unknown.append(name)
+            continue
+        default = config[key]
+        try:
+            if key == 'load_threshold':
+                # The shell config gives load per core (5 = 5.0), the daemon compares percent of it
+                config[key] = round(float(raw) * 100)
+            elif isinstance(default, bool):
+                config[key] = raw.lower() in TRUE_VALUES
+            elif isinstance(default, int):
+                config[key] = int(raw)
+            elif isinstance(default, float):
+                config[key] = float(raw)
+            else:
+                config[key] = raw
+        except ValueError:
+            print(f"{name}={raw} noto'g'ri qiymat, standart qiymat ishlatiladi: {default}", file=sys.stderr)
+    return unknown
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Socket and TCP connection-state summary for System Monitor
+Streams /proc/net/{tcp,tcp6,udp,udp6} through a reusable buffer and counts
+sockets by state, remote address and ephemeral port use with C-level
+iterators, and reads listen queue overflows and other kernel counters from
+/proc/net/netstat and /proc/net/snmp
+"""
+
+import os
+import re
+import sys
+import time
+import socket
+import logging
+import argparse
+from collections import Counter
+from itertools import compress
+from operator import itemgetter
+from typing import Dict, Any, Iterator
+
+PROC_NET = "/proc/net"
+PORT_RANGE_FILE = "/proc/sys/net/ipv4/ip_local_port_range"
+
+# Hex state column of /proc/net/tcp (include/net/tcp_states.h)
+TCP_STATES = {
+    b'01': 'established', b'02': 'syn_sent', b'03': 'syn_recv', b'04': 'fin_wait1',
+    b'05': 'fin_wait2', b'06': 'time_wait', b'07': 'close', b'08': 'close_wait',
+    b'09': 'last_ack', b'0A': 'listen', b'0B': 'closing', b'0C': 'new_syn_recv',
+}
+
+# Kernel counters kept from /proc/net/netstat and /proc/net/snmp, by section
+COUNTERS = {
+    'TcpExt': ('ListenOverflows', 'ListenDrops', 'TCPBacklogDrop', 'TCPReqQFullDrop', 'SyncookiesSent',
+               'TCPTimeWaitOverflow', 'TCPAbortOnMemory', 'TCPAbortOnTimeout'),
+    'Tcp': ('ActiveOpens', 'PassiveOpens', 'AttemptFails', 'EstabResets', 'RetransSegs', 'InErrs', 'OutRsts'),
+    'Udp': ('InErrors', 'RcvbufErrors', 'SndbufErrors', 'NoPorts'),
+}
+
+# local port, remote address, remote port, state; the rest of the line is never looked at.
+# Fixed-width addresses and the ': ' after the slot number let the regex engine skip ahead by literal search
+TCP_LINE = re.compile(rb': [0-9A-F]{8}:([0-9A-F]{4}) ([0-9A-F]{8}):([0-9A-F]{4}) ([0-9A-F]{2}) ')
+TCP6_LINE = re.compile(rb': [0-9A-F]{32}:([0-9A-F]{4}) ([0-9A-F]{32}):([0-9A-F]{4}) ([0-9A-F]{2}) ')
+
+LOCAL_PORT = itemgetter(0)
+REMOTE_ADDRESS = itemgetter(1)
+DESTINATION = itemgetter(1, 2)
+STATE = itemgetter(3)
+
+UNSPECIFIED = {b'0' * 8, b'0' * 32}
+
+CHUNK_SIZE = 256 * 1024
+
+
+def decode_address(value: bytes) -> str:
+    """Kernel hex address (host-order 32-bit words) to text; IPv4-mapped IPv6 is shown as IPv4."""
+    raw = bytes.fromhex(value.decode('ascii'))
+    # Each 32-bit word is printed in host byte order
+    raw = b''.join(raw[index:index + 4][::-1] for index in range(0, len(raw), 4)) \
+        if sys.byteorder == 'little' else raw
+    if len(raw) == 16 and raw[:12] == b'\0' * 10 + b'\xff\xff':
+        raw = raw[12:]
+    return socket.inet_ntop(socket.AF_INET if len(raw) == 4 else socket.AF_INET6, raw)
+
+
+def parse_counters(data: bytes) -> Dict[str, Dict[str, int]]:
+    """Parse the header/value line pairs of /proc/net/netstat or /proc/net/snmp."""
+    sections = {}
+    lines = data.split(b'\n')
+    for header, values in zip(lines[::2], lines[1::2]):
+        name, _, fields = header.partition(b':')
+        numbers = values.partition(b':')[2].split()
+        sections[name.decode('ascii')] = {field.decode('ascii'): int(number)
+                                          for field, number in zip(fields.split(), numbers)}
+    return sections
+
+
+class _SocketTable:
+    """One /proc/net socket table, kept open and streamed through a shared buffer."""
+
+    __slots__ = ('path', 'fd')
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0))
+
+    def scan(self, buffer: bytearray) -> Iterator[int]:
+        """Stream the table through buffer, yielding the length of each run of complete lines in it."""
+        offset = 0
+        pending = 0
+        with memoryview(buffer) as view:
+            while True:
+                count = os.preadv(self.fd, [view[pending:]], offset)
+                offset += count
+                length = pending + count
+                end = buffer.rfind(b'\n', 0, length) + 1 if count else length
+                if end:
+                    yield end
+                if not count:
+                    return
+                # Carry the incomplete last line over to the next read
+                pending = length - end
+                buffer[:pending] = view[end:length]
+
+    def close(self) -> None:
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class SocketStatsCollector:
+    """TCP/UDP socket counts by state, top remote addresses, ephemeral port use and kernel drop counters."""
+
+    def __init__(self, config: Dict[str, Any], proc_net: str = PROC_NET):
+        """Open the socket tables and counter files that exist on this kernel."""
+        self.logger = logging.getLogger('memory_monitor.sockets')
+        self.top_remotes = config.get('socket_top_remotes', 10)
+        self.buffer = bytearray(CHUNK_SIZE)
+        self.tables = {}
+        for name in ('tcp', 'tcp6', 'udp', 'udp6'):
+            try:
+                self.tables[name] = _SocketTable(os.path.join(proc_net, name))
+            except OSError:
+                pass  # No IPv6 or no UDP in this kernel/namespace
+        if 'tcp' not in self.tables:
+            raise OSError(f"{proc_net}/tcp not readable")
+        self.counter_paths = [os.path.join(proc_net, name) for name in ('netstat', 'snmp')]
+        self.port_range = None
+        self.ephemeral_ports = frozenset()
+        self.previous_counters = None
+
+    def _ephemeral_ports(self) -> frozenset:
+        """Hex local ports of the ephemeral range, rebuilt only when the sysctl changes."""
+        try:
+            with open(PORT_RANGE_FILE, 'rb') as f:
+                port_range = tuple(int(port) for port in f.read().split())
+        except (OSError, ValueError):
+            return self.ephemeral_ports
+        if port_range != self.port_range:
+            self.port_range = port_range
+            self.ephemeral_ports = frozenset(b'%04X' % port for port in range(port_range[0], port_range[1] + 1))
+        return self.ephemeral_ports
+
+    def counters(self) -> Dict[str, int]:
+        """Selected cumulative kernel counters, e.g. {'TcpExt.ListenOverflows': 12}."""
+        result = {}
+        for path in self.counter_paths:
+            try:
+                with open(path, 'rb') as f:
+                    sections = parse_counters(f.read())
+            except OSError:
+                continue
+            for section, fields in COUNTERS.items():
+                values = sections.get(section, {})
+                for field in fields:
+                    if field in values:
+                        result[f"{section}.{field}"] = values[field]
+        return result
+
+    def collect(self) -> Dict[str, Any]:
+        """Summarise every socket table; nothing per socket outlives its chunk."""
+        ephemeral = self._ephemeral_ports()
+        states = Counter()
+        remotes = Counter()
+        destinations = Counter()
+        udp = 0
+        buffer = self.buffer
+        for name, table in self.tables.items():
+            if name.startswith('udp'):
+                # Only the total is kept, so UDP sockets are just lines after the header
+                udp += sum(buffer.count(b'\n', 0, end) for end in table.scan(buffer)) - 1
+                continue
+            pattern = TCP6_LINE if name == 'tcp6' else TCP_LINE
+            for end in table.scan(buffer):
+                rows = pattern.findall(buffer, 0, end)
+                states.update(map(STATE, rows))
+                remotes.update(map(REMOTE_ADDRESS, rows))
+                # Outgoing connections use an ephemeral local port; the kernel needs a unique one per destination
+                destinations.update(compress(map(DESTINATION, rows),
+                                             map(ephemeral.__contains__, map(LOCAL_PORT, rows))))
+
+        tcp = {state: states.get(code, 0) for code, state in TCP_STATES.items()}
+        tcp['total'] = sum(states.values())
+
+        # Listening and unconnected sockets have no remote end
+        for address in UNSPECIFIED:
+            remotes.pop(address, None)
+        for address, port in [destination for destination in destinations if destination[0] in UNSPECIFIED]:
+            del destinations[address, port]
+        top = [{'address': decode_address(address), 'connections': count}
+               for address, count in remotes.most_common(self.top_remotes)]
+
+        range_size = self.port_range[1] - self.port_range[0] + 1 if self.port_range else 0
+        busiest = destinations.most_common(1)
+        ephemeral_summary = {'range': range_size, 'used': sum(destinations.values()),
+                             'max_destination': '', 'max_percent': 0.0}
+        if busiest and range_size:
+            (address, port), count = busiest[0]
+            ephemeral_summary['max_destination'] = f"{decode_address(address)}:{int(port, 16)}"
+            ephemeral_summary['max_percent'] = round(count / range_size * 100, 1)
+
+        counters = self.counters()
+        previous, self.previous_counters = self.previous_counters, counters
+
+        def increase(name):
+            # Drops since the previous sample; nothing on the first one or after a counter reset
+            if not previous or counters.get(name, 0) < previous.get(name, 0):
+                return 0
+            return counters.get(name, 0) - previous.get(name, 0)
+
+        return {
+            'tcp': tcp,
+            'udp': udp,
+            'ephemeral': ephemeral_summary,
+            'remote_top': top,
+            'counters': counters,
+            'listen_overflows': increase('TcpExt.ListenOverflows'),
+            'syn_queue_drops': increase('TcpExt.TCPReqQFullDrop'),
+        }
+
+    @staticmethod
+    def format_table(summary: Dict[str, Any]) -> str:
+        """Format a collect() result for alert messages."""
+        tcp = summary['tcp']
+        result = "STATE SOCKETS\n"
+        for state, count in sorted(tcp.items(), key=lambda item: item[1], reverse=True):
+            if count and state != 'total':
+                result += f"{state} {count}\n"
+        ephemeral = summary['ephemeral']
+        if ephemeral['max_destination']:
+            result += f"\nEphemeral: {ephemeral['max_destination']} {ephemeral['max_percent']}% / {ephemeral['range']}\n"
+        if summary['remote_top']:
+            result += "\nREMOTE CONNECTIONS\n"
+            for remote in summary['remote_top']:
+                result += f"{remote['address']} {remote['connections']}\n"
+        return result
+
+    def close(self) -> None:
+        """Close the socket table descriptors."""
+        for table in self.tables.values():
+            table.close()
+
+
+def main():
+    """Print the socket summary and time the scan, optionally over a synthetic table of N sockets."""
+    parser = argparse.ArgumentParser(description='System Monitor socket summary')
+    parser.add_argument('--synthetic', type=int, default=0, metavar='N',
+                        help='Scan a generated /proc/net/tcp with N sockets instead of the live one')
+    parser.add_argument('--iterations', type=int, default=5, help='Timed scans (default: 5)')
+    args = parser.parse_args()
+
+    proc_net = PROC_NET
+    if args.synthetic:
+        import tempfile
+        import random
+        proc_net = tempfile.mkdtemp(prefix='socket_stats_')
+        with open(os.path.join(proc_net, 'tcp'), 'w') as f:
+            f.write("  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n")
+            for index in range(args.synthetic):
+                state = random.choice(('01', '01', '01', '06', '06', '08', '0A'))
+                remote = f"{random.randint(1, 50):02X}00000A" if state != '0A' else "00000000"
+                f.write(f"{index:4d}: 0100007F:{random.randint(32768, 60999):04X} {remote}:0CEA {state} "
+                        f"00000000:00000000 00:00000000 00000000  1000        0 {1000000 + index} 1 "
+                        f"0000000000000000 20 4 30 10 -1\n")
+
+    collector = SocketStatsCollector({}, proc_net)
+    durations = []
+    for _ in range(args.iterations):
+        started = time.perf_counter()
+        summary = collector.collect()
+        durations.append(time.perf_counter() - started)
+    collector.close()
+
+    print(f"TCP: {', '.join(f'{state}={count}' for state, count in summary['tcp'].items() if count)}")
+    print(f"UDP: {summary['udp']}")
+    ephemeral = summary['ephemeral']
+    print(f"Ephemeral: {ephemeral['used']} in use, busiest {ephemeral['max_destination'] or '-'} "
+          f"{ephemeral['max_percent']}% of {ephemeral['range']}")
+    for remote in summary['remote_top']:
+        print(f"  {remote['address']:<40} {remote['connections']}")
+    for name, value in summary['counters'].items():
+        if value:
+            print(f"{name}: {value}")
+    durations.sort()
+    print(f"\n{summary['tcp']['total']} TCP sockets scanned in {durations[len(durations) // 2] * 1000:.1f} ms (median)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Parsing and stateful evaluation of alert rules files."""
+
+import os
+import re
+
+import pytest
+
+from alert_rules import AlertRule, AlertRuleEngine, compile_expression, labels_of, NO_LABELS
+
+README = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'README.md')
+
+
+def readme_rules():
+    with open(README, encoding='utf-8') as f:
+        text = f.read()
+    return re.search(r'```ini\n(\[disk_full\].*?)```', text, re.DOTALL).group(1)
+
+
+def series(**metrics):
+    """{metric: [(labels, value), ...]} to the engine's (label sets, values) vectors."""
+    return {name: ([labels for labels, _ in items], [value for _, value in items])
+            for name, items in metrics.items()}
+
+
+def evaluate(expr, data, now=0.0):
+    labels, values = compile_expression(expr).eval(data, now)
+    return dict(zip(labels, values))
+
+
+def test_readme_example_loads(tmp_path):
+    path = tmp_path / 'alert-rules.conf'
+    path.write_text(readme_rules(), encoding='utf-8')
+    engine = AlertRuleEngine.from_file(str(path), default_repeat=600)
+    disk_full, noisy_unit = engine.rules
+    # The trailing '# ...' notes are comments, not part of the values
+    assert disk_full.for_seconds == 300
+    assert disk_full.hold.threshold == 85
+    assert disk_full.alert_type == 'Disk'
+    assert noisy_unit.repeat_seconds == 3600
+
+    root, snap = labels_of(mountpoint='/'), labels_of(mountpoint='/snap/core')
+    data = series(disk_used_percent=[(root, 95.0), (snap, 100.0)])
+    assert engine.evaluate(data, 0) == []
+    events = engine.evaluate(data, 300)
+    assert [(rule.name, event, labels) for rule, event, labels, _ in events] == [('disk_full', 'firing', root)]
+    assert disk_full.describe(root, 95.0) == "/ 95.0%"
+
+
+def test_inline_comments(tmp_path):
+    path = tmp_path / 'rules.conf'
+    path.write_text("[ram]\nexpr = ram_percent > 90  ; RAM\nfor = 2m    # two cycles\ntype = RAM # type\n")
+    rule, = AlertRuleEngine.from_file(str(path)).rules
+    assert rule.expr_text == "ram_percent > 90"
+    assert rule.for_seconds == 120
+    assert rule.alert_type == 'RAM'
+
+
+def test_invalid_rule_names_section(tmp_path):
+    path = tmp_path / 'rules.conf'
+    path.write_text("[broken]\nexpr = ram_percent >\n")
+    with pytest.raises(ValueError, match=r'\[broken\]'):
+        AlertRuleEngine.from_file(str(path))
+
+
+def test_for_and_clear_hysteresis():
+    rule = AlertRule('ram', 'ram_percent > 90', for_seconds=120, clear=80, repeat_seconds=600)
+    ram = lambda value: series(ram_percent=[(NO_LABELS, value)])
+
+    assert rule.evaluate(ram(95), 0) == []
+    # Dropping below the threshold while pending restarts the for period
+    assert rule.evaluate(ram(85), 60) == []
+    assert rule.evaluate(ram(95), 120) == []
+    assert rule.evaluate(ram(95), 180) == []
+    assert rule.evaluate(ram(95), 240) == [('firing', NO_LABELS, 95.0)]
+    # Between clear and the threshold the alert holds, with the latest value
+    assert rule.evaluate(ram(85), 300) == []
+    assert rule.firing[NO_LABELS][2] == 85.0
+    assert rule.evaluate(ram(85), 840) == [('repeat', NO_LABELS, 85.0)]
+    assert rule.evaluate(ram(79), 900) == [('resolved', NO_LABELS, 85.0)]
+    assert rule.firing == {}
+
+
+def test_clear_needs_comparison():
+    with pytest.raises(ValueError):
+        AlertRule('bad', 'ram_percent > 90 and cpu_percent > 90', clear=80)
+
+
+def test_rate_across_counter_reset():
+    expr = compile_expression('rate(netstat_total[5m])')
+    counter = lambda value: series(netstat_total=[(NO_LABELS, value)])
+    assert expr.eval(counter(100), 0) == ([], [])
+    assert expr.eval(counter(160), 60)[1] == [1.0]
+    # The counter restarted at 0 and is now 30: the increase is 60 + 30 over 120 seconds
+    labels, values = expr.eval(counter(30), 120)
+    assert labels == [NO_LABELS] and values == [pytest.approx(0.75)]
+    assert compile_expression('increase(netstat_total[5m])').eval(counter(30), 0) == ([], [])
+
+
+def test_rate_window_drops_old_samples():
+    expr = compile_expression('increase(netstat_total[2m])')
+    counter = lambda value: series(netstat_total=[(NO_LABELS, value)])
+    for now, value in ((0, 0), (60, 100), (120, 200)):
+        expr.eval(counter(value), now)
+    assert expr.eval(counter(210), 180)[1] == [110.0]
+
+
+def test_and_unless_with_label_less_right_side():
+    a, b = labels_of(group='a'), labels_of(group='b')
+    data = series(process_group_rss_mb=[(a, 500.0), (b, 2000.0)], ram_percent=[(NO_LABELS, 95.0)])
+
+    # A label-less right side matches every left series
+    assert evaluate('process_group_rss_mb > 100 and ram_percent > 90', data) == {a: 500.0, b: 2000.0}
+    assert evaluate('process_group_rss_mb > 100 unless ram_percent > 90', data) == {}
+    # An empty right side matches nothing
+    assert evaluate('process_group_rss_mb > 100 and ram_percent > 99', data) == {}
+    assert evaluate('process_group_rss_mb > 100 unless ram_percent > 99', data) == {a: 500.0, b: 2000.0}
+
+
+def test_set_operations_match_shared_labels():
+    a, b = labels_of(group='a'), labels_of(group='b')
+    data = series(process_group_rss_mb=[(a, 500.0), (b, 2000.0)],
+                  process_group_cpu_percent=[(a, 90.0), (b, 5.0)])
+    assert evaluate('process_group_rss_mb and process_group_cpu_percent > 50', data) == {a: 500.0}
+    assert evaluate('process_group_rss_mb unless process_group_cpu_percent > 50', data) == {b: 2000.0}
+    assert evaluate('process_group_cpu_percent > 50 or process_group_rss_mb > 1000', data) == {a: 90.0, b: 2000.0}
+
+
+def test_selector_matchers():
+    root, snap, boot = (labels_of(mountpoint=path) for path in ('/', '/snap/core', '/boot'))
+    data = series(disk_used_percent=[(root, 1.0), (snap, 2.0), (boot, 3.0)])
+    assert evaluate('disk_used_percent{mountpoint!~"/snap.*"}', data) == {root: 1.0, boot: 3.0}
+    # Regular expressions are anchored, so "/b" does not match "/boot"
+    assert evaluate('disk_used_percent{mountpoint=~"/b"}', data) == {}
+    assert evaluate('disk_used_percent{mountpoint="/boot"} >= 3', data) == {boot: 3.0}
+
+
+@pytest.mark.parametrize('expr', ['ram_percent >', 'rate(ram_percent)', 'ram_percent{x~"y"}', '(ram_percent',
+                                  'rate(ram_percent[0s])', 'ram_percent > 90 $'])
+def test_syntax_errors(expr):
+    with pytest.raises(ValueError):
+        compile_expression(expr)
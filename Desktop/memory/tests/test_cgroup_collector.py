@@ -0,0 +1,72 @@
+"""cgroup v2 memory percentages on a fixture hierarchy."""
+
+import pytest
+
+from cgroup_collector import CgroupCollector
+from procfs_reader import PROCFS_AVAILABLE
+
+pytestmark = pytest.mark.skipif(not PROCFS_AVAILABLE, reason="needs Linux /proc and os.preadv")
+
+MB = 1024 * 1024
+
+MEMORY_STAT = """anon {anon}
+file {file}
+active_anon {anon}
+inactive_anon 0
+active_file {active}
+inactive_file {inactive}
+"""
+
+
+def cgroup(path, current, limit, inactive_file=None, anon=0):
+    path.mkdir(parents=True, exist_ok=True)
+    (path / 'memory.current').write_text(f"{current}\n")
+    (path / 'memory.max').write_text(f"{limit}\n")
+    if inactive_file is not None:
+        (path / 'memory.stat').write_text(MEMORY_STAT.format(anon=anon, file=current - anon, active=0,
+                                                            inactive=inactive_file))
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'cgroup.controllers').write_text("cpu io memory\n")
+    cgroup(tmp_path, 3000 * MB, 'max', inactive_file=1000 * MB)
+    # Mostly page cache from reading files: full by memory.current, healthy by working set
+    cgroup(tmp_path / 'cache.slice', 950 * MB, 1000 * MB, inactive_file=700 * MB, anon=100 * MB)
+    cgroup(tmp_path / 'anon.slice', 950 * MB, 1000 * MB, inactive_file=10 * MB, anon=900 * MB)
+    cgroup(tmp_path / 'nostat.slice', 500 * MB, 1000 * MB)
+    return tmp_path
+
+
+def collect(root, **config):
+    collector = CgroupCollector({'cgroup_root': str(root), **config})
+    try:
+        samples = {sample['cgroup']: sample for sample in collector.collect()}
+        return collector, samples
+    finally:
+        collector.close()
+
+
+def test_memory_percent_is_working_set(root):
+    collector, samples = collect(root)
+    assert samples['/cache.slice'].get('memory_percent') == 25.0
+    assert samples['/anon.slice'].get('memory_percent') == 94.0
+    # Without memory.stat the whole of memory.current counts
+    assert samples['/nostat.slice'].get('memory_percent') == 50.0
+    assert samples['/cache.slice'].get('memory_current') == 950 * MB
+    # No limit, no percentage
+    assert samples['/'].get('memory_percent') is None
+
+
+def test_breaches_ignore_page_cache(root):
+    collector, samples = collect(root, cgroup_memory_threshold=90)
+    assert collector.breaches(list(samples.values())) == [('/anon.slice', 'memory', 94.0, 90)]
+
+
+def test_container_memory_percent(root):
+    (root / 'memory.max').write_text(f"{4000 * 1024 * 1024}\n")
+    collector = CgroupCollector({'cgroup_root': str(root)})
+    try:
+        assert collector.container_memory_percent() == 50.0
+    finally:
+        collector.close()
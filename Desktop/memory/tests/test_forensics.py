@@ -0,0 +1,68 @@
+"""Forensic snapshots: written files, and no dangling links after a failed capture."""
+
+import datetime
+import os
+import threading
+
+import pytest
+
+from db_handler import DatabaseHandler
+from forensics import ForensicCapture, load_snapshot
+from procfs_reader import PROCFS_AVAILABLE
+
+pytestmark = pytest.mark.skipif(not PROCFS_AVAILABLE, reason="needs Linux /proc")
+
+
+def capture_for(tmp_path, **kwargs):
+    return ForensicCapture({'forensics_dir': str(tmp_path / 'snapshots'), 'forensics_min_interval': 0}, **kwargs)
+
+
+def test_snapshot_written(tmp_path):
+    capture = capture_for(tmp_path, sources={'extra': lambda: {'answer': 42}})
+    path = capture.request('RAM', '95%')
+    capture.stop()
+    snapshot = load_snapshot(path)
+    assert snapshot['alert']['type'] == 'RAM'
+    assert snapshot['extra'] == {'answer': 42}
+    assert snapshot['processes']['rows']
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_failed_capture_leaves_no_file_or_link(tmp_path):
+    failures = []
+    done = threading.Event()
+
+    def on_failure(path):
+        failures.append(path)
+        done.set()
+
+    capture = capture_for(tmp_path, on_failure=on_failure)
+
+    def broken_write(path, captured):
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(b'partial')
+        raise OSError("No space left on device")
+
+    capture.write = broken_write
+    path = capture.request('RAM', '95%')
+    assert done.wait(5)
+    capture.stop()
+
+    assert failures == [path]
+    assert not os.path.exists(path) and not os.path.exists(f"{path}.tmp")
+    # An alert stored after the failure gets no link at all
+    assert capture.link(path, lambda linked: linked) is None
+    assert capture.link('/elsewhere.json.gz', lambda linked: linked) == '/elsewhere.json.gz'
+
+
+def test_clear_alert_snapshot(tmp_path):
+    handler = DatabaseHandler({'db_enabled': True, 'db_type': 'sqlite', 'db_path': str(tmp_path / 'monitor.db')})
+    try:
+        info = {'hostname': 'web-1'}
+        handler.store_alert('RAM', '95%', 'message', True, info, snapshot='/a.json.gz')
+        handler.store_alert('CPU', '99%', 'message', True, info, snapshot='/b.json.gz')
+        assert handler.clear_alert_snapshot('/a.json.gz')
+        rows = {row['alert_type']: row['snapshot'] for row in handler.iter_alerts(datetime.datetime(2000, 1, 1))}
+        assert rows == {'RAM': None, 'CPU': '/b.json.gz'}
+    finally:
+        handler.close()
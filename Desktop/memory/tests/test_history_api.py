@@ -0,0 +1,35 @@
+"""History API range limits."""
+
+import time
+
+import pytest
+
+from history_api import HistoryQuery
+
+
+@pytest.fixture
+def query(tmp_path):
+    history = HistoryQuery({'db_enabled': True, 'db_type': 'sqlite', 'db_path': str(tmp_path / 'history.db')})
+    yield history
+    history.close()
+
+
+def test_alerts_range_is_limited(query):
+    with pytest.raises(ValueError, match='168 hours'):
+        query.alerts({'start': 'now-8d'})
+    with pytest.raises(ValueError):
+        query.alerts({'start': '0'})
+    # Nothing was queried or cached for the rejected ranges
+    assert len(query.cache) == 0
+
+
+def test_alerts_within_limit(query):
+    now = time.time()
+    etag, closed, body = query.alerts({'start': str(now - 7 * 86400), 'end': str(now)})
+    assert ''.join(body).endswith('"alerts": []}')
+    assert len(query.cache) <= 169
+
+
+def test_metrics_points_are_limited(query):
+    with pytest.raises(ValueError, match='increase step'):
+        query.metrics({'start': 'now-30d', 'step': '60', 'metric': 'ram'})
@@ -0,0 +1,139 @@
+"""numa_collector parsers on a fixture /sys/devices/system/node tree."""
+
+import pytest
+
+from numa_collector import NumaCollector, node_ids
+from procfs_reader import PROCFS_AVAILABLE
+
+pytestmark = pytest.mark.skipif(not PROCFS_AVAILABLE, reason="needs Linux /proc and os.preadv")
+
+NODE0_MEMINFO = """Node 0 MemTotal:       16000000 kB
+Node 0 MemFree:         2000000 kB
+Node 0 MemUsed:        14000000 kB
+Node 0 Active(file):    1000000 kB
+Node 0 Inactive(file):  2000000 kB
+Node 0 FilePages:       3500000 kB
+Node 0 AnonPages:       9000000 kB
+Node 0 Shmem:            100000 kB
+Node 0 Slab:             800000 kB
+Node 0 SReclaimable:     600000 kB
+Node 0 AnonHugePages:    204800 kB
+"""
+
+NUMASTAT = """numa_hit {hit}
+numa_miss {miss}
+numa_foreign {foreign}
+interleave_hit 1000
+local_node {hit}
+other_node {miss}
+"""
+
+VMSTAT = b"""nr_free_pages 500000
+nr_anon_transparent_hugepages 100
+thp_fault_alloc 4000
+thp_fault_fallback 25
+thp_collapse_alloc 300
+thp_split_page 12
+"""
+
+
+def write_numastat(root, node, hit, miss, foreign):
+    (root / f"node{node}" / 'numastat').write_text(NUMASTAT.format(hit=hit, miss=miss, foreign=foreign))
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    nodes = tmp_path / 'node'
+    for node in ('0', '1', '10'):
+        path = nodes / f"node{node}"
+        path.mkdir(parents=True)
+        (path / 'meminfo').write_text(NODE0_MEMINFO.replace('Node 0', f'Node {node}'))
+        write_numastat(nodes, node, 1000000, 0, 0)
+    pool = nodes / 'node0' / 'hugepages' / 'hugepages-2048kB'
+    pool.mkdir(parents=True)
+    for name, value in (('nr_hugepages', 512), ('free_hugepages', 128), ('surplus_hugepages', 0)):
+        (pool / name).write_text(f"{value}\n")
+    (nodes / 'possible').write_text("0-1,10\n")
+    (tmp_path / 'vmstat').write_bytes(VMSTAT)
+    thp = tmp_path / 'thp'
+    thp.mkdir()
+    (thp / 'enabled').write_text("always [madvise] never\n")
+    (thp / 'defrag').write_text("[always] defer defer+madvise madvise never\n")
+    return tmp_path
+
+
+def collector_for(sysfs):
+    return NumaCollector(str(sysfs / 'node'), str(sysfs), str(sysfs / 'thp'))
+
+
+def test_node_ids_are_numeric(sysfs):
+    assert node_ids(str(sysfs / 'node')) == ['0', '1', '10']
+
+
+def test_node_meminfo_and_hugepages(sysfs):
+    collector = collector_for(sysfs)
+    try:
+        node = collector.collect()['nodes'][0]
+    finally:
+        collector.close()
+    assert node['node'] == '0'
+    assert node['total_bytes'] == 16000000 * 1024
+    assert node['anon_huge_bytes'] == 204800 * 1024
+    # Free plus the file LRU plus reclaimable slab
+    assert node['available_bytes'] == 5600000 * 1024
+    assert node['memory_percent'] == 65.0
+    assert node['events']['interleave_hit'] == 1000
+    assert node['hugepages'] == {'2048kB': {'total': 512, 'free': 128, 'surplus': 0}}
+
+
+def test_miss_percent_follows_numa_foreign(sysfs):
+    nodes = sysfs / 'node'
+    collector = collector_for(sysfs)
+    try:
+        first = collector.collect()['nodes']
+        assert [node['miss_percent'] for node in first] == [0.0, 0.0, 0.0]
+
+        # Node 0 could not satisfy 10% of its allocations; node 1 absorbed them as numa_miss
+        write_numastat(nodes, '0', 1000000 + 90000, 0, 10000)
+        write_numastat(nodes, '1', 1000000 + 50000, 10000, 0)
+        second = {node['node']: node['miss_percent'] for node in collector.collect()['nodes']}
+        assert second == {'0': 10.0, '1': 0.0, '10': 0.0}
+
+        # Percentages cover the interval since the previous sample, not the counters since boot
+        write_numastat(nodes, '0', 1090000 + 100000, 0, 10000)
+        assert collector.collect()['nodes'][0]['miss_percent'] == 0.0
+
+        # A counter reset (hits going down) reports nothing rather than a bogus ratio
+        write_numastat(nodes, '0', 5, 0, 50)
+        assert collector.collect()['nodes'][0]['miss_percent'] == 0.0
+    finally:
+        collector.close()
+
+
+def test_thp(sysfs):
+    collector = collector_for(sysfs)
+    try:
+        thp = collector.collect()['thp']
+    finally:
+        collector.close()
+    assert thp['mode'] == 'madvise'
+    assert thp['defrag'] == 'always'
+    assert thp['anon_bytes'] == 100 * 2 * 1024 * 1024
+    assert thp['events'] == {'thp_fault_alloc': 4000, 'thp_fault_fallback': 25, 'thp_collapse_alloc': 300,
+                             'thp_split_page': 12}
+
+
+def test_format_table(sysfs):
+    collector = collector_for(sysfs)
+    try:
+        table = NumaCollector.format_table(collector.collect())
+    finally:
+        collector.close()
+    assert "0 65.0% 5469" in table and "2048kB:128/512" in table
+    assert "THP: madvise (defrag always)" in table
+
+
+def test_no_nodes(tmp_path):
+    (tmp_path / 'node').mkdir()
+    with pytest.raises(OSError):
+        NumaCollector(str(tmp_path / 'node'), str(tmp_path), str(tmp_path / 'thp'))
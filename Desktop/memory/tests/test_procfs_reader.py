@@ -0,0 +1,163 @@
+"""Parity of the procfs_reader fast path with psutil, and its parsers on fixture files."""
+
+import os
+import time
+
+import psutil
+import pytest
+
+from procfs_reader import PROCFS_AVAILABLE, ProcFile, ProcReader, cpu_percent, parse_field, read_smaps_rollup
+
+MEMINFO = b"""MemTotal:       16318480 kB
+MemFree:         1234567 kB
+MemAvailable:    8159240 kB
+Buffers:          345678 kB
+SwapCached:            0 kB
+SwapTotal:       2097148 kB
+SwapFree:        1572861 kB
+"""
+
+STAT = b"""cpu  4705 150 1120 16250 520 0 70 0 30 0
+cpu0 2350 75 560 8125 260 0 35 0 15 0
+intr 114930548 113199788 3 0 5 263 0 4 [...]
+"""
+
+NET_DEV = b"""Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo:  123456     100    0    0    0     0          0         0   123456     100    0    0    0     0       0          0
+  eth0: 98765432   54321    0    0    0     0          0         0 12345678   23456    0    0    0     0       0          0
+ veth0:      10       1    0    0    0     0          0         0       20       2    0    0    0     0       0          0
+"""
+
+SMAPS_ROLLUP = b"""55d4c2a00000-7ffd1a5ff000 ---p 00000000 00:00 0                          [rollup]
+Rss:               20480 kB
+Pss:               12288 kB
+Pss_Anon:           8192 kB
+Shared_Clean:       4096 kB
+Private_Clean:      2048 kB
+Private_Dirty:      6144 kB
+Swap:               1024 kB
+SwapPss:            1024 kB
+"""
+
+linux_only = pytest.mark.skipif(not PROCFS_AVAILABLE, reason="needs Linux /proc and os.preadv")
+
+
+@pytest.fixture
+def proc_root(tmp_path):
+    (tmp_path / 'net').mkdir()
+    (tmp_path / 'meminfo').write_bytes(MEMINFO)
+    (tmp_path / 'stat').write_bytes(STAT)
+    (tmp_path / 'loadavg').write_bytes(b"1.25 0.80 0.50 2/345 6789\n")
+    (tmp_path / 'net' / 'dev').write_bytes(NET_DEV)
+    (tmp_path / '4242').mkdir()
+    (tmp_path / '4242' / 'smaps_rollup').write_bytes(SMAPS_ROLLUP)
+    return str(tmp_path)
+
+
+def test_parse_field():
+    buffer = bytearray(MEMINFO)
+    assert parse_field(buffer, len(buffer), b'MemTotal:') == 16318480
+    assert parse_field(buffer, len(buffer), b'SwapFree:') == 1572861
+    assert parse_field(buffer, len(buffer), b'Hugetlb:') is None
+    # A length shorter than the buffer hides the rest, as with a reused ProcFile buffer
+    assert parse_field(buffer, MEMINFO.index(b'SwapTotal'), b'SwapTotal:') is None
+
+
+def test_parse_field_last_line_without_newline():
+    buffer = bytearray(b"Active: 1\nInactive: 2")
+    assert parse_field(buffer, len(buffer), b'Inactive:') == 2
+
+
+@linux_only
+def test_proc_file_grows_buffer(tmp_path):
+    path = tmp_path / 'big'
+    path.write_bytes(b'x' * 10000)
+    proc_file = ProcFile(str(path), size=64)
+    try:
+        buffer, length = proc_file.read()
+        assert length == 10000
+        assert bytes(buffer[:length]) == b'x' * 10000
+    finally:
+        proc_file.close()
+
+
+@linux_only
+def test_reader_on_fixture(proc_root):
+    reader = ProcReader(proc_root)
+    try:
+        assert reader.memory() == {'mem_total': 16318480, 'mem_free': 1234567, 'mem_available': 8159240,
+                                   'swap_total': 2097148, 'swap_free': 1572861}
+        assert reader.ram_percent() == 50.0
+        assert reader.swap_percent() == 25.0
+        assert reader.loadavg() == 1.25
+        # busy = total - idle - iowait over the first eight fields
+        assert reader.cpu_times() == (4705 + 150 + 1120 + 70, 4705 + 150 + 1120 + 16250 + 520 + 70)
+        assert reader.net_bytes('eth0') == (98765432, 12345678)
+        assert reader.net_bytes('veth0') == (10, 20)
+        assert reader.net_bytes('eth1') is None
+    finally:
+        reader.close()
+
+
+def test_read_smaps_rollup_fixture(proc_root):
+    assert read_smaps_rollup(4242, proc_root) == {'pss': 12288 * 1024, 'uss': (2048 + 6144) * 1024,
+                                                   'swap': 1024 * 1024}
+    assert read_smaps_rollup(4243, proc_root) is None
+
+
+def test_cpu_percent():
+    assert cpu_percent((100, 1000), (150, 1100)) == 50.0
+    assert cpu_percent((100, 1000), (100, 1000)) == 0.0
+    assert cpu_percent((200, 1000), (100, 1100)) == 0.0
+
+
+@linux_only
+class TestPsutilParity:
+    """The live system read both ways; values move between the two reads, hence the tolerances."""
+
+    @pytest.fixture
+    def reader(self):
+        reader = ProcReader()
+        yield reader
+        reader.close()
+
+    def test_memory(self, reader):
+        if reader.ram_percent() is None:
+            pytest.skip("kernel has no MemAvailable")
+        assert reader.ram_percent() == pytest.approx(psutil.virtual_memory().percent, abs=1.0)
+        memory = reader.memory()
+        assert memory['mem_total'] * 1024 == psutil.virtual_memory().total
+
+    def test_swap(self, reader):
+        swap = psutil.swap_memory()
+        assert reader.swap_percent() == pytest.approx(swap.percent if swap.total else 0, abs=1.0)
+        assert reader.memory()['swap_total'] * 1024 == swap.total
+
+    def test_loadavg(self, reader):
+        assert reader.loadavg() == pytest.approx(psutil.getloadavg()[0], abs=0.5)
+
+    def test_cpu_times(self, reader):
+        busy, total = reader.cpu_times()
+        times = psutil.cpu_times()
+        ticks = os.sysconf('SC_CLK_TCK')
+        psutil_total = (times.user + times.nice + times.system + times.idle + times.iowait + times.irq
+                        + times.softirq + times.steal) * ticks
+        assert total == pytest.approx(psutil_total, rel=0.01)
+        assert busy == pytest.approx(psutil_total - (times.idle + times.iowait) * ticks, rel=0.05, abs=ticks)
+
+    def test_cpu_percent(self, reader):
+        before = reader.cpu_times()
+        psutil.cpu_percent(interval=None)
+        time.sleep(0.5)
+        assert cpu_percent(before, reader.cpu_times()) == pytest.approx(psutil.cpu_percent(interval=None), abs=10)
+
+    def test_net_bytes(self, reader):
+        counters = psutil.net_io_counters(pernic=True)
+        if not counters:
+            pytest.skip("no network interfaces")
+        for name, counter in counters.items():
+            rx, tx = reader.net_bytes(name)
+            # Counters only grow; allow for traffic between the two reads
+            assert counter.bytes_recv <= rx + 1024 * 1024 and rx <= counter.bytes_recv + 1024 * 1024
+            assert counter.bytes_sent <= tx + 1024 * 1024 and tx <= counter.bytes_sent + 1024 * 1024
@@ -0,0 +1,139 @@
+"""remote_write encoding, snappy fallback and WAL delivery against the stand-in receiver."""
+
+import os
+import time
+
+import pytest
+
+import remote_write
+from remote_write import (RemoteWriteClient, RemoteWriteReceiver, WriteAheadLog, decode_write_request,
+                          encode_write_request, snappy_compress, snappy_decompress)
+
+RAM = (('__name__', 'system_monitor_ram_usage_percent'), ('instance', 'web-1'))
+CPU = (('__name__', 'system_monitor_cpu_usage_percent'), ('instance', 'web-1'))
+
+
+@pytest.fixture
+def pure_python_snappy(monkeypatch):
+    monkeypatch.setattr(remote_write, 'SNAPPY_AVAILABLE', False)
+
+
+@pytest.fixture
+def receiver():
+    stub = RemoteWriteReceiver().start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def client(receiver, tmp_path, pure_python_snappy):
+    clients = []
+
+    def make(**config):
+        made = RemoteWriteClient({'remote_write_url': receiver.url, 'remote_write_shards': 1,
+                                  'remote_write_batch_deadline': 0.05, 'remote_write_timeout': 2,
+                                  'remote_write_wal_dir': str(tmp_path / 'wal'), **config})
+        clients.append(made)
+        return made
+
+    yield make
+    for made in clients:
+        made.stop()
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.02)
+
+
+def test_write_request_round_trip():
+    samples = [(RAM, 50.5, 1700000000000), (CPU, 3.25, 1700000000000), (RAM, 51.0, 1700000060000)]
+    decoded = decode_write_request(encode_write_request(samples))
+    # Samples are grouped into one TimeSeries per label set, in first-seen order
+    assert decoded == [(RAM, 50.5, 1700000000000), (RAM, 51.0, 1700000060000), (CPU, 3.25, 1700000000000)]
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'a',
+    b'abcd' * 1000,  # Long matches are split into 64-byte copies
+    bytes(range(256)) * 3,  # Literals longer than 60 and 256 bytes
+    os.urandom(70000),  # Literal chunks beyond 64 KiB
+    b'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa',  # Copies overlapping their own output
+])
+def test_snappy_fallback_round_trip(pure_python_snappy, data):
+    compressed = snappy_compress(data)
+    assert snappy_decompress(compressed) == data
+
+
+def test_snappy_fallback_compresses_repeated_series(pure_python_snappy):
+    payload = encode_write_request([(RAM, float(i), 1700000000000 + i * 1000) for i in range(500)])
+    compressed = snappy_compress(payload)
+    assert len(compressed) < len(payload)
+    assert snappy_decompress(compressed) == payload
+
+
+def test_snappy_fallback_rejects_corrupt_input(pure_python_snappy):
+    with pytest.raises(ValueError):
+        snappy_decompress(b'\x05\x09\x10\x00')  # Copy before any output
+    with pytest.raises(ValueError):
+        snappy_decompress(b'\x05\x00a')  # Declares 5 bytes, holds 1
+
+
+def test_wal_skips_torn_record(tmp_path):
+    wal = WriteAheadLog(str(tmp_path), max_bytes=1 << 20)
+    wal.append(b'first', 1)
+    wal.append(b'second', 2)
+    segment = wal.oldest()
+    with open(os.path.join(str(tmp_path), f"{segment:08d}.wal"), 'r+b') as f:
+        f.truncate(os.path.getsize(f.name) - 2)
+    assert list(wal.records(segment)) == [(b'first', 1)]
+
+
+def test_delivers_batch(client, receiver):
+    sender = client()
+    sender.deliver([(RAM, 50.0, 1000), (CPU, 5.0, 1000)])
+    assert receiver.requests == 1
+    assert sorted(receiver.samples) == sorted([(RAM, 50.0, 1000), (CPU, 5.0, 1000)])
+    assert not sender.wal.pending()
+
+
+def test_outage_spills_to_wal_and_replays_in_order(client, receiver):
+    receiver.fail_status = 503
+    sender = client()
+    sender.deliver([(RAM, 1.0, 1000)])
+    assert sender.wal.pending() and receiver.samples == []
+    # While the WAL holds older samples, newer ones queue behind them instead of overtaking
+    receiver.fail_status = 0
+    sender.deliver([(RAM, 2.0, 2000)])
+    assert receiver.samples == []
+    sender.deliver([(RAM, 3.0, 3000)])
+
+    wait_for(lambda: len(receiver.samples) == 3 and not sender.wal.pending())
+    assert [timestamp for _, _, timestamp in receiver.samples] == [1000, 2000, 3000]
+
+
+def test_client_error_drops_batch(client, receiver):
+    receiver.fail_status = 400
+    sender = client()
+    sender.deliver([(RAM, 1.0, 1000)])
+    assert not sender.wal.pending()
+    receiver.fail_status = 0
+    sender.deliver([(RAM, 2.0, 2000)])
+    assert receiver.samples == [(RAM, 2.0, 2000)]
+
+
+def test_queue_overflow_spills_oldest(client, receiver):
+    receiver.fail_status = 503
+    sender = client(remote_write_queue_capacity=2, remote_write_max_samples_per_send=1000,
+                    remote_write_batch_deadline=60)
+    sender.enqueue([(RAM, 1.0)], timestamp=1)
+    sender.enqueue([(RAM, 2.0)], timestamp=2)
+    sender.enqueue([(RAM, 3.0)], timestamp=3)
+    assert sender.wal.pending()
+    segment = sender.wal.oldest()
+    spilled = [decode_write_request(payload) for payload, _ in sender.wal.records(segment)]
+    assert spilled == [[(RAM, 1.0, 1000)]]
@@ -0,0 +1,41 @@
+"""Alert replay over interleaved samples of several hosts."""
+
+from replay import ReplayMonitor, replay, _normalize
+
+RULES = """[ram_high]
+expr = ram_percent > 90
+for = 2m
+type = RAM
+"""
+
+
+def monitor(tmp_path, rules=False):
+    config = "THRESHOLD=90\nCHECK_INTERVAL=60\n"
+    if rules:
+        (tmp_path / 'rules.conf').write_text(RULES)
+        config += f"ALERT_RULES_FILE={tmp_path / 'rules.conf'}\n"
+    (tmp_path / 'config.conf').write_text(config)
+    return ReplayMonitor(str(tmp_path / 'config.conf'))
+
+
+def samples(hosts, ram, minutes):
+    for minute in range(minutes):
+        for host in hosts:
+            yield 1700000000 + minute * 60, host, _normalize({'ram': ram})
+
+
+def test_cooldown_is_per_host(tmp_path):
+    result = replay(monitor(tmp_path), samples(['a', 'b'], 95.0, 11))
+    assert result['hosts'] == 2
+    # The cooldown is 10 intervals: each host fires at minute 0 and again at minute 10
+    assert sorted(alert['host'] for alert in result['alerts']) == ['a', 'a', 'b', 'b']
+    assert result['summary']['RAM'] == {'breaches': 22, 'fired': 4, 'suppressed': 18}
+
+
+def test_rule_state_is_per_host(tmp_path):
+    replay_monitor = monitor(tmp_path, rules=True)
+    replay_monitor.config['threshold'] = 100
+    result = replay(replay_monitor, samples(['a', 'b'], 95.0, 3))
+    # Pending for 2 minutes on each host separately, then firing once per host
+    assert [(alert['host'], alert['timestamp']) for alert in result['alerts']] == [
+        ('a', 1700000120), ('b', 1700000120)]
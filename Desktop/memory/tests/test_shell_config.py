@@ -0,0 +1,100 @@
+"""memory-monitor.sh style config.conf files loaded by the Python daemon."""
+
+import os
+
+from memory_monitor import SystemMonitor
+from shell_config import apply_shell_config, read_shell_config
+
+# config.conf as shipped and installed before the daemon replaced memory-monitor.sh
+LEGACY_CONFIG = """# Memory Monitor konfiguratsiya fayli
+# Telegram bot sozlamalari
+BOT_TOKEN="123456:TEST"
+CHAT_ID="-100"
+
+# Monitoring sozlamalari
+THRESHOLD=80               # RAM foizi (qachon xabar yuborish kerak)
+CHECK_INTERVAL=60          # Tekshirish oralig'i (soniyalarda)
+LOG_FILE="/var/log/memory_monitor.log"
+LOG_LEVEL="INFO"           # DEBUG, INFO, WARNING, ERROR
+
+# Xabar sozlamalari
+ALERT_MESSAGE_TITLE="🛑 SYSTEM MONITOR ALERT"
+INCLUDE_TOP_PROCESSES=true
+TOP_PROCESSES_COUNT=10
+
+# CPU monitoring (true/false)
+MONITOR_CPU=true
+CPU_THRESHOLD=90
+
+# Disk monitoring (true/false)
+MONITOR_DISK=true
+DISK_THRESHOLD=90
+DISK_PATH="/"
+
+# Swap monitoring (true/false)
+MONITOR_SWAP=true
+SWAP_THRESHOLD=80
+
+# Load average monitoring (true/false)
+MONITOR_LOAD=true
+LOAD_THRESHOLD=5
+
+# Network monitoring (true/false)
+MONITOR_NETWORK=true
+NETWORK_INTERFACE="eth0"
+NETWORK_THRESHOLD=90
+"""
+
+SAMPLE_CONFIG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config.conf')
+
+
+def load(path):
+    monitor = SystemMonitor.__new__(SystemMonitor)
+    monitor.config_file = str(path)
+    return monitor._load_config()
+
+
+def test_legacy_config_keeps_script_checks(tmp_path):
+    path = tmp_path / 'config.conf'
+    path.write_text(LEGACY_CONFIG)
+    config = load(path)
+    assert config['bot_token'] == "123456:TEST"
+    assert config['threshold'] == 80
+    assert config['monitor_cpu'] and config['cpu_threshold'] == 90
+    assert config['monitor_disk'] and config['disk_path'] == "/"
+    # The script never checked these, whatever the file says
+    assert not config['monitor_swap']
+    assert not config['monitor_load']
+    assert not config['monitor_network']
+    # Load per core, compared by the daemon in percent
+    assert config['load_threshold'] == 500
+
+
+def test_sample_config_loads_like_legacy():
+    config = load(SAMPLE_CONFIG)
+    assert not config['monitor_swap'] and not config['monitor_load'] and not config['monitor_network']
+    assert config['load_threshold'] == 500
+
+
+def test_python_switches_enable_checks(tmp_path):
+    path = tmp_path / 'config.conf'
+    path.write_text(LEGACY_CONFIG + "PY_MONITOR_LOAD=true\nPY_MONITOR_SWAP=yes\nLOAD_THRESHOLD=1.5\n")
+    config = load(path)
+    assert config['monitor_load'] and config['monitor_swap']
+    assert not config['monitor_network']
+    assert config['load_threshold'] == 150
+
+
+def test_missing_switch_is_off_and_unknown_names_reported(tmp_path):
+    path = tmp_path / 'config.conf'
+    path.write_text("BOT_TOKEN=x\nCHAT_ID=y\nNO_SUCH_OPTION=1\n")
+    values = read_shell_config(str(path))
+    config = {'bot_token': '', 'chat_id': '', 'monitor_cpu': True, 'monitor_disk': True}
+    assert apply_shell_config(config, values) == ['NO_SUCH_OPTION']
+    assert not config['monitor_cpu'] and not config['monitor_disk']
+
+
+def test_ini_file_is_not_shell_config(tmp_path):
+    path = tmp_path / 'config.ini'
+    path.write_text("[General]\nbot_token = x\n")
+    assert read_shell_config(str(path)) is None
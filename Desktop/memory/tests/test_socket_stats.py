@@ -0,0 +1,146 @@
+"""socket_stats parsers on fixture /proc/net files."""
+
+import sys
+
+import pytest
+
+import socket_stats
+from procfs_reader import PROCFS_AVAILABLE
+from socket_stats import SocketStatsCollector, _SocketTable, decode_address, parse_counters
+
+# The kernel prints each 32-bit address word in host byte order; these fixtures are little-endian
+little_endian = pytest.mark.skipif(sys.byteorder != 'little', reason="fixture addresses are little-endian")
+linux_only = pytest.mark.skipif(not PROCFS_AVAILABLE, reason="needs os.preadv")
+
+HEADER = "  sl  local_address rem_address   st tx_queue rx_queue tr tm->when retrnsmt   uid  timeout inode\n"
+HEADER6 = ("  sl  local_address                         remote_address                        st tx_queue "
+           "rx_queue tr tm->when retrnsmt   uid  timeout inode\n")
+
+LOCALHOST = '0100007F'                      # 127.0.0.1
+ANY = '00000000'
+SERVER = '0200000A'                         # 10.0.0.2
+DATABASE = '0300000A'                       # 10.0.0.3
+LOCALHOST6 = '00000000000000000000000001000000'  # ::1
+ANY6 = '0' * 32
+MAPPED_CACHE = '0000000000000000FFFF00000400000A'  # ::ffff:10.0.0.4
+
+NETSTAT = b"""TcpExt: SyncookiesSent SyncookiesRecv ListenOverflows ListenDrops TCPReqQFullDrop
+TcpExt: 3 0 12 14 5
+IpExt: InNoRoutes InOctets
+IpExt: 0 123456
+"""
+
+SNMP = b"""Ip: Forwarding DefaultTTL
+Ip: 1 64
+Tcp: RtoAlgorithm ActiveOpens PassiveOpens AttemptFails EstabResets CurrEstab RetransSegs
+Tcp: 1 100 50 2 3 7 40
+Udp: InDatagrams NoPorts InErrors OutDatagrams RcvbufErrors SndbufErrors
+Udp: 1000 4 1 900 1 0
+"""
+
+
+def tcp_line(slot, local, local_port, remote, remote_port, state):
+    return (f"{slot:4d}: {local}:{local_port:04X} {remote}:{remote_port:04X} {state} 00000000:00000000 "
+            f"00:00000000 00000000  1000        0 {100000 + slot} 1 0000000000000000 20 4 30 10 -1\n")
+
+
+@pytest.fixture
+def proc_net(tmp_path, monkeypatch):
+    rows = [tcp_line(0, LOCALHOST, 3306, ANY, 0, '0A')]
+    # Three outgoing connections from ephemeral ports to the same web server, one in TIME_WAIT
+    rows += [tcp_line(1 + index, LOCALHOST, 40000 + index, SERVER, 80, '01') for index in range(2)]
+    rows.append(tcp_line(3, LOCALHOST, 40002, SERVER, 80, '06'))
+    # An incoming connection on a fixed port is not ephemeral use
+    rows.append(tcp_line(4, LOCALHOST, 3306, DATABASE, 50000, '01'))
+    (tmp_path / 'tcp').write_text(HEADER + ''.join(rows))
+    (tmp_path / 'tcp6').write_text(HEADER6 + tcp_line(0, LOCALHOST6, 22, ANY6, 0, '0A')
+                                   + tcp_line(1, LOCALHOST6, 40003, MAPPED_CACHE, 6379, '08'))
+    (tmp_path / 'udp').write_text(HEADER + tcp_line(0, LOCALHOST, 53, ANY, 0, '07')
+                                  + tcp_line(1, LOCALHOST, 123, ANY, 0, '07'))
+    (tmp_path / 'netstat').write_bytes(NETSTAT)
+    (tmp_path / 'snmp').write_bytes(SNMP)
+    port_range = tmp_path / 'ip_local_port_range'
+    port_range.write_text("32768\t60999\n")
+    monkeypatch.setattr(socket_stats, 'PORT_RANGE_FILE', str(port_range))
+    return tmp_path
+
+
+@little_endian
+def test_decode_address():
+    assert decode_address(LOCALHOST.encode()) == '127.0.0.1'
+    assert decode_address(SERVER.encode()) == '10.0.0.2'
+    assert decode_address(LOCALHOST6.encode()) == '::1'
+    # IPv4-mapped IPv6 is shown as plain IPv4
+    assert decode_address(MAPPED_CACHE.encode()) == '10.0.0.4'
+    assert decode_address(b'B80D0120000000000000000001000000') == '2001:db8::1'
+
+
+def test_parse_counters():
+    sections = parse_counters(NETSTAT + SNMP)
+    assert sections['TcpExt']['ListenOverflows'] == 12
+    assert sections['IpExt'] == {'InNoRoutes': 0, 'InOctets': 123456}
+    assert sections['Tcp']['RetransSegs'] == 40
+    assert sections['Udp']['NoPorts'] == 4
+
+
+@linux_only
+@pytest.mark.parametrize('size', [200, 333, 4096])
+def test_scan_carries_partial_lines(tmp_path, size):
+    lines = [tcp_line(index, LOCALHOST, 40000 + index, SERVER, 80, '01') for index in range(50)]
+    path = tmp_path / 'tcp'
+    path.write_text(HEADER + ''.join(lines))
+    table = _SocketTable(str(path))
+    buffer = bytearray(size)
+    seen = []
+    try:
+        for end in table.scan(buffer):
+            chunk = bytes(buffer[:end])
+            # Every yielded run ends on a line boundary
+            assert chunk.endswith(b'\n')
+            seen.extend(chunk.decode().splitlines(keepends=True))
+    finally:
+        table.close()
+    assert seen == [HEADER] + lines
+
+
+@linux_only
+@little_endian
+def test_collect(proc_net):
+    collector = SocketStatsCollector({'socket_top_remotes': 5}, str(proc_net))
+    # A buffer smaller than the tables forces several chunks
+    collector.buffer = bytearray(300)
+    try:
+        summary = collector.collect()
+    finally:
+        collector.close()
+
+    tcp = summary['tcp']
+    assert (tcp['listen'], tcp['established'], tcp['time_wait'], tcp['close_wait']) == (2, 3, 1, 1)
+    assert tcp['total'] == 7
+    assert summary['udp'] == 2
+    assert summary['remote_top'] == [{'address': '10.0.0.2', 'connections': 3},
+                                     {'address': '10.0.0.3', 'connections': 1},
+                                     {'address': '10.0.0.4', 'connections': 1}]
+    ephemeral = summary['ephemeral']
+    assert ephemeral['range'] == 28232
+    assert ephemeral['used'] == 4
+    assert ephemeral['max_destination'] == '10.0.0.2:80'
+    assert ephemeral['max_percent'] == round(3 / 28232 * 100, 1)
+    assert summary['counters']['TcpExt.ListenOverflows'] == 12
+    assert summary['counters']['Udp.NoPorts'] == 4
+    assert 'Tcp.CurrEstab' not in summary['counters']
+
+
+@linux_only
+def test_counter_increase_between_samples(proc_net):
+    collector = SocketStatsCollector({}, str(proc_net))
+    try:
+        assert collector.collect()['listen_overflows'] == 0
+        (proc_net / 'netstat').write_bytes(NETSTAT.replace(b'3 0 12 14 5', b'3 0 20 22 6'))
+        summary = collector.collect()
+        assert (summary['listen_overflows'], summary['syn_queue_drops']) == (8, 1)
+        # A counter that went down was reset and reports no increase
+        (proc_net / 'netstat').write_bytes(NETSTAT.replace(b'3 0 12 14 5', b'0 0 1 1 0'))
+        assert collector.collect()['listen_overflows'] == 0
+    finally:
+        collector.close()
@@ -0,0 +1,123 @@
+"""ZBXD sender protocol against the StubTrapper stand-in."""
+
+import json
+import socket
+import struct
+import time
+import zlib
+
+import pytest
+
+from zabbix_sender import (FLAG_COMPRESSED, FLAG_ZABBIX, HEADER, StubTrapper, ZabbixSender, flatten_metrics,
+                           pack_data, pack_frame, quote_param, read_frame)
+
+
+@pytest.fixture
+def trapper():
+    stub = StubTrapper().start()
+    yield stub
+    stub.stop()
+
+
+def sender_for(trapper, **config):
+    return ZabbixSender({'zabbix_enabled': True, 'zabbix_server': '127.0.0.1', 'zabbix_port': trapper.port,
+                         'zabbix_host': 'web-1', **config})
+
+
+def test_frame_without_compression():
+    frame = pack_data(b'{"a":1}')
+    assert frame[:4] == b'ZBXD'
+    assert HEADER.unpack(frame[:HEADER.size]) == (b'ZBXD', FLAG_ZABBIX, 7, 0)
+    assert frame[HEADER.size:] == b'{"a":1}'
+
+
+def test_frame_with_compression():
+    data = json.dumps({'data': ['x' * 100] * 10}).encode()
+    frame = pack_data(data, compress=True)
+    magic, flags, length, reserved = HEADER.unpack(frame[:HEADER.size])
+    assert flags == FLAG_ZABBIX | FLAG_COMPRESSED
+    # Length is of the compressed body, the reserved field holds the original size
+    assert length == len(frame) - HEADER.size < len(data)
+    assert reserved == len(data)
+    assert zlib.decompress(frame[HEADER.size:]) == data
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_read_frame_round_trip(compress):
+    left, right = socket.socketpair()
+    with left, right:
+        payload = {'request': 'sender data', 'data': [{'key': 'k', 'value': '1'}]}
+        left.sendall(pack_frame(payload, compress))
+        assert read_frame(right) == payload
+
+
+def test_read_frame_rejects_bad_magic():
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(struct.pack('<4sBII', b'HTTP', 1, 2, 0) + b'{}')
+        with pytest.raises(ValueError):
+            read_frame(right)
+
+
+def test_flatten_metrics():
+    items = dict(flatten_metrics({'ram': 50.5, 'network': (1.0, 2.0), 'flag': True,
+                                  'filesystems': {'/data,1': 10.0}}, 'mm'))
+    assert items == {'mm.ram': 50.5, 'mm.network.rx': 1.0, 'mm.network.tx': 2.0, 'mm.fs.pused["/data,1"]': 10.0}
+    assert quote_param('/') == '/'
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_batches_cycles_into_one_frame(trapper, compress):
+    sender = sender_for(trapper, zabbix_batch_cycles=3, zabbix_compress=compress)
+    for cycle in range(3):
+        sender.add_metrics({'ram': 10.0 + cycle, 'cpu': 5.0}, clock=1700000000.25 + cycle * 60)
+        if cycle < 2:
+            assert not sender.batch_due()
+            assert not sender.flush()
+    assert sender.flush()
+    sender.close()
+
+    assert len(trapper.requests) == 1
+    request = trapper.requests[0]
+    assert request['request'] == 'sender data'
+    assert [(item['key'], item['value'], item['clock']) for item in request['data']] == [
+        ('memory_monitor.ram', '10.0', 1700000000), ('memory_monitor.cpu', '5.0', 1700000000),
+        ('memory_monitor.ram', '11.0', 1700000060), ('memory_monitor.cpu', '5.0', 1700000060),
+        ('memory_monitor.ram', '12.0', 1700000120), ('memory_monitor.cpu', '5.0', 1700000120)]
+    assert {item['host'] for item in request['data']} == {'web-1'}
+    assert request['data'][0]['ns'] == 250000000
+    assert not sender.buffer and sender.pending_cycles == 0
+
+
+def test_keep_alive_connection_is_reused(trapper):
+    trapper.keep_alive = True
+    sender = sender_for(trapper)
+    for value in (1, 2):
+        sender.add_value('k', value)
+        sender.pending_cycles = 1
+        assert sender.flush()
+    assert sender.sock is not None
+    sender.close()
+    assert [request['data'][0]['value'] for request in trapper.requests] == ['1', '2']
+
+
+def test_unreachable_trapper_keeps_values_and_backs_off():
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    port = listener.getsockname()[1]
+    listener.close()
+
+    sender = ZabbixSender({'zabbix_enabled': True, 'zabbix_server': '127.0.0.1', 'zabbix_port': port,
+                           'zabbix_timeout': 1})
+    sender.add_metrics({'ram': 1.0})
+    assert not sender.flush()
+    assert len(sender.buffer) == 1
+    assert sender.next_attempt > time.monotonic() and sender.retry_delay == 2.0
+    assert not sender.batch_due()
+
+
+def test_buffer_overflow_drops_oldest():
+    sender = ZabbixSender({'zabbix_enabled': True, 'zabbix_buffer_size': 2})
+    sender.add_metrics({'a': 1, 'b': 2, 'c': 3})
+    assert [item[0] for item in sender.buffer] == ['memory_monitor.b', 'memory_monitor.c']
+    assert sender.dropped == 1
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Zabbix passive check responder for System Monitor
+Answers Zabbix agent item keys over the passive-check protocol from the
+monitor's latest sample, without collecting anything on request
+"""
+
+import json
+import time
+import socket
+import logging
+import threading
+import socketserver
+from typing import Dict, Any, Optional, List, Tuple
+
+from zabbix_sender import ZBXD_MAGIC, pack_data, read_data, flatten_metrics
+
+AGENT_VERSION = "1.0.0"
+NOT_SUPPORTED = "ZBX_NOTSUPPORTED"
+MAX_LEGACY_KEY = 2048
+# Keys memoised per snapshot; a poller asking for arbitrary keys cannot grow it further
+MAX_RESOLVED_KEYS = 4096
+
+
+class NotSupported(Exception):
+    """The key is unknown, has invalid parameters or has no value in the latest sample."""
+
+
+def parse_key(key: str) -> Tuple[str, List[str]]:
+    """Split 'vfs.fs.size["/",pused]' into ('vfs.fs.size', ['/', 'pused'])."""
+    key = key.strip()
+    bracket = key.find('[')
+    if bracket < 0:
+        return key, []
+    if not key.endswith(']'):
+        raise NotSupported("Invalid item key format.")
+
+    params = []
+    current = ''
+    quoted = False
+    body = key[bracket + 1:-1]
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if quoted:
+            if char == '\\' and i + 1 < len(body) and body[i + 1] == '"':
+                current += '"'
+                i += 1
+            elif char == '"':
+                quoted = False
+            else:
+                current += char
+        elif char == '"' and not current.strip():
+            current = ''
+            quoted = True
+        elif char == ',':
+            params.append(current.strip())
+            current = ''
+        else:
+            current += char
+        i += 1
+    if quoted:
+        raise NotSupported("Invalid item key format.")
+    params.append(current.strip())
+    return key[:bracket], params
+
+
+def _param(params: List[str], index: int, default: str = '') -> str:
+    return params[index] if index < len(params) and params[index] else default
+
+
+class AgentSnapshot:
+    """Values captured by one monitoring cycle, with a memo of resolved keys."""
+
+    __slots__ = ('clock', 'metrics', 'memory', 'filesystems', 'loadavg', 'cpu_count', 'discovery',
+                 'prefixed', 'resolved')
+
+    def __init__(self, metrics: Dict[str, Any], memory: Dict[str, Optional[int]],
+                 filesystems: Dict[str, Tuple[int, int, int]], loadavg: Tuple[float, float, float],
+                 cpu_count: int, key_prefix: str, discovery: Optional[Dict[str, str]] = None):
+        self.clock = time.time()
+        self.metrics = metrics
+        self.memory = memory
+        self.filesystems = filesystems
+        self.loadavg = loadavg
+        self.cpu_count = cpu_count
+        self.discovery = discovery or {}
+        self.prefixed = dict(flatten_metrics(metrics, key_prefix))
+        self.resolved = {}
+
+
+class PassiveCheckResponder:
+    """Resolves agent item keys against the latest AgentSnapshot."""
+
+    def __init__(self, config: Dict[str, Any]):
+        """Initialize the responder with configuration."""
+        self.config = config
+        self.logger = logging.getLogger('memory_monitor.zabbix_agent')
+        self.hostname = config.get('zabbix_host') or socket.gethostname()
+        self.key_prefix = config.get('zabbix_key_prefix', 'memory_monitor')
+        self.snapshot = None
+        self.handlers = {
+            'agent.ping': self._agent_ping,
+            'agent.hostname': self._agent_hostname,
+            'agent.version': self._agent_version,
+            'vm.memory.size': self._vm_memory_size,
+            'system.swap.size': self._system_swap_size,
+            'system.cpu.util': self._system_cpu_util,
+            'system.cpu.load': self._system_cpu_load,
+            'system.cpu.num': self._system_cpu_num,
+            'vfs.fs.size': self._vfs_fs_size,
+            'vfs.fs.discovery': lambda snapshot, params: self._discovery(snapshot, 'filesystems'),
+            'net.if.discovery': lambda snapshot, params: self._discovery(snapshot, 'interfaces'),
+            f'{self.key_prefix}.process_group.discovery':
+                lambda snapshot, params: self._discovery(snapshot, 'process_groups'),
+        }
+
+    def update(self, snapshot: AgentSnapshot) -> None:
+        """Publish a new snapshot; request threads pick it up on their next lookup."""
+        self.snapshot = snapshot
+
+    def resolve(self, key: str) -> str:
+        """Return the value of an item key as text, raising NotSupported otherwise."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            raise NotSupported("No data collected yet.")
+
+        cached = snapshot.resolved.get(key)
+        if cached is not None:
+            return cached
+
+        if key in snapshot.prefixed:
+            value = snapshot.prefixed[key]
+        else:
+            name, params = parse_key(key)
+            handler = self.handlers.get(name)
+            if handler is None:
+                raise NotSupported("Unsupported item key.")
+            value = handler(snapshot, params)
+
+        text = _format_value(value)
+        # Shared between request threads; a lost race only repeats the lookup
+        if len(snapshot.resolved) < MAX_RESOLVED_KEYS:
+            snapshot.resolved[key] = text
+        return text
+
+    def _agent_ping(self, snapshot, params):
+        return 1
+
+    def _agent_hostname(self, snapshot, params):
+        return self.hostname
+
+    def _agent_version(self, snapshot, params):
+        return AGENT_VERSION
+
+    def _vm_memory_size(self, snapshot, params):
+        mode = _param(params, 0, 'total')
+        memory = snapshot.memory
+        total = memory.get('mem_total')
+        free = memory.get('mem_free')
+        available = memory.get('mem_available')
+        if not total:
+            raise NotSupported("Memory totals are not available.")
+        values = {
+            'total': total,
+            'free': free,
+            'available': available,
+            'used': total - free if free is not None else None,
+            'pused': (total - free) / total * 100 if free is not None else None,
+            'pavailable': available / total * 100 if available is not None else None,
+        }
+        if mode not in values:
+            raise NotSupported("Invalid first parameter.")
+        if values[mode] is None:
+            raise NotSupported(f"Cannot obtain {mode} memory.")
+        return values[mode]
+
+    def _system_swap_size(self, snapshot, params):
+        if _param(params, 0, 'all') != 'all':
+            raise NotSupported("Only the total of all swap devices is available.")
+        mode = _param(params, 1, 'free')
+        total = snapshot.memory.get('swap_total')
+        free = snapshot.memory.get('swap_free')
+        if total is None or free is None:
+            raise NotSupported("Swap totals are not available.")
+        values = {
+            'total': total,
+            'free': free,
+            'used': total - free,
+            'pfree': free / total * 100 if total else 100.0,
+            'pused': (total - free) / total * 100 if total else 0.0,
+        }
+        if mode not in values:
+            raise NotSupported("Invalid second parameter.")
+        return values[mode]
+
+    def _system_cpu_util(self, snapshot, params):
+        # The monitor measures total busy time, so only the total and its complement can be answered
+        if _param(params, 0, 'all') != 'all' or _param(params, 2, 'avg1') != 'avg1':
+            raise NotSupported("Only system.cpu.util[,<total|idle>] over the last sample is available.")
+        cpu = snapshot.metrics.get('cpu')
+        if cpu is None or not self.config.get('monitor_cpu', True):
+            raise NotSupported("CPU monitoring is disabled.")
+        kind = _param(params, 1)
+        if kind == 'idle':
+            return 100.0 - cpu
+        if kind not in ('', 'total'):
+            raise NotSupported("Invalid second parameter.")
+        return cpu
+
+    def _system_cpu_load(self, snapshot, params):
+        cpu = _param(params, 0, 'all')
+        mode = _param(params, 1, 'avg1')
+        windows = {'avg1': 0, 'avg5': 1, 'avg15': 2}
+        if cpu not in ('all', 'percpu') or mode not in windows:
+            raise NotSupported("Invalid parameters.")
+        load = snapshot.loadavg[windows[mode]]
+        return load / snapshot.cpu_count if cpu == 'percpu' else load
+
+    def _system_cpu_num(self, snapshot, params):
+        if _param(params, 0, 'online') not in ('online', 'max'):
+            raise NotSupported("Invalid first parameter.")
+        return snapshot.cpu_count
+
+    def _vfs_fs_size(self, snapshot, params):
+        path = _param(params, 0)
+        mode = _param(params, 1, 'total')
+        usage = snapshot.filesystems.get(path)
+        if usage is None:
+            raise NotSupported(f"Filesystem {path} is not sampled; add it to zabbix_agent_fs_paths.")
+        total, used, free = usage
+        values = {
+            'total': total,
+            'used': used,
+            'free': free,
+            'pused': used / (used + free) * 100 if used + free else 0.0,
+            'pfree': free / (used + free) * 100 if used + free else 0.0,
+        }
+        if mode not in values:
+            raise NotSupported("Invalid second parameter.")
+        return values[mode]
+
+    def _discovery(self, snapshot, kind):
+        if kind not in snapshot.discovery:
+            raise NotSupported("Discovery is disabled.")
+        return snapshot.discovery[kind]
+
+    def respond(self, request: bytes) -> bytes:
+        """Build the reply body for a raw passive-check request."""
+        text = request.decode('utf-8', errors='replace').strip('\0\r\n ')
+        if text.startswith('{'):
+            # Zabbix 7.0+ JSON passive check request
+            try:
+                payload = json.loads(text)
+                key = payload['data'][0]['key']
+            except (ValueError, KeyError, IndexError, TypeError):
+                return json.dumps({'version': AGENT_VERSION, 'variant': 2,
+                                   'error': 'Invalid passive check request.'}).encode('utf-8')
+            try:
+                item = {'value': self.resolve(key)}
+            except NotSupported as e:
+                item = {'error': str(e)}
+            return json.dumps({'version': AGENT_VERSION, 'variant': 2, 'data': [item]}).encode('utf-8')
+
+        try:
+            return self.resolve(text).encode('utf-8')
+        except NotSupported as e:
+            return f"{NOT_SUPPORTED}\0{e}".encode('utf-8')
+
+
+def _format_value(value: Any) -> str:
+    """Render a value the way the Zabbix agent does."""
+    if isinstance(value, float):
+        return f"{value:.6f}"
+    return str(value)
+
+
+class _PassiveCheckHandler(socketserver.BaseRequestHandler):
+    """Reads one request per connection, as the Zabbix server and proxy send them."""
+
+    def handle(self):
+        server = self.server
+        self.request.settimeout(server.timeout_seconds)
+        try:
+            head = self.request.recv(4, socket.MSG_WAITALL)
+            if head == ZBXD_MAGIC:
+                request = read_data(self.request, head)
+            else:
+                # Legacy plain-text request: key terminated by a newline
+                request = head
+                while b'\n' not in request and len(request) < MAX_LEGACY_KEY:
+                    chunk = self.request.recv(256)
+                    if not chunk:
+                        break
+                    request += chunk
+            self.request.sendall(pack_data(server.responder.respond(request)))
+        except (OSError, ValueError) as e:
+            server.responder.logger.debug(f"Passive check from {self.client_address[0]} failed: {str(e)}")
+
+
+class PassiveCheckServer(socketserver.ThreadingTCPServer):
+    """TCP listener for Zabbix passive checks."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, config: Dict[str, Any], responder: PassiveCheckResponder):
+        """Bind to zabbix_agent_listen:zabbix_agent_port."""
+        self.responder = responder
+        self.timeout_seconds = config.get('zabbix_timeout', 5)
+        self.allowed = {address.strip() for address in config.get('zabbix_agent_allowed', '').split(',')
+                        if address.strip()}
+        self.thread = None
+        super().__init__((config.get('zabbix_agent_listen', '0.0.0.0'), config.get('zabbix_agent_port', 10050)),
+                         _PassiveCheckHandler)
+
+    def verify_request(self, request, client_address) -> bool:
+        """Only accept connections from the configured Zabbix servers/proxies (like the agent's Server=)."""
+        if self.allowed and client_address[0] not in self.allowed:
+            self.responder.logger.warning(f"Passive check from disallowed address {client_address[0]} rejected")
+            return False
+        return True
+
+    def start(self) -> None:
+        """Serve in a background thread."""
+        self.thread = threading.Thread(target=self.serve_forever, name='zabbix-passive-checks', daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and close the listening socket."""
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Zabbix sender for System Monitor
+Pushes collected metrics to a Zabbix server/proxy trapper using the
+sender (ZBXD) protocol, batching several cycles into one frame
+"""
+
+import sys
+import json
+import time
+import zlib
+import socket
+import struct
+import logging
+import argparse
+import threading
+from collections import deque
+from typing import Dict, Any, Optional, List, Tuple
+
+ZBXD_MAGIC = b'ZBXD'
+FLAG_ZABBIX = 0x01
+FLAG_COMPRESSED = 0x02
+HEADER = struct.Struct('<4sBII')  # magic, flags, data length, reserved (uncompressed length)
+MAX_FRAME_SIZE = 1024 * 1024 * 1024
+
+
+def pack_data(data: bytes, compress: bool = False) -> bytes:
+    """Wrap raw bytes into a ZBXD frame."""
+    if compress:
+        compressed = zlib.compress(data)
+        return HEADER.pack(ZBXD_MAGIC, FLAG_ZABBIX | FLAG_COMPRESSED, len(compressed), len(data)) + compressed
+    return HEADER.pack(ZBXD_MAGIC, FLAG_ZABBIX, len(data), 0) + data
+
+
+def pack_frame(payload: Dict[str, Any], compress: bool = False) -> bytes:
+    """Serialize a JSON payload into a ZBXD frame."""
+    return pack_data(json.dumps(payload, separators=(',', ':')).encode('utf-8'), compress)
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    """Read exactly `size` bytes or raise ConnectionError on EOF."""
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def read_data(sock: socket.socket, magic: Optional[bytes] = None) -> bytes:
+    """Read one ZBXD frame and return its (decompressed) body; `magic` is passed if already consumed."""
+    header = (magic or b'') + recv_exact(sock, HEADER.size - len(magic or b''))
+    magic, flags, length, reserved = HEADER.unpack(header)
+    if magic != ZBXD_MAGIC or length > MAX_FRAME_SIZE:
+        raise ValueError("Invalid ZBXD header")
+    data = recv_exact(sock, length)
+    if flags & FLAG_COMPRESSED:
+        data = zlib.decompress(data)
+    return data
+
+
+def read_frame(sock: socket.socket) -> Dict[str, Any]:
+    """Read one ZBXD frame from a socket and return the decoded JSON payload."""
+    return json.loads(read_data(sock).decode('utf-8'))
+
+
+def quote_param(value: str) -> str:
+    """Quote an item key parameter when it contains characters with special meaning."""
+    if any(char in value for char in ',[]"') or value.startswith(' '):
+        return '"' + value.replace('"', '\\"') + '"'
+    return value
+
+
+def flatten_metrics(metrics: Dict[str, Any], prefix: str) -> List[Tuple[str, float]]:
+    """Convert a monitor metrics dictionary into (item key, value) pairs."""
+    items = []
+    for name, value in metrics.items():
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            items.append((f"{prefix}.{name}", value))
+        elif name == 'network' and isinstance(value, tuple) and len(value) == 2:
+            items.append((f"{prefix}.network.rx", value[0]))
+            items.append((f"{prefix}.network.tx", value[1]))
+        elif name == 'pressure' and isinstance(value, dict):
+            for resource, lines in value.items():
+                for kind, values in lines.items():
+                    for window, number in values.items():
+                        items.append((f"{prefix}.pressure[{resource},{kind},{window}]", number))
+        elif name == 'sockets' and isinstance(value, dict):
+            for state, count in value['tcp'].items():
+                items.append((f"{prefix}.tcp[{state}]", count))
+            items.append((f"{prefix}.udp", value['udp']))
+            items.append((f"{prefix}.ephemeral.pused", value['ephemeral']['max_percent']))
+            for counter, number in value['counters'].items():
+                items.append((f"{prefix}.netstat[{counter}]", number))
+        elif name == 'numa' and isinstance(value, dict):
+            for node in value['nodes']:
+                items.append((f"{prefix}.numa.pused[{node['node']}]", node.get('memory_percent', 0)))
+                items.append((f"{prefix}.numa.miss[{node['node']}]", node['miss_percent']))
+                for event, number in node['events'].items():
+                    items.append((f"{prefix}.numa.events[{node['node']},{event}]", number))
+                for size, pool in node['hugepages'].items():
+                    items.append((f"{prefix}.hugepages.free[{node['node']},{size}]", pool['free']))
+        elif name == 'filesystems' and isinstance(value, dict):
+            for path, percent in value.items():
+                items.append((f"{prefix}.fs.pused[{quote_param(path)}]", percent))
+    return items
+
+
+class ZabbixSender:
+    """Buffered, batching Zabbix trapper client."""
+
+    def __init__(self, config: Dict[str, Any]):
+        """Initialize the sender with configuration."""
+        self.config = config
+        self.logger = logging.getLogger('memory_monitor.zabbix')
+        self.enabled = config.get('zabbix_enabled', False)
+        self.server = config.get('zabbix_server', 'localhost')
+        self.port = config.get('zabbix_port', 10051)
+        self.host = config.get('zabbix_host') or socket.gethostname()
+        self.key_prefix = config.get('zabbix_key_prefix', 'memory_monitor')
+        self.compress = config.get('zabbix_compress', True)
+        self.batch_cycles = max(1, config.get('zabbix_batch_cycles', 1))
+        self.timeout = config.get('zabbix_timeout', 5)
+        # (key, value, clock, ns) tuples; the per-item JSON objects are only built for the send
+        self.buffer = deque(maxlen=config.get('zabbix_buffer_size', 100000))
+        self.sock = None
+        self.pending_cycles = 0
+        self.dropped = 0
+        self.retry_delay = 1.0
+        self.next_attempt = 0.0
+
+    def add_metrics(self, metrics: Dict[str, Any], clock: Optional[float] = None) -> None:
+        """Queue one cycle of metrics for the next batch."""
+        if not self.enabled:
+            return
+        if clock is None:
+            clock = time.time()
+        seconds = int(clock)
+        nanoseconds = int((clock - seconds) * 1e9)
+        for key, value in flatten_metrics(metrics, self.key_prefix):
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append((key, str(value), seconds, nanoseconds))
+        self.pending_cycles += 1
+
+    def add_value(self, key: str, value: Any, clock: Optional[float] = None) -> None:
+        """Queue a single item value, e.g. a low-level discovery JSON, for the next batch."""
+        if not self.enabled:
+            return
+        if clock is None:
+            clock = time.time()
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append((key, str(value), int(clock), int((clock - int(clock)) * 1e9)))
+
+    def _connect(self) -> None:
+        """Open the TCP connection to the trapper."""
+        self.sock = socket.create_connection((self.server, self.port), timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _close(self) -> None:
+        """Close the TCP connection if open."""
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def _exchange(self, frame: bytes) -> Dict[str, Any]:
+        """Send a frame and read the reply, reconnecting once if the kept-alive connection was closed."""
+        for attempt in (0, 1):
+            reused = self.sock is not None
+            if not reused:
+                self._connect()
+            try:
+                self.sock.sendall(frame)
+                return read_frame(self.sock)
+            except (ConnectionError, BrokenPipeError, struct.error):
+                # Zabbix trappers usually close after each request; a failure on a reused socket is expected
+                self._close()
+                if not reused or attempt:
+                    raise
+        raise ConnectionError("Unreachable")
+
+    def batch_due(self) -> bool:
+        """True when enough cycles are buffered and no retry backoff is pending."""
+        return (self.enabled and bool(self.buffer) and self.pending_cycles >= self.batch_cycles
+                and time.monotonic() >= self.next_attempt)
+
+    def flush(self, force: bool = False) -> bool:
+        """Send everything buffered as one frame when the batch is due."""
+        if not self.enabled or not self.buffer:
+            return False
+        if not force and not self.batch_due():
+            return False
+        now = time.monotonic()
+
+        items = [{'host': self.host, 'key': key, 'value': value, 'clock': seconds, 'ns': nanoseconds}
+                 for key, value, seconds, nanoseconds in self.buffer]
+        clock = time.time()
+        payload = {'request': 'sender data', 'data': items,
+                   'clock': int(clock), 'ns': int((clock - int(clock)) * 1e9)}
+        try:
+            response = self._exchange(pack_frame(payload, self.compress))
+        except (OSError, ValueError) as e:
+            self._close()
+            self.next_attempt = now + self.retry_delay
+            self.retry_delay = min(self.retry_delay * 2, 60.0)
+            self.logger.warning(f"Zabbix send failed, {len(items)} values kept for retry: {str(e)}")
+            return False
+
+        # Only what was sent is removed; values queued meanwhile stay
+        for _ in range(len(items)):
+            self.buffer.popleft()
+        self.pending_cycles = 0
+        self.retry_delay = 1.0
+        self.next_attempt = 0.0
+        if self.dropped:
+            self.logger.warning(f"Zabbix buffer overflow dropped {self.dropped} values during outage")
+            self.dropped = 0
+
+        if response.get('response') != 'success':
+            self.logger.error(f"Zabbix rejected batch: {response.get('info', response)}")
+            return False
+        self.logger.debug(f"Zabbix batch sent: {response.get('info', '')}")
+        return True
+
+    def close(self) -> None:
+        """Flush remaining values and close the connection."""
+        if self.enabled and self.buffer:
+            self.flush(force=True)
+        self._close()
+
+
+class StubTrapper:
+    """Minimal stand-in Zabbix trapper that records received sender batches."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, keep_alive: bool = False):
+        """Bind the listening socket; port 0 picks a free port."""
+        self.keep_alive = keep_alive
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(16)
+        self.port = self.listener.getsockname()[1]
+        self.requests = []
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+
+    def start(self) -> 'StubTrapper':
+        self.thread.start()
+        return self
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.listener.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        with conn:
+            while True:
+                try:
+                    payload = read_frame(conn)
+                except (ConnectionError, ValueError, OSError):
+                    return
+                self.requests.append(payload)
+                count = len(payload.get('data', []))
+                conn.sendall(pack_frame({'response': 'success',
+                                         'info': f"processed: {count}; failed: 0; total: {count}; seconds spent: 0.000001"}))
+                if not self.keep_alive:
+                    return
+
+    def stop(self) -> None:
+        self.listener.close()
+
+
+def main():
+    """Run a stand-in trapper or send a single test value."""
+    parser = argparse.ArgumentParser(description='System Monitor Zabbix sender tools')
+    parser.add_argument('--stub-trapper', type=int, metavar='PORT', help='Run a stand-in trapper printing received batches')
+    parser.add_argument('--keep-alive', action='store_true', help='Stand-in trapper keeps connections open')
+    parser.add_argument('--server', default='127.0.0.1', help='Trapper address for --send')
+    parser.add_argument('--port', type=int, default=10051, help='Trapper port for --send')
+    parser.add_argument('--send', nargs=3, metavar=('HOST', 'KEY', 'VALUE'), help='Send one value')
+    args = parser.parse_args()
+
+    if args.stub_trapper is not None:
+        trapper = StubTrapper('0.0.0.0', args.stub_trapper, keep_alive=args.keep_alive).start()
+        print(f"Stand-in trapper listening on port {trapper.port}")
+        seen = 0
+        try:
+            while True:
+                time.sleep(0.2)
+                while seen < len(trapper.requests):
+                    print(json.dumps(trapper.requests[seen]))
+                    seen += 1
+        except KeyboardInterrupt:
+            trapper.stop()
+    elif args.send:
+        host, key, value = args.send
+        sender = ZabbixSender({'zabbix_enabled': True, 'zabbix_server': args.server, 'zabbix_port': args.port,
+                               'zabbix_host': host})
+        sender.add_value(key, value)
+        sender.pending_cycles = 1
+        ok = sender.flush(force=True)
+        sender.close()
+        sys.exit(0 if ok else 1)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()